@@ -0,0 +1,100 @@
+"""
+Archivage des messages anciens (ArchivedMessage)
+
+Les messages plus anciens que MESSAGE_ARCHIVE_DAYS sont déplacés par lots
+vers la table d'archive : chaque lot est copié (contenu compressé, sans
+doublon si le message est déjà archivé) puis supprimé de la table chaude
+dans la même transaction. Les messages gardent
+leur id, les seuils de lecture et d'effacement restent donc valables.
+L'historique d'une conversation continue dans l'archive quand les
+messages chauds sont épuisés. Les messages archivés ne figurent plus dans
+l'index de recherche plein texte (voir search.py).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .models import ArchivedMessage, Message
+
+
+BATCH_SIZE = 1000
+
+
+def archive_cutoff(days=None, now=None):
+    """Date avant laquelle les messages sont archivés"""
+    days = days if days is not None else getattr(settings, 'MESSAGE_ARCHIVE_DAYS', 365)
+    if days < 1:
+        raise ValueError("L'âge d'archivage doit être d'au moins un jour")
+    return (now or timezone.now()) - timedelta(days=days)
+
+
+def archive_messages(days=None, batch_size=BATCH_SIZE, dry_run=False):
+    """
+    Archive les messages anciens par lots
+    Retourne le nombre de messages archivés (ou à archiver en simulation)
+    """
+    queryset = Message.objects.filter(created_at__lt=archive_cutoff(days)).order_by('id')
+    if dry_run:
+        return queryset.count()
+
+    total = 0
+    while True:
+        with transaction.atomic():
+            # Les lots verrouillés par une autre exécution sont ignorés quand la
+            # base le permet ; sinon (SQLite) la copie idempotente et la
+            # suppression par id rendent les exécutions concurrentes sans effet
+            batch = list(queryset.select_for_update(skip_locked=True).values_list(
+                'id', 'conversation_id', 'sender_id', 'content', 'created_at', 'updated_at'
+            )[:batch_size])
+            if not batch:
+                break
+            ArchivedMessage.objects.bulk_create([
+                ArchivedMessage(
+                    id=message_id,
+                    conversation_id=conversation_id,
+                    sender_id=sender_id,
+                    compressed_content=ArchivedMessage.compress(content),
+                    created_at=created_at,
+                    updated_at=updated_at
+                )
+                for message_id, conversation_id, sender_id, content, created_at, updated_at in batch
+            ], ignore_conflicts=True)
+            # Seuls les messages encore présents comptent (déjà archivés sinon)
+            deleted = Message.objects.filter(id__in=[row[0] for row in batch]).delete()[1].get(Message._meta.label, 0)
+        total += deleted
+    return total
+
+
+def archived_page(conversation_id, position=None, newer=False, limit=50, cleared_id=0):
+    """
+    Messages archivés d'une conversation avant (ou après, si newer) la
+    position (created_at, id), dans l'ordre de parcours
+    """
+    queryset = ArchivedMessage.objects.filter(
+        conversation_id=conversation_id
+    ).select_related('sender')
+    if cleared_id:
+        queryset = queryset.filter(id__gt=cleared_id)
+    if newer:
+        if position:
+            queryset = queryset.filter(
+                Q(created_at__gt=position[0]) | Q(created_at=position[0], id__gt=position[1])
+            )
+        queryset = queryset.order_by('created_at', 'id')
+    else:
+        if position:
+            queryset = queryset.filter(
+                Q(created_at__lt=position[0]) | Q(created_at=position[0], id__lt=position[1])
+            )
+        queryset = queryset.order_by('-created_at', '-id')
+    return list(queryset[:limit])
+
+
+def latest_archived_id(conversation_id):
+    """Id du dernier message archivé de la conversation (0 si aucun)"""
+    return ArchivedMessage.objects.filter(
+        conversation_id=conversation_id
+    ).aggregate(last_id=Max('id'))['last_id'] or 0
@@ -0,0 +1,214 @@
+"""
+Pièces jointes de la messagerie, stockées par adresse de contenu
+
+À l'envoi, le gestionnaire d'upload écrit chaque morceau reçu dans un
+fichier temporaire en calculant l'empreinte SHA-256 au fil de l'eau : la
+mémoire utilisée ne dépend pas de la taille du fichier. Le fichier est
+renommé en ATTACHMENTS_ROOT/ab/cd/<sha256> (supprimé s'il existe déjà)
+après validation de la transaction qui crée les pièces jointes : une
+transaction annulée ne laisse ni fichier ni StoredFile orphelin. Le
+fichier stocké est supprimé avec la dernière pièce jointe qui y renvoie.
+Le téléchargement gère les requêtes conditionnelles et Range.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.db import transaction
+
+from .models import MessageAttachment, StoredFile
+
+
+READ_CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def attachments_root():
+    return str(getattr(settings, 'ATTACHMENTS_ROOT', os.path.join(settings.BASE_DIR, 'attachments')))
+
+
+def blob_path(sha256):
+    """Chemin du fichier d'empreinte donnée"""
+    return os.path.join(attachments_root(), sha256[:2], sha256[2:4], sha256)
+
+
+class HashedUploadedFile(UploadedFile):
+    """Fichier reçu dans un fichier temporaire, avec son empreinte"""
+
+    def __init__(self, file, name, content_type, size, charset, sha256):
+        super().__init__(file, name, content_type, size, charset)
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+class ContentAddressedUploadHandler(FileUploadHandler):
+    """
+    Gestionnaire d'upload : écrit les morceaux sur disque et calcule
+    l'empreinte SHA-256 sans garder le fichier en mémoire
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        # Définis même si la requête ne contient aucun fichier
+        self.file = None
+        self.max_size = getattr(settings, 'ATTACHMENT_MAX_SIZE', 25 * 1024 * 1024)
+        self.received = 0
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        directory = os.path.join(attachments_root(), 'tmp')
+        os.makedirs(directory, exist_ok=True)
+        self.file = tempfile.NamedTemporaryFile(dir=directory, suffix='.upload', delete=False)
+        self.hasher = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.discard()
+            raise StopUpload(connection_reset=True)
+        self.hasher.update(raw_data)
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        self.file.flush()
+        self.file.seek(0)
+        return HashedUploadedFile(
+            self.file, self.file_name, self.content_type, file_size,
+            self.charset, self.hasher.hexdigest()
+        )
+
+    def upload_interrupted(self):
+        if self.file is not None:
+            self.discard()
+
+    def discard(self):
+        self.file.close()
+        try:
+            os.remove(self.file.name)
+        except FileNotFoundError:
+            pass
+
+
+def store_upload(uploaded):
+    """
+    Enregistre le fichier reçu, rangé à son adresse de contenu après
+    validation de la transaction
+    Retourne le StoredFile (existant si le contenu était déjà stocké).
+    """
+    uploaded.file.close()
+    # Sans IntegrityError si le même contenu est envoyé en même temps
+    StoredFile.objects.bulk_create([
+        StoredFile(sha256=uploaded.sha256, size=uploaded.size)
+    ], ignore_conflicts=True)
+    transaction.on_commit(lambda: place_blob(uploaded.temporary_file_path(), uploaded.sha256))
+    return StoredFile.objects.get(sha256=uploaded.sha256)
+
+
+def place_blob(temporary_path, sha256):
+    """Range le fichier temporaire à son adresse de contenu"""
+    path = blob_path(sha256)
+    if os.path.exists(path):
+        os.remove(temporary_path)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temporary_path, path)
+
+
+def discard_uploads(uploads):
+    """Supprime les fichiers temporaires non rangés (requête refusée ou transaction annulée)"""
+    for uploaded in uploads:
+        uploaded.close()
+        try:
+            os.remove(uploaded.temporary_file_path())
+        except FileNotFoundError:
+            pass
+
+
+def delete_unreferenced_files(file_ids):
+    """
+    Supprime les fichiers stockés auxquels plus aucune pièce jointe ne
+    renvoie ; les fichiers sur disque sont supprimés après validation
+    """
+    orphans = StoredFile.objects.filter(id__in=file_ids, attachments__isnull=True)
+    hashes = list(orphans.values_list('sha256', flat=True))
+    if not hashes:
+        return
+    orphans.delete()
+
+    def remove_blobs():
+        # Un contenu renvoyé entre-temps garde son fichier
+        stored_again = set(StoredFile.objects.filter(sha256__in=hashes).values_list('sha256', flat=True))
+        for sha256 in hashes:
+            if sha256 not in stored_again:
+                try:
+                    os.remove(blob_path(sha256))
+                except FileNotFoundError:
+                    pass
+
+    transaction.on_commit(remove_blobs)
+
+
+def attach_files(message, user, uploads):
+    """Enregistre les fichiers reçus comme pièces jointes du message"""
+    try:
+        with transaction.atomic():
+            return [
+                MessageAttachment.objects.create(
+                    message=message,
+                    conversation_id=message.conversation_id,
+                    uploaded_by=user,
+                    file=store_upload(uploaded),
+                    filename=os.path.basename(uploaded.name or 'fichier')[:255],
+                    content_type=(uploaded.content_type or 'application/octet-stream')[:100]
+                )
+                for uploaded in uploads
+            ]
+    except Exception:
+        discard_uploads(uploads)
+        raise
+
+
+def parse_range(header, size):
+    """
+    Retourne (début, fin incluse) d'un en-tête Range à un seul intervalle,
+    None s'il est absent ou non géré (réponse complète), ou ValueError si
+    l'intervalle n'est pas satisfiable
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffixe : les N derniers octets
+        length = int(last)
+        if length == 0:
+            raise ValueError
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError
+    return start, end
+
+
+def read_blob(path, start=0, end=None):
+    """Lit le fichier de start à end (inclus) par morceaux"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = None if end is None else end - start + 1
+        while remaining is None or remaining > 0:
+            chunk = f.read(READ_CHUNK_SIZE if remaining is None else min(READ_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
@@ -0,0 +1,213 @@
+"""
+Calcul des créneaux disponibles des médecins
+
+L'occupation de chaque médecin est lue dans la table DoctorFreeBusy (un
+bitmap de tranches de 5 minutes par jour) en une seule requête pour toute la
+période demandée, puis les créneaux de chaque plage de travail du planning
+compilé (core.schedule) sont testés sur le bitmap. Les réservations
+temporaires (core.holds) des autres utilisateurs sont retirées à la lecture,
+sans passer par le cache.
+"""
+import heapq
+from bisect import bisect_left
+from datetime import datetime, time, timedelta
+from itertools import islice
+
+from django.db.models import Q
+from django.utils import timezone
+
+from . import slot_cache
+from .freebusy import BUCKET_MINUTES, bitmaps_for_intervals, bucket_mask, load_bitmaps, rebuild_days
+from .holds import active_holds
+from .models import Appointment
+from .schedule import get_schedule, get_schedules
+
+
+SLOT_INTERVAL = 30  # Intervalle entre les créneaux (toujours 30 min)
+DEFAULT_DURATION = 30  # Durée par défaut d'un rendez-vous
+
+
+def iter_free_times(day, intervals, duration, busy, now):
+    """
+    Génère les débuts de créneaux libres d'une journée
+
+    `intervals` sont les plages de travail du jour en minutes (planning
+    compilé) et `busy` le bitmap d'occupation du jour : un créneau est libre
+    s'il tient dans une plage et qu'aucune de ses tranches n'est occupée.
+    """
+    day_start = timezone.make_aware(datetime.combine(day, time.min))
+
+    for work_start, work_end in intervals:
+        minute = work_start
+        # Le créneau ne doit pas dépasser la plage de travail
+        while minute + duration <= work_end:
+            first = minute // BUCKET_MINUTES
+            last = -(-(minute + duration) // BUCKET_MINUTES)
+            slot_time = day_start + timedelta(minutes=minute)
+
+            # Vérifier si le créneau est dans le futur et libre
+            if slot_time > now and not busy & bucket_mask(first, last):
+                yield slot_time
+
+            # Passer au créneau suivant
+            minute += SLOT_INTERVAL
+
+
+def day_bounds(start_day, end_day):
+    """Retourne le début de start_day et la fin de end_day (heure locale)"""
+    start = timezone.make_aware(datetime.combine(start_day, time.min))
+    end = timezone.make_aware(datetime.combine(end_day + timedelta(days=1), time.min))
+    return start, end
+
+
+def get_available_slots(doctor, start_day, end_day, duration=DEFAULT_DURATION, user=None):
+    """
+    Retourne les créneaux disponibles d'un médecin pour chaque jour de
+    [start_day, end_day] sous la forme {'YYYY-MM-DD': [créneaux]}
+    Les journées sont lues dans le cache et seules les absentes sont calculées.
+    Les créneaux réservés temporairement par un autre que `user` sont exclus.
+    """
+    days = [start_day + timedelta(days=i) for i in range((end_day - start_day).days + 1)]
+
+    # Vérifier si le médecin est disponible
+    if not doctor.is_available or not doctor.is_active:
+        return {day.isoformat(): [] for day in days}
+
+    now = timezone.now()
+    keys = slot_cache.slot_keys(doctor.id, days, duration)
+    free_times = slot_cache.get_many(keys)
+
+    missing = [day for day in days if day not in free_times]
+    if missing:
+        schedule = get_schedule(doctor)
+        busy = load_bitmaps([doctor.id], missing[0], missing[-1])
+        computed = {
+            day: list(iter_free_times(day, schedule.intervals_for(day), duration, busy.get((doctor.id, day), 0), now))
+            for day in missing
+        }
+        slot_cache.set_many({keys[day]: times for day, times in computed.items()})
+        free_times.update(computed)
+
+    held = list(active_holds([doctor.id], *day_bounds(start_day, end_day), exclude_user=user).values_list(
+        'start_date', 'end_date'
+    ))
+    slot_length = timedelta(minutes=duration)
+
+    def is_free(slot_time):
+        # Les créneaux en cache peuvent être passés depuis leur calcul
+        if slot_time <= now:
+            return False
+        slot_end = slot_time + slot_length
+        return not any(start < slot_end and slot_time < end for start, end in held)
+
+    return {
+        day.isoformat(): [
+            {'time': slot_time.isoformat(), 'available': True}
+            for slot_time in free_times[day] if is_free(slot_time)
+        ]
+        for day in days
+    }
+
+
+def iter_doctor_slots(doctor, schedule, days, duration, busy, now):
+    """Génère les créneaux libres (début, doctor_id) d'un médecin dans l'ordre chronologique"""
+    for day in days:
+        for slot_time in iter_free_times(day, schedule.intervals_for(day), duration, busy.get((doctor.id, day), 0), now):
+            yield slot_time, doctor.id
+
+
+def find_first_available(doctors, start_day, end_day, duration=DEFAULT_DURATION, limit=10, user=None):
+    """
+    Retourne les `limit` premiers créneaux libres, tous médecins confondus
+
+    L'occupation de tous les médecins est chargée en une seule requête,
+    puis les créneaux de chaque médecin sont générés paresseusement et
+    fusionnés avec un tas : seuls les jours nécessaires sont calculés.
+    """
+    doctors = {d.id: d for d in doctors if d.is_available and d.is_active}
+    if not doctors:
+        return []
+
+    days = [start_day + timedelta(days=i) for i in range((end_day - start_day).days + 1)]
+    busy = load_bitmaps(list(doctors), start_day, end_day)
+
+    # Les réservations temporaires des autres utilisateurs occupent aussi le bitmap
+    holds = {}
+    for doctor_id, start, end in active_holds(
+        list(doctors), *day_bounds(start_day, end_day), exclude_user=user
+    ).values_list('doctor_id', 'start_date', 'end_date'):
+        holds.setdefault(doctor_id, []).append((start, end))
+    for doctor_id, intervals in holds.items():
+        for day, bitmap in bitmaps_for_intervals(intervals).items():
+            busy[(doctor_id, day)] = busy.get((doctor_id, day), 0) | bitmap
+
+    schedules = get_schedules(doctors.values())
+
+    now = timezone.now()
+    merged = heapq.merge(*[
+        iter_doctor_slots(doctor, schedules[doctor.id], days, duration, busy, now)
+        for doctor in doctors.values()
+    ])
+
+    results = []
+    for slot_time, doctor_id in islice(merged, limit):
+        doctor = doctors[doctor_id]
+        results.append({
+            'time': slot_time.isoformat(),
+            'doctor_id': doctor_id,
+            'doctor_name': doctor.user.get_full_name(),
+            'specialization': doctor.specialization,
+            'duration': duration,
+        })
+    return results
+
+
+def find_conflicts(doctor_id, patient_id, intervals, exclude=None):
+    """
+    Recherche en une seule requête les rendez-vous actifs du médecin ou du
+    patient qui chevauchent chacun des intervalles (début, fin)
+
+    La requête ne porte que sur les fenêtres des intervalles (OU des
+    chevauchements) : une série sur un an ne charge pas l'année entière.
+    Retourne {index de l'intervalle: rendez-vous en conflit}. `exclude` est
+    un filtre Q des rendez-vous à ignorer (par exemple la série déplacée).
+    """
+    if not intervals:
+        return {}
+
+    windows = Q()
+    for start, end in intervals:
+        windows |= Q(appointment_date__lt=end, end_date__gt=start)
+
+    existing = Appointment.objects.filter(
+        Q(doctor_id=doctor_id) | Q(patient_id=patient_id),
+        windows,
+        status__in=Appointment.ACTIVE_STATUSES
+    ).select_related('patient__user', 'doctor__user').order_by('appointment_date')
+    if exclude is not None:
+        existing = existing.exclude(exclude)
+    existing = list(existing)
+    if not existing:
+        return {}
+
+    starts = [apt.appointment_date for apt in existing]
+    longest = max(apt.end_date - apt.appointment_date for apt in existing)
+
+    conflicts = {}
+    for index, (start, end) in enumerate(intervals):
+        # Seuls les rendez-vous commençant dans [start - longest, end[ peuvent chevaucher
+        for apt in existing[bisect_left(starts, start - longest):bisect_left(starts, end)]:
+            if apt.end_date > start:
+                conflicts[index] = apt
+                break
+    return conflicts
+
+
+def refresh_doctor_days(doctor_days):
+    """
+    Recalcule l'occupation et invalide le cache des journées
+    {(doctor_id, jour)} après une mise à jour en masse (sans signaux)
+    """
+    if doctor_days:
+        rebuild_days(doctor_days)
+        slot_cache.invalidate_days(doctor_days)
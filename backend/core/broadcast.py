@@ -0,0 +1,58 @@
+"""
+Diffusion des annonces de clinique
+
+L'annonce est enregistrée une fois, puis les remises (AnnouncementDelivery)
+sont créées par lots de bulk_create dans la même transaction : quelques
+requêtes pour des milliers de destinataires, au lieu d'une conversation et
+d'un message par patient.
+"""
+from django.db import transaction
+from django.db.models import Q
+
+from .events import publish_to_users
+from .models import Announcement, AnnouncementDelivery, User
+
+
+BATCH_SIZE = 1000
+
+
+def recipient_ids(clinic_id, audience):
+    """Utilisateurs actifs de la clinique visés par l'annonce"""
+    conditions = {
+        'patients': Q(patient_profile__clinic_id=clinic_id),
+        'staff': Q(doctor_profile__clinic_id=clinic_id) | Q(receptionist_profile__clinic_id=clinic_id),
+    }
+    if audience == 'all':
+        condition = conditions['patients'] | conditions['staff']
+    else:
+        condition = conditions[audience]
+    return User.objects.filter(condition, is_active=True).values_list('id', flat=True).distinct()
+
+
+def publish_announcement(announcement, batch_size=BATCH_SIZE):
+    """
+    Crée les remises de l'annonce par lots et prévient les destinataires
+    connectés (événement 'announcement' après validation)
+    Retourne le nombre de destinataires.
+    """
+    user_ids = []
+    with transaction.atomic():
+        batch = []
+        for user_id in recipient_ids(announcement.clinic_id, announcement.audience).iterator(chunk_size=batch_size):
+            batch.append(AnnouncementDelivery(announcement=announcement, user_id=user_id))
+            user_ids.append(user_id)
+            if len(batch) >= batch_size:
+                AnnouncementDelivery.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        if batch:
+            AnnouncementDelivery.objects.bulk_create(batch, ignore_conflicts=True)
+
+        Announcement.objects.filter(id=announcement.id).update(recipient_count=len(user_ids))
+        announcement.recipient_count = len(user_ids)
+
+        publish_to_users(user_ids, 'announcement', {
+            'id': announcement.id,
+            'clinic': announcement.clinic_id,
+            'title': announcement.title,
+        })
+    return len(user_ids)
@@ -0,0 +1,160 @@
+"""
+Publication d'événements temps réel (nouveaux messages, lectures, non lus)
+
+Les vues publient des événements sur le canal de chaque destinataire
+(`user:<id>`) ; le flux SSE de chaque utilisateur connecté s'y abonne. Le
+courtier est interchangeable (réglage EVENTS_BROKER) : le courtier en
+mémoire convient à un seul processus et aux tests, un courtier partagé
+(Redis...) peut le remplacer en implémentant la même interface.
+
+EventSource ne pouvant pas envoyer d'en-têtes, le flux est ouvert avec un
+ticket à usage unique et de courte durée (stocké dans le cache) plutôt
+qu'avec le jeton JWT, qui finirait dans les journaux d'accès.
+"""
+import asyncio
+import json
+import secrets
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+class BaseBroker:
+    """Interface d'un courtier d'événements"""
+
+    def publish(self, channel, event):
+        """Publie un événement (dict sérialisable en JSON) sur un canal"""
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        """Retourne un abonnement (file asyncio.Queue) au canal, dans la boucle courante"""
+        raise NotImplementedError
+
+    def unsubscribe(self, channel, queue):
+        """Termine un abonnement"""
+        raise NotImplementedError
+
+
+class InMemoryBroker(BaseBroker):
+    """
+    Courtier en mémoire pour un seul processus
+
+    La publication peut venir d'un thread synchrone (vues exécutées hors de
+    la boucle) : les événements sont remis à chaque file dans sa boucle.
+    """
+    QUEUE_SIZE = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}  # {canal: {file: boucle}}
+
+    def publish(self, channel, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, {}).items())
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                # Boucle fermée : l'abonnement sera retiré à la déconnexion
+                pass
+
+    @staticmethod
+    def _deliver(queue, event):
+        # Un client trop lent perd les événements les plus anciens
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+    def subscribe(self, channel):
+        queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.setdefault(channel, {})[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, channel, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(channel, {})
+            subscribers.pop(queue, None)
+            if not subscribers:
+                self._subscribers.pop(channel, None)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Retourne le courtier configuré (EVENTS_BROKER), créé au premier appel"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                broker_class = import_string(getattr(settings, 'EVENTS_BROKER', 'core.events.InMemoryBroker'))
+                _broker = broker_class()
+    return _broker
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def publish_to_users(user_ids, event_type, data):
+    """Publie un événement aux utilisateurs après validation de la transaction"""
+    event = {'type': event_type, 'data': json.loads(json.dumps(data, default=str))}
+    user_ids = list(user_ids)
+
+    def send():
+        broker = get_broker()
+        for user_id in user_ids:
+            broker.publish(user_channel(user_id), event)
+
+    transaction.on_commit(send)
+
+
+def notify_new_message(message, data, participant_ids):
+    """Nouveau message pour tous les participants, +1 non lu pour les destinataires"""
+    publish_to_users(participant_ids, 'message', data)
+    publish_to_users(
+        [user_id for user_id in participant_ids if user_id != message.sender_id],
+        'unread',
+        {'conversation': message.conversation_id, 'delta': 1}
+    )
+
+
+def notify_read(conversation_id, reader_id, participant_ids, last_read_message_id, unread_count):
+    """Accusé de lecture pour les participants, non lus remis à jour pour le lecteur"""
+    publish_to_users(
+        [user_id for user_id in participant_ids if user_id != reader_id],
+        'read',
+        {'conversation': conversation_id, 'reader': reader_id, 'last_read_message_id': last_read_message_id}
+    )
+    publish_to_users(
+        [reader_id],
+        'unread',
+        {'conversation': conversation_id, 'count': unread_count}
+    )
+
+
+def issue_stream_ticket(user_id):
+    """Crée un ticket d'ouverture du flux SSE pour l'utilisateur"""
+    ticket = secrets.token_urlsafe(32)
+    cache.set(f'sse-ticket:{ticket}', user_id, getattr(settings, 'EVENTS_TICKET_TIMEOUT', 30))
+    return ticket
+
+
+async def redeem_stream_ticket(ticket):
+    """Consomme un ticket et retourne l'id de son utilisateur (None si invalide, expiré ou déjà utilisé)"""
+    key = f'sse-ticket:{ticket}'
+    user_id = await cache.aget(key)
+    # Seul l'appel qui supprime effectivement la clé consomme le ticket
+    if user_id is None or not await cache.adelete(key):
+        return None
+    return user_id
+
+
+def format_sse(event):
+    """Formate un événement au format text/event-stream"""
+    return f"event: {event['type']}\ndata: {json.dumps(event['data'])}\n\n"
@@ -0,0 +1,167 @@
+"""
+Table d'occupation des médecins (DoctorFreeBusy)
+
+Chaque journée d'un médecin est représentée par un bitmap de tranches de
+5 minutes. Les créneaux disponibles sont calculés à partir de ces quelques
+octets au lieu de parcourir les rendez-vous.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Appointment, DoctorFreeBusy
+
+
+BUCKET_MINUTES = 5
+BUCKETS_PER_DAY = 24 * 60 // BUCKET_MINUTES  # 288 tranches
+BITMAP_BYTES = BUCKETS_PER_DAY // 8  # 36 octets
+
+
+def to_bytes(bitmap):
+    """Convertit un bitmap (int) en octets pour le stockage"""
+    return bitmap.to_bytes(BITMAP_BYTES, 'little')
+
+
+def from_bytes(data):
+    """Convertit les octets stockés en bitmap (int)"""
+    return int.from_bytes(bytes(data), 'little')
+
+
+def bucket_mask(first, last):
+    """Masque des tranches [first, last["""
+    return ((1 << (last - first)) - 1) << first
+
+
+def interval_buckets(start, end):
+    """
+    Découpe un intervalle en tranches par jour local
+    Retourne [(jour, première tranche, dernière tranche exclue), ...]
+    Les bornes sont arrondies vers l'extérieur à la tranche de 5 minutes.
+    """
+    start = timezone.localtime(start)
+    end = timezone.localtime(end)
+    result = []
+    day = start.date()
+    while True:
+        day_start = timezone.make_aware(datetime.combine(day, time.min))
+        first = max(0, int((start - day_start).total_seconds() // 60) // BUCKET_MINUTES)
+        end_minutes = (end - day_start).total_seconds() / 60
+        last = min(BUCKETS_PER_DAY, -int(-end_minutes // BUCKET_MINUTES))
+        if last > first:
+            result.append((day, first, last))
+        if end_minutes <= 24 * 60:
+            return result
+        day += timedelta(days=1)
+
+
+def bitmaps_for_intervals(intervals):
+    """Construit les bitmaps {jour: int} d'une liste d'intervalles (début, fin)"""
+    bitmaps = {}
+    for start, end in intervals:
+        for day, first, last in interval_buckets(start, end):
+            bitmaps[day] = bitmaps.get(day, 0) | bucket_mask(first, last)
+    return bitmaps
+
+
+def appointment_days(doctor_id, appointment_date, end_date):
+    """Retourne les (doctor_id, jour) couverts par un rendez-vous"""
+    return {(doctor_id, day) for day, _first, _last in interval_buckets(appointment_date, end_date)}
+
+
+def compute_day_bitmap(doctor_id, day):
+    """Recalcule le bitmap d'une journée à partir des rendez-vous actifs"""
+    day_start = timezone.make_aware(datetime.combine(day, time.min))
+    day_end = day_start + timedelta(days=1)
+    intervals = Appointment.objects.filter(
+        doctor_id=doctor_id,
+        status__in=Appointment.ACTIVE_STATUSES,
+        appointment_date__lt=day_end,
+        end_date__gt=day_start
+    ).values_list('appointment_date', 'end_date')
+    return bitmaps_for_intervals(intervals).get(day, 0)
+
+
+def store_bitmap(doctor_id, day, bitmap):
+    """Enregistre le bitmap d'une journée (supprime la ligne si tout est libre)"""
+    if bitmap:
+        DoctorFreeBusy.objects.update_or_create(
+            doctor_id=doctor_id, day=day,
+            defaults={'busy': to_bytes(bitmap)}
+        )
+    else:
+        DoctorFreeBusy.objects.filter(doctor_id=doctor_id, day=day).delete()
+
+
+def rebuild_days(doctor_days):
+    """Recalcule les journées {(doctor_id, jour)} depuis les rendez-vous"""
+    with transaction.atomic():
+        for doctor_id, day in doctor_days:
+            store_bitmap(doctor_id, day, compute_day_bitmap(doctor_id, day))
+
+
+def compute_bitmaps(doctor_ids, start_day, end_day):
+    """
+    Calcule les bitmaps {(doctor_id, jour): int} d'une période depuis les
+    rendez-vous actifs, en une seule requête
+    """
+    range_start = timezone.make_aware(datetime.combine(start_day, time.min))
+    range_end = timezone.make_aware(datetime.combine(end_day + timedelta(days=1), time.min))
+    intervals = {}
+    rows = Appointment.objects.filter(
+        doctor_id__in=doctor_ids,
+        status__in=Appointment.ACTIVE_STATUSES,
+        appointment_date__lt=range_end,
+        end_date__gt=range_start
+    ).values_list('doctor_id', 'appointment_date', 'end_date')
+    for doctor_id, start, end in rows:
+        intervals.setdefault(doctor_id, []).append((start, end))
+
+    bitmaps = {}
+    for doctor_id, doctor_intervals in intervals.items():
+        for day, bitmap in bitmaps_for_intervals(doctor_intervals).items():
+            if start_day <= day <= end_day:
+                bitmaps[(doctor_id, day)] = bitmap
+    return bitmaps
+
+
+def add_intervals(doctor_id, intervals):
+    """
+    Ajoute des intervalles (début, fin) au bitmap d'un médecin
+    (mise à jour incrémentale en quelques requêtes, quel que soit le nombre de jours)
+    """
+    bitmaps = bitmaps_for_intervals(intervals)
+    if not bitmaps:
+        return
+
+    with transaction.atomic():
+        # Créer les journées absentes (ignore celles créées en parallèle)
+        DoctorFreeBusy.objects.bulk_create([
+            DoctorFreeBusy(doctor_id=doctor_id, day=day, busy=to_bytes(0))
+            for day in bitmaps
+        ], ignore_conflicts=True)
+
+        rows = list(DoctorFreeBusy.objects.select_for_update().filter(
+            doctor_id=doctor_id, day__in=list(bitmaps)
+        ))
+        now = timezone.now()
+        for row in rows:
+            row.busy = to_bytes(from_bytes(row.busy) | bitmaps[row.day])
+            row.updated_at = now
+        DoctorFreeBusy.objects.bulk_update(rows, ['busy', 'updated_at'])
+
+
+def mark_busy(appointment):
+    """Ajoute un rendez-vous actif au bitmap (mise à jour incrémentale)"""
+    add_intervals(appointment.doctor_id, [(appointment.appointment_date, appointment.end_date)])
+
+
+def load_bitmaps(doctor_ids, start_day, end_day):
+    """Charge les bitmaps {(doctor_id, jour): int} d'une période en une requête"""
+    rows = DoctorFreeBusy.objects.filter(
+        doctor_id__in=doctor_ids,
+        day__gte=start_day,
+        day__lte=end_day
+    ).values_list('doctor_id', 'day', 'busy')
+    return {(doctor_id, day): from_bytes(busy) for doctor_id, day, busy in rows}
+
@@ -0,0 +1,101 @@
+"""
+Réservations temporaires de créneaux (SlotHold)
+
+Un utilisateur réserve un créneau quelques minutes avant de remplir le
+formulaire de rendez-vous. La contrainte unique (médecin, début) et le
+verrou sur la ligne du médecin garantissent qu'un seul utilisateur obtient
+un créneau donné ; les réservations des autres utilisateurs sont exclues
+des créneaux disponibles et refusées à la validation du rendez-vous.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Appointment, Doctor, SlotHold
+
+
+def hold_duration():
+    """Durée de vie d'une réservation temporaire"""
+    return timedelta(minutes=getattr(settings, 'SLOT_HOLD_MINUTES', 5))
+
+
+def active_holds(doctor_ids, start, end, exclude_user=None):
+    """Réservations non expirées des médecins qui chevauchent [start, end["""
+    holds = SlotHold.objects.filter(
+        doctor_id__in=doctor_ids,
+        start_date__lt=end,
+        end_date__gt=start,
+        expires_at__gt=timezone.now()
+    )
+    if exclude_user is not None:
+        holds = holds.exclude(held_by=exclude_user)
+    return holds
+
+
+def held_occurrences(doctor_id, intervals, exclude_user=None):
+    """
+    Retourne les index des intervalles (début, fin) qui chevauchent une
+    réservation active du médecin, en une requête
+    """
+    if not intervals:
+        return set()
+    holds = list(active_holds(
+        [doctor_id],
+        min(start for start, _end in intervals),
+        max(end for _start, end in intervals),
+        exclude_user=exclude_user
+    ).values_list('start_date', 'end_date'))
+    return {
+        index for index, (start, end) in enumerate(intervals)
+        if any(hold_start < end and start < hold_end for hold_start, hold_end in holds)
+    }
+
+
+def create_hold(doctor, user, start, end):
+    """
+    Réserve le créneau [start, end[ du médecin pour l'utilisateur
+
+    Remplace les réservations précédentes de l'utilisateur pour ce médecin.
+    Retourne la réservation, ou None si le créneau est déjà pris.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # Sérialise les réservations concurrentes d'un même médecin
+        list(Doctor.objects.select_for_update().filter(id=doctor.id).values_list('id', flat=True))
+        SlotHold.objects.filter(doctor=doctor, expires_at__lte=now).delete()
+        SlotHold.objects.filter(doctor=doctor, held_by=user).delete()
+
+        if active_holds([doctor.id], start, end).exists():
+            return None
+        if Appointment.objects.filter(
+            doctor=doctor,
+            status__in=Appointment.ACTIVE_STATUSES,
+            appointment_date__lt=end,
+            end_date__gt=start
+        ).exists():
+            return None
+
+        try:
+            with transaction.atomic():
+                return SlotHold.objects.create(
+                    doctor=doctor,
+                    held_by=user,
+                    start_date=start,
+                    end_date=end,
+                    expires_at=now + hold_duration()
+                )
+        except IntegrityError:
+            # Un autre utilisateur a réservé le même début entre-temps
+            return None
+
+
+def release_holds(user, doctor_id):
+    """Libère les réservations de l'utilisateur pour un médecin"""
+    return SlotHold.objects.filter(held_by=user, doctor_id=doctor_id).delete()[0]
+
+
+def sweep_expired():
+    """Supprime en une requête toutes les réservations expirées"""
+    return SlotHold.objects.filter(expires_at__lte=timezone.now()).delete()[0]
@@ -0,0 +1,180 @@
+"""
+Flux iCalendar (RFC 5545) des rendez-vous
+
+Le calendrier est produit au fil de l'eau : les rendez-vous sont lus par
+pages (pagination par clé sur appointment_date, id) et chaque événement est
+émis dès qu'il est formaté, sans construire le fichier en mémoire.
+L'ETag et Last-Modified sont calculés en une requête d'agrégat, ce qui
+permet de répondre 304 sans rien générer. Les rendez-vous annulés restent
+dans le flux (STATUS:CANCELLED) : leur annulation change Last-Modified et
+les agendas retirent l'événement.
+"""
+import hashlib
+import secrets
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from .models import Appointment, CalendarFeedToken
+
+
+PAGE_SIZE = 500
+PAST_DAYS = 90  # Historique inclus dans le flux
+
+STATUS_MAP = {
+    'scheduled': 'TENTATIVE',
+    'confirmed': 'CONFIRMED',
+    'in_progress': 'CONFIRMED',
+    'completed': 'CONFIRMED',
+    'no_show': 'CANCELLED',
+    'cancelled': 'CANCELLED',
+}
+
+
+def hash_token(token):
+    """Empreinte SHA-256 d'un jeton de flux"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def create_feed_token(user, doctor=None, clinic=None):
+    """
+    Crée un jeton de flux pour un médecin ou une clinique en révoquant les
+    jetons précédents de l'utilisateur pour ce même agenda
+    Retourne le jeton en clair (il n'est pas conservé)
+    """
+    CalendarFeedToken.objects.filter(
+        created_by=user, doctor=doctor, clinic=clinic, revoked_at__isnull=True
+    ).update(revoked_at=timezone.now())
+    token = secrets.token_urlsafe(32)
+    CalendarFeedToken.objects.create(
+        token_hash=hash_token(token), created_by=user, doctor=doctor, clinic=clinic
+    )
+    return token
+
+
+def revoke_feed_tokens(doctor=None, clinic=None):
+    """Révoque tous les jetons actifs d'un agenda"""
+    return CalendarFeedToken.objects.filter(
+        doctor=doctor, clinic=clinic, revoked_at__isnull=True
+    ).update(revoked_at=timezone.now())
+
+
+def get_feed_token(token):
+    """Retourne le jeton actif correspondant, ou None"""
+    return CalendarFeedToken.objects.filter(
+        token_hash=hash_token(token), revoked_at__isnull=True
+    ).select_related('doctor__user', 'clinic').first()
+
+
+def feed_appointments(feed_token):
+    """Rendez-vous publiés dans le flux d'un jeton, annulés compris"""
+    appointments = Appointment.objects.filter(
+        appointment_date__gte=timezone.now() - timedelta(days=PAST_DAYS)
+    )
+    if feed_token.doctor_id:
+        return appointments.filter(doctor_id=feed_token.doctor_id)
+    return appointments.filter(clinic_id=feed_token.clinic_id)
+
+
+def feed_version(appointments):
+    """
+    Retourne (ETag, Last-Modified) du flux en une requête
+    Le nombre de rendez-vous est inclus pour détecter les suppressions et
+    les rendez-vous sortis du flux.
+    """
+    stats = appointments.aggregate(last_modified=Max('updated_at'), count=Count('id'))
+    last_modified = stats['last_modified']
+    stamp = last_modified.isoformat() if last_modified else '-'
+    etag = hashlib.sha256(f"{stamp}:{stats['count']}:{PAST_DAYS}".encode()).hexdigest()[:32]
+    return f'"{etag}"', last_modified
+
+
+def escape_text(value):
+    """Échappe une valeur TEXT iCalendar"""
+    return (
+        str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def fold_line(line):
+    """Replie une ligne à 75 octets (RFC 5545, section 3.1)"""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line + '\r\n'
+    parts = []
+    limit = 75
+    while data:
+        cut = min(limit, len(data))
+        # Ne pas couper un caractère UTF-8 multi-octets
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode('utf-8'))
+        data = data[cut:]
+        limit = 74  # L'espace de continuation compte pour un octet
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_datetime(value):
+    """Date/heure UTC au format iCalendar"""
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def format_event(apt, include_doctor):
+    """Lignes VEVENT d'un rendez-vous"""
+    summary = apt.patient.user.get_full_name()
+    if apt.service:
+        summary = f"{summary} - {apt.service.name}"
+    if include_doctor:
+        summary = f"{summary} (Dr. {apt.doctor.user.get_full_name()})"
+
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:appointment-{apt.id}@medflow',
+        f'DTSTAMP:{format_datetime(apt.updated_at)}',
+        f'LAST-MODIFIED:{format_datetime(apt.updated_at)}',
+        f'DTSTART:{format_datetime(apt.appointment_date)}',
+        f'DTEND:{format_datetime(apt.end_date)}',
+        f'SUMMARY:{escape_text(summary)}',
+        f'STATUS:{STATUS_MAP.get(apt.status, "CONFIRMED")}',
+    ]
+    if apt.reason:
+        lines.append(f'DESCRIPTION:{escape_text(apt.reason)}')
+    lines.append('END:VEVENT')
+    return ''.join(fold_line(line) for line in lines)
+
+
+def stream_calendar(feed_token, appointments, page_size=PAGE_SIZE):
+    """Génère le calendrier morceau par morceau"""
+    name = (
+        f"Dr. {feed_token.doctor.user.get_full_name()}" if feed_token.doctor_id
+        else feed_token.clinic.name
+    )
+    yield ''.join(fold_line(line) for line in [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//MedFlow//Agenda//FR',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape_text(f"MedFlow - {name}")}',
+    ])
+
+    include_doctor = not feed_token.doctor_id
+    queryset = appointments.select_related(
+        'patient__user', 'doctor__user', 'service'
+    ).order_by('appointment_date', 'id')
+    last = None
+    while True:
+        page = queryset
+        if last is not None:
+            page = page.filter(
+                Q(appointment_date__gt=last[0]) | Q(appointment_date=last[0], id__gt=last[1])
+            )
+        page = list(page[:page_size])
+        if not page:
+            break
+        last = (page[-1].appointment_date, page[-1].id)
+        yield ''.join(format_event(apt, include_doctor) for apt in page)
+
+    yield fold_line('END:VCALENDAR')
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.archive import BATCH_SIZE, archive_messages
+
+
+class Command(BaseCommand):
+    """
+    Déplace les messages anciens (MESSAGE_ARCHIVE_DAYS) vers la table
+    d'archive, par lots transactionnels
+    """
+    help = "Archive les messages anciens"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Âge minimal en jours (par défaut: MESSAGE_ARCHIVE_DAYS)")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Nombre de messages par lot")
+        parser.add_argument('--dry-run', action='store_true', help="Compter sans modifier")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size doit être positif")
+
+        try:
+            count = archive_messages(
+                days=options['days'],
+                batch_size=options['batch_size'],
+                dry_run=options['dry_run']
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{count} message(s) archivé(s)" + (" (simulation)" if options['dry_run'] else "")
+        ))
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core.freebusy import compute_bitmaps, from_bytes, to_bytes
+from core.models import Doctor, DoctorFreeBusy
+
+
+class Command(BaseCommand):
+    """
+    Reconstruit ou vérifie la table d'occupation des médecins (DoctorFreeBusy)
+    à partir des rendez-vous actifs
+    """
+    help = "Reconstruit ou vérifie la table d'occupation des médecins"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help="Vérifier sans modifier")
+        parser.add_argument('--doctor', type=int, help="ID du médecin (par défaut: tous)")
+        parser.add_argument('--from', dest='start', help="Premier jour YYYY-MM-DD (par défaut: aujourd'hui)")
+        parser.add_argument('--days', type=int, default=365, help="Nombre de jours à traiter")
+
+    def handle(self, *args, **options):
+        try:
+            start_day = (
+                datetime.strptime(options['start'], '%Y-%m-%d').date()
+                if options['start'] else timezone.localdate()
+            )
+        except ValueError:
+            raise CommandError("--from doit être au format YYYY-MM-DD")
+        end_day = start_day + timedelta(days=options['days'] - 1)
+
+        doctors = Doctor.objects.all()
+        if options['doctor']:
+            doctors = doctors.filter(id=options['doctor'])
+        doctor_ids = list(doctors.values_list('id', flat=True))
+
+        expected = compute_bitmaps(doctor_ids, start_day, end_day)
+        stored = DoctorFreeBusy.objects.filter(
+            doctor_id__in=doctor_ids,
+            day__gte=start_day,
+            day__lte=end_day
+        )
+
+        if options['verify']:
+            actual = {
+                (doctor_id, day): from_bytes(busy)
+                for doctor_id, day, busy in stored.values_list('doctor_id', 'day', 'busy')
+            }
+            mismatches = [
+                key for key in set(expected) | set(actual)
+                if expected.get(key, 0) != actual.get(key, 0)
+            ]
+            for doctor_id, day in sorted(mismatches)[:20]:
+                self.stdout.write(f"Écart: médecin {doctor_id} le {day}")
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} journée(s) incorrecte(s)")
+            self.stdout.write(self.style.SUCCESS(f"{len(expected)} journée(s) vérifiée(s), aucun écart"))
+            return
+
+        with transaction.atomic():
+            stored.delete()
+            DoctorFreeBusy.objects.bulk_create([
+                DoctorFreeBusy(doctor_id=doctor_id, day=day, busy=to_bytes(bitmap))
+                for (doctor_id, day), bitmap in expected.items()
+            ], batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(expected)} journée(s) reconstruite(s) pour {len(doctor_ids)} médecin(s)"
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.search import rebuild_index
+
+
+class Command(BaseCommand):
+    """
+    Reconstruit l'index plein texte des messages (core_message_fts)
+    """
+    help = "Reconstruit l'index de recherche des messages"
+
+    def handle(self, *args, **options):
+        if not rebuild_index():
+            raise CommandError("L'index plein texte n'est disponible que sous SQLite")
+        self.stdout.write(self.style.SUCCESS("Index de recherche des messages reconstruit"))
@@ -0,0 +1,40 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.reminders import BATCH_SIZE, dispatch_reminders
+
+
+class Command(BaseCommand):
+    """
+    Envoie les rappels des rendez-vous à venir par email
+    Peut être lancé par cron ou en boucle (--interval), y compris en
+    plusieurs exemplaires simultanés.
+    """
+    help = "Envoie les rappels de rendez-vous par email"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, help="Délai de rappel en heures (par défaut: REMINDER_LEAD_HOURS)")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Nombre de rendez-vous par lot")
+        parser.add_argument('--dry-run', action='store_true', help="Compter les rappels sans les envoyer")
+        parser.add_argument('--interval', type=int, help="Relancer l'envoi toutes les N secondes")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size doit être positif")
+        lead = timedelta(hours=options['hours']) if options['hours'] else None
+
+        while True:
+            totals = dispatch_reminders(
+                lead=lead,
+                batch_size=options['batch_size'],
+                dry_run=options['dry_run']
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"{totals['sent']} rappel(s) envoyé(s), {totals['skipped']} sans email"
+                + (" (simulation)" if options['dry_run'] else "")
+            ))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
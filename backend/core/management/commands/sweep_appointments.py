@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.status_sweep import CHUNK_SIZE, sweep_appointments
+
+
+class Command(BaseCommand):
+    """
+    Clôture les rendez-vous passés restés actifs (absent / complété selon
+    APPOINTMENT_SWEEP_RULES), par lots de requêtes UPDATE
+    """
+    help = "Clôture les rendez-vous passés restés actifs"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-minutes', type=int, help="Délai après la fin du rendez-vous (par défaut: APPOINTMENT_SWEEP_GRACE_MINUTES)")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Nombre de rendez-vous par requête")
+        parser.add_argument('--dry-run', action='store_true', help="Compter sans modifier")
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size doit être positif")
+        grace = timedelta(minutes=options['grace_minutes']) if options['grace_minutes'] is not None else None
+
+        try:
+            counts = sweep_appointments(
+                grace=grace,
+                chunk_size=options['chunk_size'],
+                dry_run=options['dry_run']
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        for label, count in counts.items():
+            self.stdout.write(f"{label} : {count} rendez-vous")
+        self.stdout.write(self.style.SUCCESS(
+            f"{sum(counts.values())} rendez-vous clôturé(s)" + (" (simulation)" if options['dry_run'] else "")
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.holds import sweep_expired
+
+
+class Command(BaseCommand):
+    """
+    Supprime en une seule requête les réservations temporaires expirées
+    (à lancer régulièrement, par exemple toutes les minutes via cron)
+    """
+    help = "Supprime les réservations temporaires de créneaux expirées"
+
+    def handle(self, *args, **options):
+        deleted = sweep_expired()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} réservation(s) expirée(s) supprimée(s)"))
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:12
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def fill_end_date(apps, schema_editor):
+    """Calcule end_date pour les rendez-vous existants"""
+    Appointment = apps.get_model('core', 'Appointment')
+    batch = []
+    for apt in Appointment.objects.only('id', 'appointment_date', 'duration').iterator(chunk_size=1000):
+        apt.end_date = apt.appointment_date + timedelta(minutes=apt.duration or 0)
+        batch.append(apt)
+        if len(batch) >= 1000:
+            Appointment.objects.bulk_update(batch, ['end_date'])
+            batch = []
+    if batch:
+        Appointment.objects.bulk_update(batch, ['end_date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_prescription_prescriptionmedication_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='end_date',
+            field=models.DateTimeField(editable=False, help_text='Calculée à partir de la date et de la durée', null=True, verbose_name='Date et heure de fin'),
+        ),
+        migrations.RunPython(fill_end_date, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='appointment',
+            name='end_date',
+            field=models.DateTimeField(editable=False, help_text='Calculée à partir de la date et de la durée', verbose_name='Date et heure de fin'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', 'end_date', 'appointment_date'], name='core_appoin_doctor__3d5e3f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', 'end_date', 'appointment_date'], name='core_appoin_patient_f4a2fe_idx'),
+        ),
+    ]
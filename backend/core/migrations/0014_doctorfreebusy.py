@@ -0,0 +1,87 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:48
+
+from datetime import datetime, time, timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# Copie figée du calcul de core.freebusy : la migration ne doit pas dépendre
+# du code applicatif, qui peut évoluer après elle
+BUCKET_MINUTES = 5
+BUCKETS_PER_DAY = 24 * 60 // BUCKET_MINUTES  # 288 tranches
+BITMAP_BYTES = BUCKETS_PER_DAY // 8  # 36 octets
+
+
+def interval_buckets(start, end):
+    """Découpe un intervalle en (jour local, première tranche, dernière tranche exclue)"""
+    start = timezone.localtime(start)
+    end = timezone.localtime(end)
+    result = []
+    day = start.date()
+    while True:
+        day_start = timezone.make_aware(datetime.combine(day, time.min))
+        first = max(0, int((start - day_start).total_seconds() // 60) // BUCKET_MINUTES)
+        end_minutes = (end - day_start).total_seconds() / 60
+        last = min(BUCKETS_PER_DAY, -int(-end_minutes // BUCKET_MINUTES))
+        if last > first:
+            result.append((day, first, last))
+        if end_minutes <= 24 * 60:
+            return result
+        day += timedelta(days=1)
+
+
+def bitmaps_for_intervals(intervals):
+    """Construit les bitmaps {jour: int} d'une liste d'intervalles (début, fin)"""
+    bitmaps = {}
+    for start, end in intervals:
+        for day, first, last in interval_buckets(start, end):
+            bitmaps[day] = bitmaps.get(day, 0) | (((1 << (last - first)) - 1) << first)
+    return bitmaps
+
+
+def build_free_busy(apps, schema_editor):
+    """Construit l'occupation des médecins pour les rendez-vous à venir"""
+    Appointment = apps.get_model('core', 'Appointment')
+    DoctorFreeBusy = apps.get_model('core', 'DoctorFreeBusy')
+
+    intervals = {}
+    rows = Appointment.objects.filter(
+        status__in=['scheduled', 'confirmed', 'in_progress'],
+        end_date__gt=timezone.now()
+    ).values_list('doctor_id', 'appointment_date', 'end_date')
+    for doctor_id, start, end in rows.iterator():
+        intervals.setdefault(doctor_id, []).append((start, end))
+
+    DoctorFreeBusy.objects.bulk_create([
+        DoctorFreeBusy(doctor_id=doctor_id, day=day, busy=bitmap.to_bytes(BITMAP_BYTES, 'little'))
+        for doctor_id, doctor_intervals in intervals.items()
+        for day, bitmap in bitmaps_for_intervals(doctor_intervals).items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_appointment_end_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoctorFreeBusy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Jour')),
+                ('busy', models.BinaryField(max_length=36, verbose_name='Tranches occupées')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Date de modification')),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='free_busy', to='core.doctor', verbose_name='Médecin')),
+            ],
+            options={
+                'verbose_name': 'Occupation du médecin',
+                'verbose_name_plural': 'Occupations des médecins',
+                'unique_together': {('doctor', 'day')},
+            },
+        ),
+        migrations.RunPython(build_free_busy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_doctorfreebusy'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='series_id',
+            field=models.UUIDField(blank=True, db_index=True, help_text="Identifiant commun aux rendez-vous d'une série récurrente", null=True, verbose_name='Série'),
+        ),
+    ]
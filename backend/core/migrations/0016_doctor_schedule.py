@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_appointment_series_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoctorScheduleException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('start_time', models.TimeField(blank=True, null=True, verbose_name='Heure de début')),
+                ('end_time', models.TimeField(blank=True, null=True, verbose_name='Heure de fin')),
+                ('reason', models.CharField(blank=True, max_length=255, verbose_name='Motif')),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedule_exceptions', to='core.doctor', verbose_name='Médecin')),
+            ],
+            options={
+                'verbose_name': 'Exception de planning',
+                'verbose_name_plural': 'Exceptions de planning',
+                'ordering': ['date', 'start_time'],
+                'indexes': [models.Index(fields=['doctor', 'date'], name='core_doctor_doctor__e23317_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DoctorWorkingHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Lundi'), (1, 'Mardi'), (2, 'Mercredi'), (3, 'Jeudi'), (4, 'Vendredi'), (5, 'Samedi'), (6, 'Dimanche')], verbose_name='Jour de la semaine')),
+                ('start_time', models.TimeField(verbose_name='Heure de début')),
+                ('end_time', models.TimeField(verbose_name='Heure de fin')),
+                ('is_break', models.BooleanField(default=False, verbose_name='Pause')),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='working_hours', to='core.doctor', verbose_name='Médecin')),
+            ],
+            options={
+                'verbose_name': 'Horaire du médecin',
+                'verbose_name_plural': 'Horaires des médecins',
+                'ordering': ['weekday', 'start_time'],
+                'indexes': [models.Index(fields=['doctor', 'weekday'], name='core_doctor_doctor__ae35be_idx')],
+            },
+        ),
+    ]
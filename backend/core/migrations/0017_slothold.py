@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 13:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_doctor_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlotHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateTimeField(verbose_name='Début')),
+                ('end_date', models.DateTimeField(verbose_name='Fin')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Expire le')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_holds', to='core.doctor', verbose_name='Médecin')),
+                ('held_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_holds', to=settings.AUTH_USER_MODEL, verbose_name='Réservé par')),
+            ],
+            options={
+                'verbose_name': 'Réservation temporaire',
+                'verbose_name_plural': 'Réservations temporaires',
+                'indexes': [models.Index(fields=['doctor', 'end_date', 'start_date'], name='core_slotho_doctor__d95b19_idx')],
+                'constraints': [models.UniqueConstraint(fields=('doctor', 'start_date'), name='unique_slot_hold')],
+            },
+        ),
+    ]
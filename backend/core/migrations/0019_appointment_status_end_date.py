@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 14:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_appointment_reminder_due_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['status', 'end_date'], name='core_appoin_status_145d09_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_appointment_status_end_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarFeedToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token_hash', models.CharField(max_length=64, unique=True, verbose_name='Empreinte du jeton')),
+                ('revoked_at', models.DateTimeField(blank=True, null=True, verbose_name='Révoqué le')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('clinic', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='calendar_feed_tokens', to='core.clinic', verbose_name='Clinique')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='calendar_feed_tokens', to=settings.AUTH_USER_MODEL, verbose_name='Créé par')),
+                ('doctor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='calendar_feed_tokens', to='core.doctor', verbose_name='Médecin')),
+            ],
+            options={
+                'verbose_name': 'Jeton de flux agenda',
+                'verbose_name_plural': 'Jetons de flux agenda',
+                'constraints': [models.CheckConstraint(condition=models.Q(models.Q(('clinic__isnull', True), ('doctor__isnull', False)), models.Q(('clinic__isnull', False), ('doctor__isnull', True)), _connector='OR'), name='calendar_feed_single_scope')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_calendarfeedtoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('specialization', models.CharField(blank=True, max_length=100, verbose_name='Spécialisation')),
+                ('duration', models.IntegerField(default=30, help_text='Durée en minutes', verbose_name='Durée')),
+                ('earliest', models.DateTimeField(verbose_name='Au plus tôt')),
+                ('latest', models.DateTimeField(help_text='Le rendez-vous doit se terminer avant cette date', verbose_name='Au plus tard')),
+                ('reason', models.TextField(blank=True, null=True, verbose_name='Raison de la visite')),
+                ('status', models.CharField(choices=[('waiting', 'En attente'), ('booked', 'Rendez-vous attribué'), ('cancelled', 'Annulée')], default='waiting', max_length=20, verbose_name='Statut')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Date de modification')),
+                ('appointment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='waitlist_entries', to='core.appointment', verbose_name='Rendez-vous attribué')),
+                ('clinic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='core.clinic', verbose_name='Clinique')),
+                ('doctor', models.ForeignKey(blank=True, help_text='Vide pour accepter tout médecin de la spécialité', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='core.doctor', verbose_name='Médecin')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='core.patient', verbose_name='Patient')),
+                ('service', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='waitlist_entries', to='core.service', verbose_name='Service')),
+            ],
+            options={
+                'verbose_name': "Demande en liste d'attente",
+                'verbose_name_plural': "Liste d'attente",
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['doctor', 'status', 'earliest'], name='core_waitli_doctor__5f1a5c_idx'), models.Index(fields=['clinic', 'specialization', 'status', 'earliest'], name='core_waitli_clinic__ade4ff_idx')],
+            },
+        ),
+    ]
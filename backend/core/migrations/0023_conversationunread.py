@@ -0,0 +1,57 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_unread_counters(apps, schema_editor):
+    """Initialise les compteurs à partir des messages non lus existants"""
+    Conversation = apps.get_model('core', 'Conversation')
+    Message = apps.get_model('core', 'Message')
+    ConversationUnread = apps.get_model('core', 'ConversationUnread')
+
+    unread_by_sender = {}
+    totals = {}
+    for conversation_id, sender_id, count in Message.objects.filter(is_read=False).values_list(
+        'conversation_id', 'sender_id'
+    ).annotate(count=Count('id')).order_by():
+        unread_by_sender[(conversation_id, sender_id)] = count
+        totals[conversation_id] = totals.get(conversation_id, 0) + count
+
+    counters = []
+    Participant = Conversation.participants.through
+    for conversation_id, user_id in Participant.objects.filter(
+        conversation_id__in=list(totals)
+    ).values_list('conversation_id', 'user_id').iterator(chunk_size=1000):
+        count = totals[conversation_id] - unread_by_sender.get((conversation_id, user_id), 0)
+        if count:
+            counters.append(ConversationUnread(user_id=user_id, conversation_id=conversation_id, count=count))
+    ConversationUnread.objects.bulk_create(counters, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_message_sync_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationUnread',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Messages non lus')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Date de modification')),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unread_counters', to='core.conversation', verbose_name='Conversation')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unread_counters', to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+            ],
+            options={
+                'verbose_name': 'Compteur de messages non lus',
+                'verbose_name_plural': 'Compteurs de messages non lus',
+                'unique_together': {('user', 'conversation')},
+            },
+        ),
+        migrations.RunPython(fill_unread_counters, migrations.RunPython.noop),
+    ]
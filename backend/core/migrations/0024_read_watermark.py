@@ -0,0 +1,72 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:20
+
+from django.db import migrations, models
+from django.db.models import Max, Min
+
+
+def fill_read_watermarks(apps, schema_editor):
+    """
+    Initialise le dernier message lu de chaque participant à partir de
+    is_read : juste avant le premier message non lu reçu, sinon le dernier
+    message de la conversation
+    """
+    Conversation = apps.get_model('core', 'Conversation')
+    Message = apps.get_model('core', 'Message')
+    ConversationUnread = apps.get_model('core', 'ConversationUnread')
+
+    last_ids = dict(Message.objects.values_list('conversation_id').annotate(last_id=Max('id')).order_by())
+    first_unread = {}
+    for conversation_id, sender_id, first_id in Message.objects.filter(is_read=False).values_list(
+        'conversation_id', 'sender_id'
+    ).annotate(first_id=Min('id')).order_by():
+        first_unread.setdefault(conversation_id, {})[sender_id] = first_id
+
+    existing = {
+        (row.user_id, row.conversation_id): row
+        for row in ConversationUnread.objects.all().iterator(chunk_size=1000)
+    }
+    to_create, to_update = [], []
+    Participant = Conversation.participants.through
+    for conversation_id, user_id in Participant.objects.filter(
+        conversation_id__in=list(last_ids)
+    ).values_list('conversation_id', 'user_id').iterator(chunk_size=1000):
+        unread_ids = [
+            first_id for sender_id, first_id in first_unread.get(conversation_id, {}).items()
+            if sender_id != user_id
+        ]
+        watermark = min(unread_ids) - 1 if unread_ids else last_ids[conversation_id]
+        row = existing.get((user_id, conversation_id))
+        if row is None:
+            to_create.append(ConversationUnread(
+                user_id=user_id, conversation_id=conversation_id, last_read_message_id=watermark
+            ))
+        else:
+            row.last_read_message_id = watermark
+            to_update.append(row)
+    ConversationUnread.objects.bulk_create(to_create, batch_size=1000)
+    ConversationUnread.objects.bulk_update(to_update, ['last_read_message_id'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_conversationunread'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversationunread',
+            name='last_read_message_id',
+            field=models.PositiveBigIntegerField(default=0, verbose_name='Dernier message lu'),
+        ),
+        migrations.AddField(
+            model_name='conversationunread',
+            name='read_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Date de lecture'),
+        ),
+        migrations.AddIndex(
+            model_name='conversationunread',
+            index=models.Index(fields=['conversation', 'read_at'], name='core_conver_convers_7ee14a_idx'),
+        ),
+        migrations.RunPython(fill_read_watermarks, migrations.RunPython.noop),
+    ]
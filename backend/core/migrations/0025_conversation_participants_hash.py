@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-18 17:52
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def fill_participants_hash(apps, schema_editor):
+    """
+    Calcule l'empreinte des participants des conversations existantes
+    Parmi des conversations actives en double, seule la plus récente reçoit
+    l'empreinte (les autres restent accessibles mais ne sont plus proposées).
+    """
+    Conversation = apps.get_model('core', 'Conversation')
+    Participant = Conversation.participants.through
+
+    members = {}
+    for conversation_id, user_id in Participant.objects.values_list(
+        'conversation_id', 'user_id'
+    ).iterator(chunk_size=1000):
+        members.setdefault(conversation_id, []).append(user_id)
+
+    seen = set()
+    conversations = []
+    for conversation in Conversation.objects.order_by('-updated_at', '-id').iterator(chunk_size=1000):
+        canonical = ','.join(str(user_id) for user_id in sorted(set(members.get(conversation.id, []))))
+        signature = hashlib.sha256(canonical.encode()).hexdigest()
+        if conversation.is_active:
+            if (conversation.clinic_id, signature) in seen:
+                continue
+            seen.add((conversation.clinic_id, signature))
+        conversation.participants_hash = signature
+        conversations.append(conversation)
+    Conversation.objects.bulk_update(conversations, ['participants_hash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_read_watermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='participants_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, verbose_name='Empreinte des participants'),
+        ),
+        migrations.RunPython(fill_participants_hash, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='conversation',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('clinic', 'participants_hash'), name='conversation_unique_participants'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:25
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def compact_deleted_for(apps, schema_editor):
+    """
+    Remplace les lignes deleted_for par un seuil par utilisateur et
+    conversation : la suppression d'une conversation marquait tous ses
+    messages, le seuil est donc le plus grand message marqué
+    """
+    Message = apps.get_model('core', 'Message')
+    ConversationUnread = apps.get_model('core', 'ConversationUnread')
+    DeletedFor = Message.deleted_for.through
+
+    cleared = {
+        (user_id, conversation_id): last_id
+        for user_id, conversation_id, last_id in DeletedFor.objects.values_list(
+            'user_id', 'message__conversation_id'
+        ).annotate(last_id=Max('message_id')).order_by()
+    }
+    if not cleared:
+        return
+
+    to_update = []
+    for row in ConversationUnread.objects.all().iterator(chunk_size=1000):
+        last_id = cleared.pop((row.user_id, row.conversation_id), None)
+        if last_id is not None:
+            row.cleared_message_id = last_id
+            row.last_read_message_id = max(row.last_read_message_id, last_id)
+            row.count = Message.objects.filter(
+                conversation_id=row.conversation_id, id__gt=row.last_read_message_id
+            ).exclude(sender_id=row.user_id).count()
+            to_update.append(row)
+    ConversationUnread.objects.bulk_update(
+        to_update, ['cleared_message_id', 'last_read_message_id', 'count'], batch_size=1000
+    )
+    ConversationUnread.objects.bulk_create([
+        ConversationUnread(
+            user_id=user_id, conversation_id=conversation_id,
+            cleared_message_id=last_id, last_read_message_id=last_id
+        )
+        for (user_id, conversation_id), last_id in cleared.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_conversation_participants_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversationunread',
+            name='cleared_message_id',
+            field=models.PositiveBigIntegerField(default=0, verbose_name="Historique effacé jusqu'au message"),
+        ),
+        migrations.RunPython(compact_deleted_for, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='message',
+            name='deleted_for',
+        ),
+    ]
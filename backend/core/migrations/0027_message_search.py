@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-18 18:57
+
+from django.db import migrations
+
+
+FTS_STATEMENTS = [
+    """
+    CREATE VIRTUAL TABLE core_message_fts USING fts5(
+        content, content='core_message', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER core_message_fts_insert AFTER INSERT ON core_message BEGIN
+        INSERT INTO core_message_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER core_message_fts_delete AFTER DELETE ON core_message BEGIN
+        INSERT INTO core_message_fts(core_message_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER core_message_fts_update AFTER UPDATE OF content ON core_message BEGIN
+        INSERT INTO core_message_fts(core_message_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO core_message_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    "INSERT INTO core_message_fts(core_message_fts) VALUES ('rebuild')",
+]
+
+DROP_STATEMENTS = [
+    "DROP TRIGGER IF EXISTS core_message_fts_update",
+    "DROP TRIGGER IF EXISTS core_message_fts_delete",
+    "DROP TRIGGER IF EXISTS core_message_fts_insert",
+    "DROP TABLE IF EXISTS core_message_fts",
+]
+
+
+def create_fts_index(apps, schema_editor):
+    """Index FTS5 des messages (SQLite uniquement)"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in FTS_STATEMENTS:
+        schema_editor.execute(statement)
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_STATEMENTS:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_cleared_watermark'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
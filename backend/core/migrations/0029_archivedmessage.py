@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_message_history_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedMessage',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID du message')),
+                ('compressed_content', models.BinaryField(verbose_name='Contenu compressé')),
+                ('created_at', models.DateTimeField(verbose_name='Date de création')),
+                ('updated_at', models.DateTimeField(verbose_name='Date de modification')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name="Date d'archivage")),
+                ('conversation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_messages', to='core.conversation', verbose_name='Conversation')),
+                ('sender', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_messages', to=settings.AUTH_USER_MODEL, verbose_name='Expéditeur')),
+            ],
+            options={
+                'verbose_name': 'Message archivé',
+                'verbose_name_plural': 'Messages archivés',
+                'indexes': [models.Index(fields=['conversation', 'created_at', 'id'], name='core_archiv_convers_4ee5c0_idx')],
+            },
+        ),
+    ]
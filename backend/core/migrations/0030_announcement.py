@@ -0,0 +1,62 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0029_archivedmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Announcement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255, verbose_name='Titre')),
+                ('content', models.TextField(verbose_name='Contenu')),
+                ('audience', models.CharField(choices=[('patients', 'Patients'), ('staff', 'Personnel'), ('all', 'Tous')], default='patients', max_length=20, verbose_name='Destinataires')),
+                ('recipient_count', models.PositiveIntegerField(default=0, verbose_name='Nombre de destinataires')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('author', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='announcements', to=settings.AUTH_USER_MODEL, verbose_name='Auteur')),
+                ('clinic', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='announcements', to='core.clinic', verbose_name='Clinique')),
+            ],
+            options={
+                'verbose_name': 'Annonce',
+                'verbose_name_plural': 'Annonces',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AnnouncementDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('read_at', models.DateTimeField(blank=True, null=True, verbose_name='Date de lecture')),
+                ('announcement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='core.announcement', verbose_name='Annonce')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='announcement_deliveries', to=settings.AUTH_USER_MODEL, verbose_name='Destinataire')),
+            ],
+            options={
+                'verbose_name': "Remise d'annonce",
+                'verbose_name_plural': "Remises d'annonces",
+            },
+        ),
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['clinic', '-created_at'], name='core_announ_clinic__0ff2e1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='announcementdelivery',
+            index=models.Index(fields=['user', 'announcement'], name='core_announ_user_id_46a816_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='announcementdelivery',
+            index=models.Index(fields=['announcement', 'read_at'], name='core_announ_announc_bcbec4_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='announcementdelivery',
+            unique_together={('announcement', 'user')},
+        ),
+    ]
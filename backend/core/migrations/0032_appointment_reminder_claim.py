@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 21:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_message_attachments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='reminder_claim',
+            field=models.UUIDField(blank=True, editable=False, help_text="Exécution de l'envoi des rappels qui a pris ce rendez-vous en charge", null=True, verbose_name='Prise en charge du rappel'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0032_appointment_reminder_claim'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='message',
+            name='core_messag_is_read_b327c3_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='message',
+            name='core_messag_convers_57fc9a_idx',
+        ),
+        migrations.RemoveField(
+            model_name='message',
+            name='is_read',
+        ),
+        migrations.RemoveField(
+            model_name='message',
+            name='read_at',
+        ),
+    ]
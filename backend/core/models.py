@@ -1,3 +1,7 @@
+import hashlib
+import zlib
+from datetime import timedelta
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
@@ -319,14 +323,111 @@ class Doctor(models.Model):
         verbose_name="Date de modification"
     )
 
+    AVAILABILITY_FIELDS = ('available_days', 'available_hours', 'is_available', 'is_active')
+
     def __str__(self):
         return f"Dr. {self.user.get_full_name()} - {self.specialization}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Garder les valeurs chargées pour invalider le cache des créneaux
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     class Meta:
         verbose_name = "Médecin"
         verbose_name_plural = "Médecins"
 
 
+class DoctorWorkingHours(models.Model):
+    """
+    Plage horaire hebdomadaire d'un médecin
+    Une plage marquée is_break est retirée des plages de travail du même jour.
+    """
+    WEEKDAY_CHOICES = [
+        (0, 'Lundi'),
+        (1, 'Mardi'),
+        (2, 'Mercredi'),
+        (3, 'Jeudi'),
+        (4, 'Vendredi'),
+        (5, 'Samedi'),
+        (6, 'Dimanche'),
+    ]
+
+    doctor = models.ForeignKey(
+        Doctor,
+        on_delete=models.CASCADE,
+        related_name='working_hours',
+        verbose_name="Médecin"
+    )
+    weekday = models.PositiveSmallIntegerField(
+        choices=WEEKDAY_CHOICES,
+        verbose_name="Jour de la semaine"
+    )
+    start_time = models.TimeField(verbose_name="Heure de début")
+    end_time = models.TimeField(verbose_name="Heure de fin")
+    is_break = models.BooleanField(
+        default=False,
+        verbose_name="Pause"
+    )
+
+    def __str__(self):
+        label = "Pause" if self.is_break else "Travail"
+        return f"{label} {self.get_weekday_display()} {self.start_time}-{self.end_time}"
+
+    class Meta:
+        verbose_name = "Horaire du médecin"
+        verbose_name_plural = "Horaires des médecins"
+        ordering = ['weekday', 'start_time']
+        indexes = [
+            models.Index(fields=['doctor', 'weekday']),
+        ]
+
+
+class DoctorScheduleException(models.Model):
+    """
+    Exception ponctuelle au planning d'un médecin pour une date
+    Sans heures, le médecin est absent toute la journée ; sinon les plages
+    de la date remplacent les horaires habituels de ce jour.
+    """
+    doctor = models.ForeignKey(
+        Doctor,
+        on_delete=models.CASCADE,
+        related_name='schedule_exceptions',
+        verbose_name="Médecin"
+    )
+    date = models.DateField(verbose_name="Date")
+    start_time = models.TimeField(
+        null=True,
+        blank=True,
+        verbose_name="Heure de début"
+    )
+    end_time = models.TimeField(
+        null=True,
+        blank=True,
+        verbose_name="Heure de fin"
+    )
+    reason = models.CharField(
+        max_length=255,
+        blank=True,
+        verbose_name="Motif"
+    )
+
+    def __str__(self):
+        if self.start_time is None:
+            return f"Absence {self.date}"
+        return f"Horaire exceptionnel {self.date} {self.start_time}-{self.end_time}"
+
+    class Meta:
+        verbose_name = "Exception de planning"
+        verbose_name_plural = "Exceptions de planning"
+        ordering = ['date', 'start_time']
+        indexes = [
+            models.Index(fields=['doctor', 'date']),
+        ]
+
+
 class Receptionist(models.Model):
     """
     Modèle Receptionist pour la gestion de l'accueil
@@ -502,6 +603,11 @@ class Appointment(models.Model):
         help_text="Durée en minutes",
         verbose_name="Durée"
     )
+    end_date = models.DateTimeField(
+        editable=False,
+        help_text="Calculée à partir de la date et de la durée",
+        verbose_name="Date et heure de fin"
+    )
     status = models.CharField(
         max_length=20,
         choices=STATUS_CHOICES,
@@ -522,6 +628,20 @@ class Appointment(models.Model):
         default=False,
         verbose_name="Rappel envoyé"
     )
+    reminder_claim = models.UUIDField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Exécution de l'envoi des rappels qui a pris ce rendez-vous en charge",
+        verbose_name="Prise en charge du rappel"
+    )
+    series_id = models.UUIDField(
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="Identifiant commun aux rendez-vous d'une série récurrente",
+        verbose_name="Série"
+    )
     hidden_for_patient = models.BooleanField(
         default=False,
         verbose_name="Masqué pour le patient",
@@ -546,9 +666,30 @@ class Appointment(models.Model):
         verbose_name="Date de modification"
     )
 
+    ACTIVE_STATUSES = ['scheduled', 'confirmed', 'in_progress']
+
     def __str__(self):
         return f"RDV {self.patient.user.get_full_name()} - {self.appointment_date}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Garder les valeurs chargées pour mettre à jour l'occupation des médecins
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def compute_end_date(self):
+        """Calcule la date de fin à partir de la date de début et de la durée"""
+        return self.appointment_date + timedelta(minutes=self.duration or 0)
+
+    def save(self, *args, **kwargs):
+        # Maintenir la colonne end_date pour les requêtes de chevauchement
+        self.end_date = self.compute_end_date()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'end_date' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['end_date']
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = "Rendez-vous"
         verbose_name_plural = "Rendez-vous"
@@ -557,12 +698,272 @@ class Appointment(models.Model):
             models.Index(fields=['appointment_date']),
             models.Index(fields=['patient', 'appointment_date']),
             models.Index(fields=['doctor', 'appointment_date']),
+            models.Index(fields=['doctor', 'end_date', 'appointment_date']),
+            models.Index(fields=['patient', 'end_date', 'appointment_date']),
+            models.Index(fields=['status', 'end_date']),
+            # Rappels à envoyer : index partiel sur les rendez-vous sans rappel
+            models.Index(
+                fields=['appointment_date', 'id'],
+                condition=models.Q(reminder_sent=False),
+                name='appointment_reminder_due_idx'
+            ),
+        ]
+
+
+class WaitlistEntry(models.Model):
+    """
+    Demande de rendez-vous en liste d'attente
+
+    Quand un rendez-vous est annulé, le créneau libéré est attribué à la
+    première demande compatible (médecin ou spécialité, fenêtre horaire et
+    durée), dans la transaction d'annulation.
+    """
+    STATUS_CHOICES = [
+        ('waiting', 'En attente'),
+        ('booked', 'Rendez-vous attribué'),
+        ('cancelled', 'Annulée'),
+    ]
+
+    patient = models.ForeignKey(
+        Patient,
+        on_delete=models.CASCADE,
+        related_name='waitlist_entries',
+        verbose_name="Patient"
+    )
+    clinic = models.ForeignKey(
+        Clinic,
+        on_delete=models.CASCADE,
+        related_name='waitlist_entries',
+        verbose_name="Clinique"
+    )
+    doctor = models.ForeignKey(
+        Doctor,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='waitlist_entries',
+        help_text="Vide pour accepter tout médecin de la spécialité",
+        verbose_name="Médecin"
+    )
+    specialization = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name="Spécialisation"
+    )
+    service = models.ForeignKey(
+        Service,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='waitlist_entries',
+        verbose_name="Service"
+    )
+    duration = models.IntegerField(
+        default=30,
+        help_text="Durée en minutes",
+        verbose_name="Durée"
+    )
+    earliest = models.DateTimeField(
+        verbose_name="Au plus tôt"
+    )
+    latest = models.DateTimeField(
+        help_text="Le rendez-vous doit se terminer avant cette date",
+        verbose_name="Au plus tard"
+    )
+    reason = models.TextField(
+        blank=True,
+        null=True,
+        verbose_name="Raison de la visite"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='waiting',
+        verbose_name="Statut"
+    )
+    appointment = models.ForeignKey(
+        Appointment,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='waitlist_entries',
+        verbose_name="Rendez-vous attribué"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Date de création"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Date de modification"
+    )
+
+    def __str__(self):
+        return f"Attente {self.patient.user.get_full_name()} - {self.earliest}"
+
+    class Meta:
+        verbose_name = "Demande en liste d'attente"
+        verbose_name_plural = "Liste d'attente"
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['doctor', 'status', 'earliest']),
+            models.Index(fields=['clinic', 'specialization', 'status', 'earliest']),
+        ]
+
+
+class DoctorFreeBusy(models.Model):
+    """
+    Occupation d'un médecin pour une journée, en tranches de 5 minutes
+
+    `busy` est un bitmap de 288 bits (36 octets) : le bit i est à 1 si un
+    rendez-vous actif occupe la tranche [i*5, (i+1)*5[ minutes après minuit
+    (heure locale). Une journée sans ligne est entièrement libre.
+    """
+    doctor = models.ForeignKey(
+        Doctor,
+        on_delete=models.CASCADE,
+        related_name='free_busy',
+        verbose_name="Médecin"
+    )
+    day = models.DateField(
+        verbose_name="Jour"
+    )
+    busy = models.BinaryField(
+        max_length=36,
+        verbose_name="Tranches occupées"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Date de modification"
+    )
+
+    def __str__(self):
+        return f"Occupation {self.doctor_id} - {self.day}"
+
+    class Meta:
+        verbose_name = "Occupation du médecin"
+        verbose_name_plural = "Occupations des médecins"
+        unique_together = ('doctor', 'day')
+
+
+class SlotHold(models.Model):
+    """
+    Réservation temporaire d'un créneau pendant la saisie d'un rendez-vous
+
+    La contrainte unique (médecin, début) départage les utilisateurs qui
+    choisissent le même créneau : un seul obtient la réservation, les autres
+    sont refusés immédiatement au lieu d'échouer à la validation finale.
+    """
+    doctor = models.ForeignKey(
+        Doctor,
+        on_delete=models.CASCADE,
+        related_name='slot_holds',
+        verbose_name="Médecin"
+    )
+    held_by = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='slot_holds',
+        verbose_name="Réservé par"
+    )
+    start_date = models.DateTimeField(
+        verbose_name="Début"
+    )
+    end_date = models.DateTimeField(
+        verbose_name="Fin"
+    )
+    expires_at = models.DateTimeField(
+        db_index=True,
+        verbose_name="Expire le"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Date de création"
+    )
+
+    def __str__(self):
+        return f"Réservation {self.doctor_id} - {self.start_date}"
+
+    class Meta:
+        verbose_name = "Réservation temporaire"
+        verbose_name_plural = "Réservations temporaires"
+        constraints = [
+            models.UniqueConstraint(fields=['doctor', 'start_date'], name='unique_slot_hold'),
+        ]
+        indexes = [
+            models.Index(fields=['doctor', 'end_date', 'start_date']),
+        ]
+
+
+class CalendarFeedToken(models.Model):
+    """
+    Jeton d'accès à un flux iCalendar (agenda d'un médecin ou d'une clinique)
+
+    Seule l'empreinte SHA-256 du jeton est conservée ; le jeton lui-même
+    n'est affiché qu'à sa création. Un jeton révoqué ne donne plus accès
+    au flux.
+    """
+    token_hash = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name="Empreinte du jeton"
+    )
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='calendar_feed_tokens',
+        verbose_name="Créé par"
+    )
+    doctor = models.ForeignKey(
+        Doctor,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='calendar_feed_tokens',
+        verbose_name="Médecin"
+    )
+    clinic = models.ForeignKey(
+        Clinic,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='calendar_feed_tokens',
+        verbose_name="Clinique"
+    )
+    revoked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Révoqué le"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Date de création"
+    )
+
+    def __str__(self):
+        scope = f"médecin {self.doctor_id}" if self.doctor_id else f"clinique {self.clinic_id}"
+        return f"Flux agenda {scope}"
+
+    class Meta:
+        verbose_name = "Jeton de flux agenda"
+        verbose_name_plural = "Jetons de flux agenda"
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(doctor__isnull=False, clinic__isnull=True)
+                | models.Q(doctor__isnull=True, clinic__isnull=False),
+                name='calendar_feed_single_scope'
+            ),
         ]
 
 
 class Conversation(models.Model):
     """
     Modèle Conversation pour les discussions entre utilisateurs
+
+    `participants_hash` est l'empreinte de l'ensemble des participants,
+    tenue à jour à chaque ajout ou retrait (signal m2m_changed) : une
+    conversation active existante se retrouve par une seule lecture d'index,
+    et la contrainte unique empêche les doublons créés en concurrence.
     """
     clinic = models.ForeignKey(
         Clinic,
@@ -581,6 +982,13 @@ class Conversation(models.Model):
         blank=True,
         verbose_name="Masquée pour"
     )
+    participants_hash = models.CharField(
+        max_length=64,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name="Empreinte des participants"
+    )
     subject = models.CharField(
         max_length=255,
         verbose_name="Sujet"
@@ -601,6 +1009,12 @@ class Conversation(models.Model):
     def __str__(self):
         return f"{self.subject} - {self.clinic.name}"
 
+    @staticmethod
+    def participants_signature(user_ids):
+        """Empreinte SHA-256 canonique d'un ensemble d'utilisateurs"""
+        canonical = ','.join(str(user_id) for user_id in sorted(set(user_ids)))
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
     class Meta:
         verbose_name = "Conversation"
         verbose_name_plural = "Conversations"
@@ -609,6 +1023,13 @@ class Conversation(models.Model):
             models.Index(fields=['clinic', '-updated_at']),
             models.Index(fields=['is_active']),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['clinic', 'participants_hash'],
+                condition=models.Q(is_active=True),
+                name='conversation_unique_participants'
+            ),
+        ]
 
 
 class Message(models.Model):
@@ -627,24 +1048,9 @@ class Message(models.Model):
         related_name='sent_messages',
         verbose_name="Expéditeur"
     )
-    deleted_for = models.ManyToManyField(
-        User,
-        related_name='deleted_messages',
-        blank=True,
-        verbose_name="Supprimé pour"
-    )
     content = models.TextField(
         verbose_name="Contenu"
     )
-    is_read = models.BooleanField(
-        default=False,
-        verbose_name="Lu"
-    )
-    read_at = models.DateTimeField(
-        null=True,
-        blank=True,
-        verbose_name="Date de lecture"
-    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name="Date de création"
@@ -662,9 +1068,304 @@ class Message(models.Model):
         verbose_name_plural = "Messages"
         ordering = ['created_at']
         indexes = [
-            models.Index(fields=['conversation', 'created_at']),
+            models.Index(fields=['conversation', 'created_at', 'id']),
+            models.Index(fields=['conversation', 'id']),
             models.Index(fields=['sender']),
-            models.Index(fields=['is_read']),
+        ]
+
+
+class StoredFile(models.Model):
+    """
+    Fichier stocké par adresse de contenu (empreinte SHA-256)
+
+    Un même contenu envoyé plusieurs fois n'est stocké qu'une fois sur le
+    disque (ATTACHMENTS_ROOT/ab/cd/<sha256>).
+    """
+    sha256 = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name="Empreinte SHA-256"
+    )
+    size = models.PositiveBigIntegerField(
+        verbose_name="Taille (octets)"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Date de création"
+    )
+
+    def __str__(self):
+        return self.sha256
+
+    class Meta:
+        verbose_name = "Fichier stocké"
+        verbose_name_plural = "Fichiers stockés"
+
+
+class MessageAttachment(models.Model):
+    """
+    Pièce jointe d'un message
+
+    Sans contrainte de clé étrangère sur le message : la pièce jointe reste
+    accessible quand le message est déplacé vers l'archive (même id).
+    """
+    message = models.ForeignKey(
+        Message,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='attachments',
+        verbose_name="Message"
+    )
+    conversation = models.ForeignKey(
+        Conversation,
+        on_delete=models.CASCADE,
+        related_name='attachments',
+        verbose_name="Conversation"
+    )
+    uploaded_by = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='message_attachments',
+        verbose_name="Envoyé par"
+    )
+    file = models.ForeignKey(
+        StoredFile,
+        on_delete=models.PROTECT,
+        related_name='attachments',
+        verbose_name="Fichier"
+    )
+    filename = models.CharField(
+        max_length=255,
+        verbose_name="Nom du fichier"
+    )
+    content_type = models.CharField(
+        max_length=100,
+        verbose_name="Type de contenu"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Date de création"
+    )
+
+    def __str__(self):
+        return f"{self.filename} ({self.message_id})"
+
+    class Meta:
+        verbose_name = "Pièce jointe"
+        verbose_name_plural = "Pièces jointes"
+
+
+class ArchivedMessage(models.Model):
+    """
+    Message archivé (stockage froid)
+
+    Les messages anciens sont déplacés de Message vers cette table par la
+    commande archive_messages : même id, contenu compressé (zlib) et aucun
+    des index de lecture de la table chaude. L'historique d'une conversation
+    les relit au-delà des messages chauds.
+    """
+    id = models.BigIntegerField(
+        primary_key=True,
+        verbose_name="ID du message"
+    )
+    conversation = models.ForeignKey(
+        Conversation,
+        on_delete=models.CASCADE,
+        related_name='archived_messages',
+        verbose_name="Conversation"
+    )
+    sender = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_messages',
+        verbose_name="Expéditeur"
+    )
+    compressed_content = models.BinaryField(
+        verbose_name="Contenu compressé"
+    )
+    created_at = models.DateTimeField(
+        verbose_name="Date de création"
+    )
+    updated_at = models.DateTimeField(
+        verbose_name="Date de modification"
+    )
+    archived_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Date d'archivage"
+    )
+
+    @property
+    def content(self):
+        return self.decompress(self.compressed_content)
+
+    @staticmethod
+    def compress(content):
+        return zlib.compress(content.encode('utf-8'), 9)
+
+    @staticmethod
+    def decompress(compressed_content):
+        return zlib.decompress(bytes(compressed_content)).decode('utf-8')
+
+    def __str__(self):
+        return f"Message archivé {self.id} - {self.created_at}"
+
+    class Meta:
+        verbose_name = "Message archivé"
+        verbose_name_plural = "Messages archivés"
+        indexes = [
+            models.Index(fields=['conversation', 'created_at', 'id']),
+        ]
+
+
+class ConversationUnread(models.Model):
+    """
+    État de lecture d'une conversation par utilisateur
+
+    `last_read_message_id` est le dernier message lu par l'utilisateur
+    (accusé de lecture propre à chaque participant, daté par `read_at`) et
+    `count` le nombre dénormalisé de messages non lus : incrémenté à l'envoi
+    d'un message pour chaque destinataire et recalculé quand l'utilisateur
+    lit la conversation. Les messages jusqu'à `cleared_message_id` ont été
+    effacés de l'historique de l'utilisateur (conversation supprimée).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='unread_counters',
+        verbose_name="Utilisateur"
+    )
+    conversation = models.ForeignKey(
+        Conversation,
+        on_delete=models.CASCADE,
+        related_name='unread_counters',
+        verbose_name="Conversation"
+    )
+    last_read_message_id = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name="Dernier message lu"
+    )
+    read_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Date de lecture"
+    )
+    cleared_message_id = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name="Historique effacé jusqu'au message"
+    )
+    count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Messages non lus"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name="Date de modification"
+    )
+
+    def __str__(self):
+        return f"{self.user_id} - {self.conversation_id} : {self.count}"
+
+    class Meta:
+        verbose_name = "Compteur de messages non lus"
+        verbose_name_plural = "Compteurs de messages non lus"
+        unique_together = ('user', 'conversation')
+        indexes = [
+            models.Index(fields=['conversation', 'read_at']),
+        ]
+
+
+class Announcement(models.Model):
+    """
+    Annonce diffusée par une clinique (fermeture, changement d'horaires...)
+
+    L'annonce est stockée une seule fois ; chaque destinataire reçoit une
+    ligne AnnouncementDelivery (état de lecture), créée par lots.
+    """
+    AUDIENCE_CHOICES = [
+        ('patients', 'Patients'),
+        ('staff', 'Personnel'),
+        ('all', 'Tous'),
+    ]
+
+    clinic = models.ForeignKey(
+        Clinic,
+        on_delete=models.CASCADE,
+        related_name='announcements',
+        verbose_name="Clinique"
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='announcements',
+        verbose_name="Auteur"
+    )
+    title = models.CharField(
+        max_length=255,
+        verbose_name="Titre"
+    )
+    content = models.TextField(
+        verbose_name="Contenu"
+    )
+    audience = models.CharField(
+        max_length=20,
+        choices=AUDIENCE_CHOICES,
+        default='patients',
+        verbose_name="Destinataires"
+    )
+    recipient_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Nombre de destinataires"
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name="Date de création"
+    )
+
+    def __str__(self):
+        return f"{self.title} - {self.clinic.name}"
+
+    class Meta:
+        verbose_name = "Annonce"
+        verbose_name_plural = "Annonces"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['clinic', '-created_at']),
+        ]
+
+
+class AnnouncementDelivery(models.Model):
+    """
+    Remise d'une annonce à un destinataire et son état de lecture
+    """
+    announcement = models.ForeignKey(
+        Announcement,
+        on_delete=models.CASCADE,
+        related_name='deliveries',
+        verbose_name="Annonce"
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='announcement_deliveries',
+        verbose_name="Destinataire"
+    )
+    read_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Date de lecture"
+    )
+
+    def __str__(self):
+        return f"{self.announcement_id} - {self.user_id}"
+
+    class Meta:
+        verbose_name = "Remise d'annonce"
+        verbose_name_plural = "Remises d'annonces"
+        unique_together = ('announcement', 'user')
+        indexes = [
+            models.Index(fields=['user', 'announcement']),
+            models.Index(fields=['announcement', 'read_at']),
         ]
 
 
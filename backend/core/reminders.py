@@ -0,0 +1,123 @@
+"""
+Envoi des rappels de rendez-vous
+
+Les rendez-vous à rappeler sont parcourus par pages (pagination par clé sur
+appointment_date, id) à l'aide d'un index partiel. Chaque page est d'abord
+prise en charge par un UPDATE conditionnel (reminder_sent passe à True avec
+le jeton de l'exécution, seulement là où il valait False), puis seuls les
+rendez-vous obtenus sont envoyés, en une seule connexion email et hors
+transaction. Plusieurs exécutions simultanées se partagent
+ainsi les rendez-vous sans envoyer deux fois le même rappel, y compris sur
+SQLite (où SELECT ... FOR UPDATE n'existe pas).
+"""
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Appointment
+
+
+BATCH_SIZE = 500
+REMINDER_STATUSES = ['scheduled', 'confirmed']
+
+
+def due_reminders(now=None, lead=None):
+    """Rendez-vous sans rappel qui commencent dans le délai de rappel"""
+    now = now or timezone.now()
+    lead = lead or timedelta(hours=getattr(settings, 'REMINDER_LEAD_HOURS', 24))
+    return Appointment.objects.filter(
+        reminder_sent=False,
+        status__in=REMINDER_STATUSES,
+        appointment_date__gt=now,
+        appointment_date__lte=now + lead
+    )
+
+
+def build_message(appointment):
+    """Construit l'email de rappel d'un rendez-vous"""
+    local_date = timezone.localtime(appointment.appointment_date)
+    patient = appointment.patient.user
+    body = (
+        f"Bonjour {patient.get_full_name()},\n\n"
+        f"Nous vous rappelons votre rendez-vous avec le Dr. {appointment.doctor.user.get_full_name()} "
+        f"le {local_date.strftime('%d/%m/%Y')} à {local_date.strftime('%H:%M')} "
+        f"({appointment.duration} minutes) à la clinique {appointment.clinic.name}.\n"
+        f"Adresse : {appointment.clinic.address}\n"
+        f"Téléphone : {appointment.clinic.phone_number}\n\n"
+        "En cas d'empêchement, merci de prévenir la clinique au plus tôt.\n"
+    )
+    return EmailMessage(
+        subject=f"Rappel : rendez-vous le {local_date.strftime('%d/%m/%Y à %H:%M')}",
+        body=body,
+        to=[patient.email]
+    )
+
+
+def claim_page(ids, token):
+    """
+    Prend en charge les rendez-vous encore libres parmi `ids`
+    Retourne les rendez-vous obtenus par cette exécution.
+    """
+    Appointment.objects.filter(id__in=ids, reminder_sent=False).update(
+        reminder_sent=True, reminder_claim=token
+    )
+    return list(Appointment.objects.filter(id__in=ids, reminder_claim=token).select_related(
+        'patient__user', 'doctor__user', 'clinic'
+    ).order_by('appointment_date', 'id'))
+
+
+def release_claim(ids, token):
+    """Rend les rendez-vous non envoyés à une prochaine exécution"""
+    Appointment.objects.filter(id__in=ids, reminder_claim=token).update(
+        reminder_sent=False, reminder_claim=None
+    )
+
+
+def dispatch_reminders(now=None, lead=None, batch_size=BATCH_SIZE, dry_run=False):
+    """
+    Envoie les rappels dus, page par page
+
+    Retourne {'sent': nombre d'emails envoyés, 'skipped': rendez-vous dont le
+    patient n'a pas d'email (marqués pour ne plus être sélectionnés)}
+    """
+    queryset = due_reminders(now, lead).order_by('appointment_date', 'id')
+    token = uuid.uuid4()
+
+    totals = {'sent': 0, 'skipped': 0}
+    last = None
+    with get_connection() as connection:
+        while True:
+            page_query = queryset
+            if last is not None:
+                page_query = page_query.filter(
+                    Q(appointment_date__gt=last[0]) | Q(appointment_date=last[0], id__gt=last[1])
+                )
+            page = list(page_query.values_list('appointment_date', 'id')[:batch_size])
+            if not page:
+                break
+            last = page[-1]
+            ids = [apt_id for _date, apt_id in page]
+
+            if dry_run:
+                emails = list(Appointment.objects.filter(id__in=ids).values_list('patient__user__email', flat=True))
+                totals['sent'] += sum(1 for email in emails if email)
+                totals['skipped'] += sum(1 for email in emails if not email)
+                continue
+
+            # Les rendez-vous pris par une autre exécution sont ignorés
+            page = claim_page(ids, token)
+            messages = [build_message(apt) for apt in page if apt.patient.user.email]
+            totals['skipped'] += len(page) - len(messages)
+
+            # En cas d'échec d'envoi, la page est rendue aux prochaines exécutions
+            try:
+                totals['sent'] += connection.send_messages(messages) or 0
+            except Exception:
+                release_claim(ids, token)
+                raise
+
+    return totals
@@ -0,0 +1,189 @@
+"""
+Planning compilé des médecins
+
+Les horaires hebdomadaires (DoctorWorkingHours), les pauses et les
+exceptions par date (DoctorScheduleException) sont compilés une seule fois
+en listes d'intervalles en minutes, puis gardés en mémoire par médecin
+jusqu'à la prochaine modification de la ligne Doctor (updated_at).
+
+Les médecins sans horaires hebdomadaires utilisent les anciens champs JSON
+available_days et available_hours.
+"""
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from . import slot_cache
+from .models import Doctor, DoctorScheduleException, DoctorWorkingHours
+
+
+DEFAULT_HOURS = (time(9, 0), time(17, 0))
+
+WEEKDAY_NAMES = {
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+    'friday': 4, 'saturday': 5, 'sunday': 6,
+    'lundi': 0, 'mardi': 1, 'mercredi': 2, 'jeudi': 3,
+    'vendredi': 4, 'samedi': 5, 'dimanche': 6,
+}
+
+# {doctor_id: (updated_at, CompiledSchedule)}
+_compiled = {}
+
+
+def parse_time(value):
+    """Convertit une heure 'HH:MM' (ou 'HH') en objet time"""
+    parts = value.split(':')
+    return time(int(parts[0]), int(parts[1]) if len(parts) > 1 else 0)
+
+
+def to_minutes(value):
+    """Convertit un objet time en minutes depuis minuit"""
+    return value.hour * 60 + value.minute
+
+
+def merge_intervals(intervals):
+    """Fusionne des intervalles (début, fin) en minutes qui se chevauchent"""
+    merged = []
+    for start, end in sorted(i for i in intervals if i[1] > i[0]):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_intervals(intervals, removed):
+    """Retire les intervalles `removed` (pauses) des intervalles de travail"""
+    result = []
+    for start, end in intervals:
+        for break_start, break_end in removed:
+            if break_end <= start or break_start >= end:
+                continue
+            if break_start > start:
+                result.append((start, break_start))
+            start = max(start, break_end)
+        if end > start:
+            result.append((start, end))
+    return result
+
+
+class CompiledSchedule:
+    """Intervalles de travail en minutes par jour de la semaine et par date"""
+
+    def __init__(self, weekly, exceptions):
+        self.weekly = weekly  # 7 listes d'intervalles, lundi = 0
+        self.exceptions = exceptions  # {date: liste d'intervalles}
+
+    def intervals_for(self, day):
+        """Retourne les intervalles de travail (début, fin) en minutes d'une date"""
+        if day in self.exceptions:
+            return self.exceptions[day]
+        return self.weekly[day.weekday()]
+
+    def covers(self, start, end):
+        """Vérifie que [start, end[ est compris dans une plage de travail"""
+        start = timezone.localtime(start)
+        end = timezone.localtime(end)
+        day = start.date()
+        day_start = timezone.make_aware(datetime.combine(day, time.min))
+        start_minute = (start - day_start).total_seconds() / 60
+        end_minute = (end - day_start).total_seconds() / 60
+        return any(
+            work_start <= start_minute and end_minute <= work_end
+            for work_start, work_end in self.intervals_for(day)
+        )
+
+
+def compile_schedules(doctors):
+    """Compile le planning de plusieurs médecins (deux requêtes au total)"""
+    doctors = {doctor.id: doctor for doctor in doctors}
+    work = {doctor_id: [[] for _ in range(7)] for doctor_id in doctors}
+    breaks = {doctor_id: [[] for _ in range(7)] for doctor_id in doctors}
+    for doctor_id, weekday, start_time, end_time, is_break in DoctorWorkingHours.objects.filter(
+        doctor_id__in=list(doctors)
+    ).values_list('doctor_id', 'weekday', 'start_time', 'end_time', 'is_break'):
+        target = breaks if is_break else work
+        target[doctor_id][weekday].append((to_minutes(start_time), to_minutes(end_time)))
+
+    # Les exceptions passées ne servent plus au calcul des créneaux
+    exceptions = {doctor_id: {} for doctor_id in doctors}
+    for doctor_id, date, start_time, end_time in DoctorScheduleException.objects.filter(
+        doctor_id__in=list(doctors),
+        date__gte=timezone.localdate() - timedelta(days=1)
+    ).values_list('doctor_id', 'date', 'start_time', 'end_time'):
+        intervals = exceptions[doctor_id].setdefault(date, [])
+        if start_time is not None and end_time is not None:
+            intervals.append((to_minutes(start_time), to_minutes(end_time)))
+
+    schedules = {}
+    for doctor_id, doctor in doctors.items():
+        weekly_work = work[doctor_id] if any(work[doctor_id]) else legacy_weekly(doctor)
+        weekly = [
+            subtract_intervals(merge_intervals(weekly_work[day]), merge_intervals(breaks[doctor_id][day]))
+            for day in range(7)
+        ]
+        schedules[doctor_id] = CompiledSchedule(weekly, {
+            date: merge_intervals(intervals) for date, intervals in exceptions[doctor_id].items()
+        })
+    return schedules
+
+
+def legacy_weekly(doctor):
+    """
+    Construit les plages hebdomadaires à partir de available_days et
+    available_hours. Sans jours valides, le médecin travaille tous les jours.
+    """
+    available_hours = doctor.available_hours
+    start, end = DEFAULT_HOURS
+    if available_hours and isinstance(available_hours, dict):
+        try:
+            start = parse_time(available_hours.get('start', '09:00'))
+            end = parse_time(available_hours.get('end', '17:00'))
+        except (ValueError, AttributeError, IndexError):
+            # En cas d'erreur, utiliser les valeurs par défaut
+            start, end = DEFAULT_HOURS
+
+    weekdays = set()
+    if isinstance(doctor.available_days, list):
+        for name in doctor.available_days:
+            if isinstance(name, str) and name.strip().lower() in WEEKDAY_NAMES:
+                weekdays.add(WEEKDAY_NAMES[name.strip().lower()])
+    if not weekdays:
+        weekdays = set(range(7))
+
+    interval = (to_minutes(start), to_minutes(end))
+    return [[interval] if day in weekdays else [] for day in range(7)]
+
+
+def get_schedules(doctors):
+    """
+    Retourne {doctor_id: planning compilé}, en cache jusqu'à la modification
+    de chaque médecin ; les plannings manquants sont compilés ensemble
+    """
+    schedules = {}
+    stale = []
+    for doctor in doctors:
+        cached = _compiled.get(doctor.id)
+        if cached and cached[0] == doctor.updated_at:
+            schedules[doctor.id] = cached[1]
+        else:
+            stale.append(doctor)
+
+    if stale:
+        compiled = compile_schedules(stale)
+        for doctor in stale:
+            _compiled[doctor.id] = (doctor.updated_at, compiled[doctor.id])
+        schedules.update(compiled)
+    return schedules
+
+
+def get_schedule(doctor):
+    """Retourne le planning compilé du médecin"""
+    return get_schedules([doctor])[doctor.id]
+
+
+def touch_doctor(doctor_id):
+    """Marque la ligne Doctor comme modifiée pour recompiler son planning"""
+    Doctor.objects.filter(id=doctor_id).update(updated_at=timezone.now())
+    _compiled.pop(doctor_id, None)
+    slot_cache.invalidate_doctor(doctor_id)
@@ -0,0 +1,175 @@
+"""
+Recherche plein texte dans les messages
+
+Sous SQLite, le contenu des messages est indexé dans la table virtuelle
+FTS5 core_message_fts (contenu externe : core_message), tenue à jour par
+des triggers à l'insertion, la modification et la suppression. Les
+résultats sont classés par pertinence (bm25) et limités aux conversations
+de l'utilisateur, au-delà de son seuil d'effacement de l'historique. Les
+autres bases se rabattent sur une recherche icontains. Les triggers
+supprimés par une reconstruction de la table sont recréés après chaque
+migration (signal post_migrate).
+
+Les messages archivés (ArchivedMessage, contenu compressé) sortent de
+l'index quand ils quittent core_message et ne sont pas recherchés : la
+réponse le signale quand des messages archivés sont visibles dans le
+périmètre de la recherche.
+"""
+import re
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import ArchivedMessage, ConversationUnread, Message
+
+
+FTS_TABLE = 'core_message_fts'
+MAX_TERMS = 10
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+FTS_TRIGGERS = [f'{FTS_TABLE}_insert', f'{FTS_TABLE}_delete', f'{FTS_TABLE}_update']
+
+# Triggers de synchronisation (identiques à la migration 0027) ; une
+# migration qui reconstruit la table core_message sous SQLite les supprime
+INDEX_STATEMENTS = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        content, content='core_message', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON core_message BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON core_message BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF content ON core_message BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+]
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(text):
+    """
+    Convertit la saisie utilisateur en requête FTS5 : chaque mot devient un
+    préfixe entre guillemets (aucune syntaxe FTS5 n'est interprétée),
+    tous les mots sont requis. Retourne '' si la saisie ne contient aucun mot.
+    """
+    terms = TOKEN_RE.findall(text)[:MAX_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_messages(user_id, text, conversation_id=None, limit=20, offset=0):
+    """
+    Messages visibles par l'utilisateur contenant les mots recherchés
+    Retourne une liste de (id du message, extrait), par pertinence décroissante.
+    """
+    if not fts_available():
+        return fallback_search(user_id, text, conversation_id, limit, offset)
+
+    match = build_match_query(text)
+    if not match:
+        return []
+
+    sql = f"""
+        SELECT m.id, snippet({FTS_TABLE}, 0, '[', ']', '…', 12)
+        FROM {FTS_TABLE}
+        JOIN core_message m ON m.id = {FTS_TABLE}.rowid
+        JOIN core_conversation_participants p
+            ON p.conversation_id = m.conversation_id AND p.user_id = %s
+        LEFT JOIN core_conversationunread u
+            ON u.conversation_id = m.conversation_id AND u.user_id = %s
+        WHERE {FTS_TABLE} MATCH %s
+            AND m.id > COALESCE(u.cleared_message_id, 0)
+    """
+    params = [user_id, user_id, match]
+    if conversation_id is not None:
+        sql += " AND m.conversation_id = %s"
+        params.append(conversation_id)
+    sql += f" ORDER BY bm25({FTS_TABLE}), m.id DESC LIMIT %s OFFSET %s"
+    params += [limit, offset]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def fallback_search(user_id, text, conversation_id, limit, offset):
+    """Recherche sans index plein texte (autres bases que SQLite)"""
+    terms = TOKEN_RE.findall(text)[:MAX_TERMS]
+    if not terms:
+        return []
+    cleared = ConversationUnread.objects.filter(
+        user_id=user_id, conversation_id=OuterRef('conversation_id')
+    ).values('cleared_message_id')[:1]
+    messages = Message.objects.filter(
+        conversation__participants=user_id,
+        id__gt=Coalesce(Subquery(cleared), 0)
+    )
+    if conversation_id is not None:
+        messages = messages.filter(conversation_id=conversation_id)
+    for term in terms:
+        messages = messages.filter(content__icontains=term)
+    return [
+        (message_id, content[:120])
+        for message_id, content in messages.order_by('-id').values_list('id', 'content')[offset:offset + limit]
+    ]
+
+
+def has_archived_messages(user_id, conversation_id=None):
+    """Indique si des messages archivés, donc exclus de la recherche, sont visibles par l'utilisateur"""
+    cleared = ConversationUnread.objects.filter(
+        user_id=user_id, conversation_id=OuterRef('conversation_id')
+    ).values('cleared_message_id')[:1]
+    archived = ArchivedMessage.objects.filter(
+        conversation__participants=user_id,
+        id__gt=Coalesce(Subquery(cleared), 0)
+    )
+    if conversation_id is not None:
+        archived = archived.filter(conversation_id=conversation_id)
+    return archived.exists()
+
+
+def rebuild_index(using=DEFAULT_DB_ALIAS):
+    """
+    Recrée au besoin l'index et ses triggers, puis le reconstruit à partir
+    de la table des messages
+    """
+    if connections[using].vendor != 'sqlite':
+        return False
+    with connections[using].cursor() as cursor:
+        for statement in INDEX_STATEMENTS:
+            cursor.execute(statement)
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def repair_index(using=DEFAULT_DB_ALIAS):
+    """
+    Recrée les triggers manquants de l'index et le reconstruit (les messages
+    écrits sans trigger n'y figurent pas). Sans table d'index (migration
+    0027 non appliquée), rien n'est fait. Retourne True si l'index a été réparé.
+    """
+    if connections[using].vendor != 'sqlite':
+        return False
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name IN (%s, %s, %s, %s)", [FTS_TABLE, *FTS_TRIGGERS]
+        )
+        existing = {name for name, in cursor.fetchall()}
+    if FTS_TABLE not in existing or existing.issuperset(FTS_TRIGGERS):
+        return False
+    return rebuild_index(using)
@@ -1,9 +1,11 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from django.db.models import Max, Q
 from django.contrib.auth.password_validation import validate_password
 from .models import (
-    User, Clinic, Patient, Doctor, Receptionist, Service,
-    Appointment, Message, Conversation, Prescription, PrescriptionMedication
+    User, Clinic, Patient, Doctor, DoctorWorkingHours, DoctorScheduleException, Receptionist, Service,
+    Appointment, SlotHold, WaitlistEntry, Message, MessageAttachment, ArchivedMessage, Conversation, Announcement,
+    Prescription, PrescriptionMedication
 )
 
 
@@ -318,6 +320,52 @@ class DoctorSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class DoctorWorkingHoursSerializer(serializers.ModelSerializer):
+    """
+    Serializer pour les plages horaires hebdomadaires d'un médecin
+    """
+    weekday_display = serializers.CharField(source='get_weekday_display', read_only=True)
+
+    class Meta:
+        model = DoctorWorkingHours
+        fields = ['id', 'weekday', 'weekday_display', 'start_time', 'end_time', 'is_break']
+        read_only_fields = ['id']
+
+    def validate(self, attrs):
+        if attrs['start_time'] >= attrs['end_time']:
+            raise serializers.ValidationError("L'heure de début doit précéder l'heure de fin.")
+        return attrs
+
+
+class DoctorScheduleExceptionSerializer(serializers.ModelSerializer):
+    """
+    Serializer pour les exceptions de planning d'un médecin
+    """
+    class Meta:
+        model = DoctorScheduleException
+        fields = ['id', 'date', 'start_time', 'end_time', 'reason']
+        read_only_fields = ['id']
+
+    def validate(self, attrs):
+        start_time = attrs.get('start_time')
+        end_time = attrs.get('end_time')
+        if (start_time is None) != (end_time is None):
+            raise serializers.ValidationError(
+                "Indiquez l'heure de début et de fin, ou aucune pour une absence d'une journée."
+            )
+        if start_time is not None and start_time >= end_time:
+            raise serializers.ValidationError("L'heure de début doit précéder l'heure de fin.")
+        return attrs
+
+
+class DoctorScheduleSerializer(serializers.Serializer):
+    """
+    Serializer pour remplacer le planning complet d'un médecin
+    """
+    weekly = DoctorWorkingHoursSerializer(many=True)
+    exceptions = DoctorScheduleExceptionSerializer(many=True, required=False)
+
+
 class ReceptionistSerializer(serializers.ModelSerializer):
     """
     Serializer pour les réceptionnistes
@@ -366,9 +414,9 @@ class AppointmentSerializer(serializers.ModelSerializer):
             'id', 'patient', 'patient_name', 'doctor', 'doctor_name',
             'clinic', 'clinic_name', 'service', 'service_name',
             'appointment_date', 'duration', 'status', 'reason', 'notes',
-            'reminder_sent', 'created_at', 'updated_at'
+            'reminder_sent', 'series_id', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'series_id', 'created_at', 'updated_at']
 
 
 class AppointmentCreateUpdateSerializer(serializers.ModelSerializer):
@@ -417,43 +465,59 @@ class AppointmentCreateUpdateSerializer(serializers.ModelSerializer):
         # Calculer l'heure de fin du rendez-vous
         appointment_end = appointment_date + timedelta(minutes=appointment_duration)
 
-        # Vérifier qu'il n'y a pas de conflit avec les rendez-vous existants du MÉDECIN
-        # Un conflit existe si :
-        # 1. Le nouveau rendez-vous commence avant la fin d'un rendez-vous existant
-        # 2. Le nouveau rendez-vous finit après le début d'un rendez-vous existant
-        existing_doctor = Appointment.objects.filter(
-            doctor=doctor,
-            status__in=['scheduled', 'confirmed', 'in_progress']
-        ).exclude(id=self.instance.id if self.instance else None)
-
-        # Vérifier qu'il n'y a pas de conflit avec les rendez-vous existants du PATIENT
-        existing_patient = Appointment.objects.filter(
-            patient=patient,
-            status__in=['scheduled', 'confirmed', 'in_progress']
-        ).exclude(id=self.instance.id if self.instance else None)
+        # Vérifier que le rendez-vous respecte le planning du médecin
+        from .schedule import get_schedule
+        schedule = get_schedule(doctor)
+        if not schedule.covers(appointment_date, appointment_end):
+            local_date = timezone.localtime(appointment_date).date()
+            if not schedule.intervals_for(local_date):
+                message = f"Le Dr. {doctor.user.get_full_name()} ne travaille pas le {local_date.strftime('%d/%m/%Y')}."
+            else:
+                message = f"Le rendez-vous doit se situer dans les horaires de travail du Dr. {doctor.user.get_full_name()}."
+            raise serializers.ValidationError({'appointment_date': message})
+
+        # Rechercher les conflits du MÉDECIN et du PATIENT en une seule requête
+        # Un conflit existe si le rendez-vous existant commence avant la fin du
+        # nouveau ET se termine après son début (index sur end_date)
+        conflicts = Appointment.objects.filter(
+            Q(doctor=doctor) | Q(patient=patient),
+            status__in=Appointment.ACTIVE_STATUSES,
+            appointment_date__lt=appointment_end,
+            end_date__gt=appointment_date
+        ).select_related('patient__user', 'doctor__user').order_by('appointment_date')
+        if self.instance:
+            conflicts = conflicts.exclude(id=self.instance.id)
+
+        conflicts = list(conflicts[:10])
 
         # Vérifier les conflits avec les rendez-vous du médecin
-        for apt in existing_doctor:
-            apt_end = apt.appointment_date + timedelta(minutes=apt.duration)
-
-            # Vérifier le chevauchement
-            if appointment_date < apt_end and appointment_end > apt.appointment_date:
+        for apt in conflicts:
+            if apt.doctor_id == doctor.id:
                 patient_name = apt.patient.user.get_full_name() if apt.patient else "un patient"
                 raise serializers.ValidationError({
-                    'appointment_date': f"❌ CONFLIT DE RENDEZ-VOUS : Le Dr. {doctor.user.get_full_name()} a déjà un rendez-vous avec {patient_name} de {apt.appointment_date.strftime('%H:%M')} à {apt_end.strftime('%H:%M')} ({apt.duration} minutes). Votre rendez-vous ({appointment_duration} minutes) se termine à {appointment_end.strftime('%H:%M')}. Veuillez choisir un autre créneau."
+                    'appointment_date': f"❌ CONFLIT DE RENDEZ-VOUS : Le Dr. {doctor.user.get_full_name()} a déjà un rendez-vous avec {patient_name} de {apt.appointment_date.strftime('%H:%M')} à {apt.end_date.strftime('%H:%M')} ({apt.duration} minutes). Votre rendez-vous ({appointment_duration} minutes) se termine à {appointment_end.strftime('%H:%M')}. Veuillez choisir un autre créneau."
                 })
 
         # Vérifier les conflits avec les rendez-vous du patient
-        for apt in existing_patient:
-            apt_end = apt.appointment_date + timedelta(minutes=apt.duration)
-
-            # Vérifier le chevauchement
-            if appointment_date < apt_end and appointment_end > apt.appointment_date:
+        for apt in conflicts:
+            if apt.patient_id == patient.id:
                 doctor_name = apt.doctor.user.get_full_name() if apt.doctor else "un médecin"
                 raise serializers.ValidationError({
-                    'appointment_date': f"❌ CONFLIT DE RENDEZ-VOUS : Le patient {patient.user.get_full_name()} a déjà un rendez-vous avec le Dr. {doctor_name} de {apt.appointment_date.strftime('%H:%M')} à {apt_end.strftime('%H:%M')} ({apt.duration} minutes). Veuillez choisir un autre créneau."
+                    'appointment_date': f"❌ CONFLIT DE RENDEZ-VOUS : Le patient {patient.user.get_full_name()} a déjà un rendez-vous avec le Dr. {doctor_name} de {apt.appointment_date.strftime('%H:%M')} à {apt.end_date.strftime('%H:%M')} ({apt.duration} minutes). Veuillez choisir un autre créneau."
                 })
 
+        # Vérifier les réservations temporaires des autres utilisateurs
+        from .holds import active_holds
+        request = self.context.get('request')
+        hold = active_holds(
+            [doctor.id], appointment_date, appointment_end,
+            exclude_user=request.user if request else None
+        ).order_by('expires_at').first()
+        if hold:
+            raise serializers.ValidationError({
+                'appointment_date': f"Ce créneau est temporairement réservé jusqu'à {timezone.localtime(hold.expires_at).strftime('%H:%M')}. Veuillez choisir un autre créneau."
+            })
+
         return attrs
 
     def create(self, validated_data):
@@ -471,7 +535,14 @@ class AppointmentCreateUpdateSerializer(serializers.ModelSerializer):
         else:
             print(f"DEBUG: Using provided duration: {validated_data['duration']} minutes")
 
-        return super().create(validated_data)
+        appointment = super().create(validated_data)
+
+        # Le rendez-vous remplace la réservation temporaire de l'utilisateur
+        from .holds import release_holds
+        request = self.context.get('request')
+        if request:
+            release_holds(request.user, appointment.doctor_id)
+        return appointment
 
     def update(self, instance, validated_data):
         """Mettre à jour un rendez-vous avec la durée du service"""
@@ -484,20 +555,308 @@ class AppointmentCreateUpdateSerializer(serializers.ModelSerializer):
         return super().update(instance, validated_data)
 
 
+class SlotHoldSerializer(serializers.ModelSerializer):
+    """
+    Serializer pour réserver temporairement un créneau
+    La durée est celle du service si fourni, sinon `duration` (30 min par
+    défaut), limitée au service le plus long de la clinique.
+    """
+    service = serializers.PrimaryKeyRelatedField(
+        queryset=Service.objects.all(), required=False, allow_null=True, write_only=True
+    )
+    duration = serializers.IntegerField(required=False, min_value=1, write_only=True)
+
+    class Meta:
+        model = SlotHold
+        fields = ['id', 'doctor', 'start_date', 'end_date', 'expires_at', 'service', 'duration']
+        read_only_fields = ['id', 'end_date', 'expires_at']
+
+    def validate(self, attrs):
+        from django.utils import timezone
+        from datetime import timedelta
+        from .schedule import get_schedule
+
+        start_date = attrs['start_date']
+        doctor = attrs['doctor']
+        service = attrs.pop('service', None)
+        duration = attrs.pop('duration', None)
+        if service and service.duration:
+            duration = service.duration
+        elif duration:
+            longest = Service.objects.filter(
+                clinic_id=doctor.clinic_id, is_active=True
+            ).aggregate(longest=Max('duration'))['longest'] or 30
+            if duration > longest:
+                raise serializers.ValidationError({
+                    'duration': f"Une réservation ne peut pas dépasser {longest} minutes."
+                })
+        attrs['end_date'] = start_date + timedelta(minutes=duration or 30)
+
+        if start_date < timezone.now():
+            raise serializers.ValidationError("Le créneau ne peut pas être dans le passé.")
+        if not doctor.is_available or not doctor.is_active:
+            raise serializers.ValidationError("Ce médecin n'est pas disponible.")
+        if not get_schedule(doctor).covers(start_date, attrs['end_date']):
+            raise serializers.ValidationError(
+                f"Le créneau doit se situer dans les horaires de travail du Dr. {doctor.user.get_full_name()}."
+            )
+        return attrs
+
+
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    """
+    Serializer pour la liste d'attente
+    La durée est celle du service si fourni.
+    """
+    patient_name = serializers.CharField(source='patient.user.get_full_name', read_only=True)
+    doctor_name = serializers.CharField(source='doctor.user.get_full_name', read_only=True, allow_null=True)
+    appointment_date = serializers.DateTimeField(source='appointment.appointment_date', read_only=True, allow_null=True)
+
+    class Meta:
+        model = WaitlistEntry
+        fields = [
+            'id', 'patient', 'patient_name', 'clinic', 'doctor', 'doctor_name',
+            'specialization', 'service', 'duration', 'earliest', 'latest', 'reason',
+            'status', 'appointment', 'appointment_date', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'status', 'appointment', 'created_at', 'updated_at']
+
+    def validate(self, attrs):
+        from django.utils import timezone
+
+        doctor = attrs.get('doctor', getattr(self.instance, 'doctor', None))
+        specialization = attrs.get('specialization', getattr(self.instance, 'specialization', ''))
+        earliest = attrs.get('earliest', getattr(self.instance, 'earliest', None))
+        latest = attrs.get('latest', getattr(self.instance, 'latest', None))
+        service = attrs.get('service')
+
+        if not doctor and not specialization:
+            raise serializers.ValidationError("Indiquez un médecin ou une spécialisation.")
+        if doctor:
+            attrs['clinic'] = doctor.clinic
+            attrs['specialization'] = doctor.specialization
+        if service and service.duration:
+            attrs['duration'] = service.duration
+        if latest <= earliest or latest <= timezone.now():
+            raise serializers.ValidationError("La fenêtre horaire doit être dans le futur et non vide.")
+        return attrs
+
+
+class AppointmentSeriesSerializer(serializers.Serializer):
+    """
+    Serializer pour réserver une série de rendez-vous récurrents
+    Les conflits de toutes les occurrences sont vérifiés en une seule requête
+    """
+    FREQUENCY_CHOICES = [
+        ('daily', 'Quotidienne'),
+        ('weekly', 'Hebdomadaire'),
+    ]
+    MAX_OCCURRENCES = 52
+
+    patient = serializers.PrimaryKeyRelatedField(queryset=Patient.objects.all())
+    doctor = serializers.PrimaryKeyRelatedField(queryset=Doctor.objects.all())
+    clinic = serializers.PrimaryKeyRelatedField(queryset=Clinic.objects.all())
+    service = serializers.PrimaryKeyRelatedField(queryset=Service.objects.all(), required=False, allow_null=True)
+    appointment_date = serializers.DateTimeField()
+    duration = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+    reason = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    notes = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    frequency = serializers.ChoiceField(choices=FREQUENCY_CHOICES, default='weekly')
+    interval = serializers.IntegerField(default=1, min_value=1, max_value=12)
+    count = serializers.IntegerField(required=False, min_value=1, max_value=MAX_OCCURRENCES)
+    until = serializers.DateField(required=False)
+    skip_conflicts = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        """Calcule les occurrences et leurs conflits"""
+        from django.utils import timezone
+        from datetime import timedelta
+        from .availability import find_conflicts
+        from .holds import held_occurrences
+        from .schedule import get_schedule
+
+        appointment_date = attrs['appointment_date']
+        if appointment_date < timezone.now():
+            raise serializers.ValidationError("La date du rendez-vous ne peut pas être dans le passé.")
+
+        count = attrs.get('count')
+        until = attrs.get('until')
+        if (count is None) == (until is None):
+            raise serializers.ValidationError("Indiquez soit count soit until pour la série.")
+
+        # Durée du service si disponible, sinon durée fournie ou 30 minutes
+        service = attrs.get('service')
+        if service and service.duration:
+            attrs['duration'] = service.duration
+        elif not attrs.get('duration'):
+            attrs['duration'] = 30
+        length = timedelta(minutes=attrs['duration'])
+
+        step = timedelta(days=attrs['interval'] * (7 if attrs['frequency'] == 'weekly' else 1))
+        occurrences = []
+        current = appointment_date
+        while len(occurrences) < (count or self.MAX_OCCURRENCES + 1):
+            if until and timezone.localtime(current).date() > until:
+                break
+            occurrences.append((current, current + length))
+            current += step
+
+        if not occurrences:
+            raise serializers.ValidationError("La série ne contient aucune occurrence.")
+        if len(occurrences) > self.MAX_OCCURRENCES:
+            raise serializers.ValidationError(
+                f"Une série ne peut pas dépasser {self.MAX_OCCURRENCES} occurrences."
+            )
+
+        attrs['occurrences'] = occurrences
+        attrs['conflicts'] = find_conflicts(attrs['doctor'].id, attrs['patient'].id, occurrences)
+
+        # Les occurrences hors du planning du médecin sont aussi en conflit
+        schedule = get_schedule(attrs['doctor'])
+        attrs['outside_schedule'] = {
+            index for index, (start, end) in enumerate(occurrences)
+            if not schedule.covers(start, end)
+        }
+
+        # Ainsi que celles réservées temporairement par un autre utilisateur
+        request = self.context.get('request')
+        attrs['held'] = held_occurrences(
+            attrs['doctor'].id, occurrences, exclude_user=request.user if request else None
+        )
+        return attrs
+
+    def get_conflicts_report(self):
+        """Retourne la liste des conflits par occurrence"""
+        occurrences = self.validated_data['occurrences']
+        outside = [
+            {
+                'index': index,
+                'appointment_date': occurrences[index][0].isoformat(),
+                'conflict_with': None,
+                'error': "En dehors des horaires de travail du médecin."
+            }
+            for index in sorted(self.validated_data['outside_schedule'])
+            if index not in self.validated_data['conflicts']
+        ]
+        held = [
+            {
+                'index': index,
+                'appointment_date': occurrences[index][0].isoformat(),
+                'conflict_with': None,
+                'error': "Créneau temporairement réservé par un autre utilisateur."
+            }
+            for index in sorted(self.validated_data['held'])
+            if index not in self.validated_data['conflicts']
+            and index not in self.validated_data['outside_schedule']
+        ]
+        conflicts = [
+            {
+                'index': index,
+                'appointment_date': occurrences[index][0].isoformat(),
+                'conflict_with': apt.id,
+                'error': (
+                    f"Le Dr. {apt.doctor.user.get_full_name()} a déjà un rendez-vous"
+                    if apt.doctor_id == self.validated_data['doctor'].id else
+                    f"Le patient {apt.patient.user.get_full_name()} a déjà un rendez-vous"
+                ) + f" de {apt.appointment_date.strftime('%H:%M')} à {apt.end_date.strftime('%H:%M')}."
+            }
+            for index, apt in sorted(self.validated_data['conflicts'].items())
+        ]
+        return sorted(conflicts + outside + held, key=lambda conflict: conflict['index'])
+
+    def create(self, validated_data):
+        """Crée toutes les occurrences libres en une seule transaction"""
+        import uuid
+        from django.db import transaction
+        from . import slot_cache
+        from .freebusy import add_intervals, appointment_days
+
+        series_id = uuid.uuid4()
+        skipped = set(validated_data['conflicts']) | validated_data['outside_schedule'] | validated_data['held']
+        appointments = [
+            Appointment(
+                patient=validated_data['patient'],
+                doctor=validated_data['doctor'],
+                clinic=validated_data['clinic'],
+                service=validated_data.get('service'),
+                appointment_date=start,
+                end_date=end,
+                duration=validated_data['duration'],
+                reason=validated_data.get('reason'),
+                notes=validated_data.get('notes'),
+                series_id=series_id,
+            )
+            for index, (start, end) in enumerate(validated_data['occurrences'])
+            if index not in skipped
+        ]
+
+        with transaction.atomic():
+            created = Appointment.objects.bulk_create(appointments)
+
+            # bulk_create n'envoie pas de signaux : mettre à jour l'occupation
+            doctor = validated_data['doctor']
+            add_intervals(doctor.id, [(apt.appointment_date, apt.end_date) for apt in created])
+            doctor_days = set()
+            for apt in created:
+                doctor_days |= appointment_days(doctor.id, apt.appointment_date, apt.end_date)
+            slot_cache.invalidate_days(doctor_days)
+
+        return created
+
+
+class MessageAttachmentSerializer(serializers.ModelSerializer):
+    """
+    Serializer pour les pièces jointes (lecture seule)
+    """
+    size = serializers.IntegerField(source='file.size', read_only=True)
+    sha256 = serializers.CharField(source='file.sha256', read_only=True)
+
+    class Meta:
+        model = MessageAttachment
+        fields = [
+            'id', 'message', 'conversation', 'uploaded_by', 'filename',
+            'content_type', 'size', 'sha256', 'created_at'
+        ]
+        read_only_fields = fields
+
+
 class MessageSerializer(serializers.ModelSerializer):
     """
     Serializer pour les messages
     """
     sender_name = serializers.CharField(source='sender.get_full_name', read_only=True)
     sender_type = serializers.CharField(source='sender.user_type', read_only=True)
+    attachments = MessageAttachmentSerializer(many=True, read_only=True)
 
     class Meta:
         model = Message
         fields = [
             'id', 'conversation', 'sender', 'sender_name', 'sender_type',
-            'content', 'is_read', 'read_at', 'created_at', 'updated_at'
+            'content', 'attachments', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'sender', 'read_at', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'sender', 'created_at', 'updated_at']
+
+
+class ArchivedMessageSerializer(serializers.ModelSerializer):
+    """
+    Serializer pour les messages archivés (lecture seule, même forme que
+    les messages)
+    """
+    sender_name = serializers.CharField(source='sender.get_full_name', read_only=True)
+    sender_type = serializers.CharField(source='sender.user_type', read_only=True)
+    content = serializers.CharField(read_only=True)
+    is_archived = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ArchivedMessage
+        fields = [
+            'id', 'conversation', 'sender', 'sender_name', 'sender_type',
+            'content', 'is_archived', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+    def get_is_archived(self, obj):
+        return True
 
 
 class ConversationSerializer(serializers.ModelSerializer):
@@ -530,8 +889,26 @@ class ConversationSerializer(serializers.ModelSerializer):
         ]
 
     def get_last_message(self, obj):
-        """Retourne le dernier message"""
-        last_msg = obj.messages.last()
+        """Retourne le dernier message (annoté par la vue si possible)"""
+        if hasattr(obj, 'last_message_id'):
+            if obj.last_message_id is None:
+                return None
+            sender_name = f"{obj.last_message_sender_first_name} {obj.last_message_sender_last_name}".strip()
+            content = obj.last_message_content
+            if content is None and obj.last_message_archived_content is not None:
+                content = ArchivedMessage.decompress(obj.last_message_archived_content)[:100]
+            return {
+                'id': obj.last_message_id,
+                'sender_name': sender_name,
+                'content': content,
+                'created_at': obj.last_message_created_at
+            }
+
+        # Sans message chaud, le dernier message est dans l'archive
+        last_msg = (
+            obj.messages.select_related('sender').last()
+            or obj.archived_messages.select_related('sender').order_by('created_at', 'id').last()
+        )
         if last_msg:
             return {
                 'id': last_msg.id,
@@ -542,10 +919,13 @@ class ConversationSerializer(serializers.ModelSerializer):
         return None
 
     def get_unread_count(self, obj):
-        """Compte les messages non lus"""
+        """Compte les messages non lus (annoté par la vue si possible)"""
+        if hasattr(obj, 'unread_count'):
+            return obj.unread_count
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return obj.messages.filter(is_read=False).exclude(sender=request.user).count()
+            counter = obj.unread_counters.filter(user=request.user).first()
+            return counter.count if counter else 0
         return 0
 
 
@@ -570,6 +950,35 @@ class ConversationCreateUpdateSerializer(serializers.ModelSerializer):
         return attrs
 
 
+class AnnouncementSerializer(serializers.ModelSerializer):
+    """
+    Serializer pour les annonces de clinique
+    read_at : lecture par l'utilisateur courant (destinataires),
+    read_count : nombre de lectures (personnel de la clinique)
+    """
+    author_name = serializers.CharField(source='author.get_full_name', read_only=True, allow_null=True)
+    read_at = serializers.SerializerMethodField()
+    read_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Announcement
+        fields = [
+            'id', 'clinic', 'author', 'author_name', 'title', 'content', 'audience',
+            'recipient_count', 'read_at', 'read_count', 'created_at'
+        ]
+        read_only_fields = ['id', 'author', 'recipient_count', 'created_at']
+        # La clinique d'une réceptionniste est la sienne
+        extra_kwargs = {'clinic': {'required': False}}
+
+    def get_read_at(self, obj):
+        """Annotation posée par la vue pour les destinataires"""
+        return getattr(obj, 'read_at', None)
+
+    def get_read_count(self, obj):
+        """Annotation posée par la vue pour le personnel"""
+        return getattr(obj, 'read_count', None)
+
+
 # ============================================
 # SERIALIZERS POUR LES ORDONNANCES
 # ============================================
@@ -0,0 +1,139 @@
+"""
+Signaux de l'application core
+"""
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from . import search, slot_cache
+from .attachments import delete_unreferenced_files
+from .freebusy import appointment_days, mark_busy, rebuild_days
+from .models import (
+    Appointment, Conversation, Doctor, DoctorScheduleException, DoctorWorkingHours, MessageAttachment
+)
+from .schedule import touch_doctor
+
+
+FREE_BUSY_FIELDS = ('doctor_id', 'appointment_date', 'end_date', 'status')
+
+
+@receiver(post_save, sender=Appointment)
+def update_free_busy_on_save(sender, instance, created, raw=False, **kwargs):
+    """
+    Met à jour l'occupation du médecin après l'enregistrement d'un rendez-vous
+    Un nouveau rendez-vous actif ajoute ses tranches au bitmap ; une
+    modification ou une annulation recalcule les journées concernées.
+    """
+    if raw:
+        return
+
+    old = getattr(instance, '_loaded_values', None)
+    is_active = instance.status in Appointment.ACTIVE_STATUSES
+    days = appointment_days(instance.doctor_id, instance.appointment_date, instance.end_date)
+
+    if created or old is None:
+        if is_active:
+            mark_busy(instance)
+        slot_cache.invalidate_days(days)
+    elif any(old.get(field, getattr(instance, field)) != getattr(instance, field) for field in FREE_BUSY_FIELDS):
+        was_active = old.get('status', instance.status) in Appointment.ACTIVE_STATUSES
+        days |= appointment_days(
+            old.get('doctor_id', instance.doctor_id),
+            old.get('appointment_date', instance.appointment_date),
+            old.get('end_date', instance.end_date)
+        )
+
+        if not was_active and is_active:
+            # L'ancien rendez-vous n'occupait aucune tranche : ajout simple
+            mark_busy(instance)
+        elif was_active:
+            rebuild_days(days)
+        slot_cache.invalidate_days(days)
+
+    instance._loaded_values = {field: getattr(instance, field) for field in FREE_BUSY_FIELDS}
+
+
+@receiver(post_delete, sender=Appointment)
+def update_free_busy_on_delete(sender, instance, **kwargs):
+    """Libère les tranches d'un rendez-vous supprimé"""
+    days = appointment_days(instance.doctor_id, instance.appointment_date, instance.end_date)
+    if instance.status in Appointment.ACTIVE_STATUSES:
+        rebuild_days(days)
+    slot_cache.invalidate_days(days)
+
+
+@receiver(post_save, sender=Doctor)
+def invalidate_slots_on_doctor_save(sender, instance, created, raw=False, **kwargs):
+    """Invalide les créneaux en cache quand la disponibilité du médecin change"""
+    if raw or created:
+        return
+
+    old = getattr(instance, '_loaded_values', None)
+    if old is None or any(
+        old.get(field, getattr(instance, field)) != getattr(instance, field)
+        for field in Doctor.AVAILABILITY_FIELDS
+    ):
+        slot_cache.invalidate_doctor(instance.id)
+    instance._loaded_values = {field: getattr(instance, field) for field in Doctor.AVAILABILITY_FIELDS}
+
+
+@receiver(post_save, sender=DoctorWorkingHours)
+@receiver(post_delete, sender=DoctorWorkingHours)
+@receiver(post_save, sender=DoctorScheduleException)
+@receiver(post_delete, sender=DoctorScheduleException)
+def recompile_schedule(sender, instance, raw=False, **kwargs):
+    """Recompile le planning du médecin quand ses horaires changent"""
+    if not raw:
+        touch_doctor(instance.doctor_id)
+
+
+@receiver(m2m_changed, sender=Conversation.participants.through)
+def update_participants_hash(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Recalcule l'empreinte des participants après un ajout ou un retrait
+    Lève IntegrityError si une autre conversation active de la clinique a
+    déjà exactement ces participants.
+    """
+    if action == 'pre_clear' and reverse:
+        # Après user.conversations.clear(), pk_set est vide : relever avant le
+        # retrait les conversations de l'utilisateur
+        instance._cleared_conversation_ids = list(
+            sender.objects.filter(user_id=instance.pk).values_list('conversation_id', flat=True)
+        )
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    # Depuis l'utilisateur (user.conversations.add(...)), pk_set contient les
+    # conversations modifiées
+    if not reverse:
+        conversation_ids = [instance.pk]
+    elif action == 'post_clear':
+        conversation_ids = instance.__dict__.pop('_cleared_conversation_ids', [])
+    else:
+        conversation_ids = pk_set or []
+
+    members = {conversation_id: [] for conversation_id in conversation_ids}
+    for conversation_id, user_id in sender.objects.filter(
+        conversation_id__in=conversation_ids
+    ).values_list('conversation_id', 'user_id'):
+        members[conversation_id].append(user_id)
+    for conversation_id, user_ids in members.items():
+        Conversation.objects.filter(pk=conversation_id).update(
+            participants_hash=Conversation.participants_signature(user_ids)
+        )
+
+
+@receiver(post_delete, sender=MessageAttachment)
+def delete_orphaned_file(sender, instance, **kwargs):
+    """Supprime le fichier stocké avec la dernière pièce jointe qui y renvoie"""
+    delete_unreferenced_files([instance.file_id])
+
+
+@receiver(post_migrate)
+def restore_message_search_index(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """
+    Recrée les triggers de l'index plein texte après les migrations : sous
+    SQLite, une migration qui reconstruit la table core_message les supprime
+    """
+    if sender.label == 'core':
+        search.repair_index(using)
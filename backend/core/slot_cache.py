@@ -0,0 +1,99 @@
+"""
+Cache des créneaux disponibles (framework de cache Django)
+
+Les créneaux d'un médecin sont mis en cache par médecin + jour + durée.
+Chaque clé contient un jeton de version du médecin et du jour : invalider
+revient à remplacer le jeton, ce qui rend toutes les durées de ce jour
+inaccessibles sans avoir à les énumérer.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+PREFIX = 'slots'
+STATS_KEYS = {'hits': f'{PREFIX}:stats:hits', 'misses': f'{PREFIX}:stats:misses'}
+
+
+def _doctor_version_key(doctor_id):
+    return f'{PREFIX}:ver:{doctor_id}'
+
+
+def _day_version_key(doctor_id, day):
+    return f'{PREFIX}:ver:{doctor_id}:{day.isoformat()}'
+
+
+def _get_versions(keys):
+    """Retourne les jetons de version, en créant ceux qui manquent"""
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            token = uuid.uuid4().hex
+            # Un jeton absent (expiré ou évincé) ne doit jamais retrouver d'anciennes entrées
+            if not cache.add(key, token, timeout=None):
+                token = cache.get(key) or token
+            versions[key] = token
+    return versions
+
+
+def slot_keys(doctor_id, days, duration):
+    """Retourne les clés de cache {jour: clé} des créneaux d'un médecin"""
+    doctor_key = _doctor_version_key(doctor_id)
+    day_keys = {day: _day_version_key(doctor_id, day) for day in days}
+    versions = _get_versions([doctor_key] + list(day_keys.values()))
+    return {
+        day: f'{PREFIX}:{doctor_id}:{day.isoformat()}:{duration}:{versions[doctor_key]}:{versions[day_key]}'
+        for day, day_key in day_keys.items()
+    }
+
+
+def get_many(keys):
+    """Lit les créneaux en cache et met à jour les compteurs succès/échecs"""
+    found = cache.get_many(list(keys.values()))
+    hits = sum(1 for key in keys.values() if key in found)
+    _incr('hits', hits)
+    _incr('misses', len(keys) - hits)
+    return {day: found[key] for day, key in keys.items() if key in found}
+
+
+def set_many(entries):
+    """Enregistre les créneaux {clé: créneaux}"""
+    cache.set_many(entries, timeout=getattr(settings, 'SLOT_CACHE_TIMEOUT', 300))
+
+
+def invalidate_days(doctor_days):
+    """Invalide les créneaux des journées {(doctor_id, jour)}"""
+    cache.set_many(
+        {_day_version_key(doctor_id, day): uuid.uuid4().hex for doctor_id, day in doctor_days},
+        timeout=None
+    )
+
+
+def invalidate_doctor(doctor_id):
+    """Invalide tous les créneaux d'un médecin"""
+    cache.set(_doctor_version_key(doctor_id), uuid.uuid4().hex, timeout=None)
+
+
+def _incr(name, amount):
+    if not amount:
+        return
+    key = STATS_KEYS[name]
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        cache.set(key, amount, timeout=None)
+
+
+def get_stats():
+    """Retourne les compteurs de succès/échecs du cache"""
+    values = cache.get_many(list(STATS_KEYS.values()))
+    hits = values.get(STATS_KEYS['hits'], 0)
+    misses = values.get(STATS_KEYS['misses'], 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else None,
+    }
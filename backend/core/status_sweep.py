@@ -0,0 +1,91 @@
+"""
+Clôture automatique des rendez-vous passés
+
+Les rendez-vous encore actifs après leur fin (plus un délai de grâce)
+reçoivent le statut défini par APPOINTMENT_SWEEP_RULES. Les mises à jour sont
+faites par lots d'identifiants, en une requête UPDATE par lot, pour garder
+petit l'ensemble des rendez-vous actifs.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .availability import refresh_doctor_days
+from .freebusy import appointment_days
+from .models import Appointment
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1000
+DEFAULT_RULES = {
+    'scheduled': 'no_show',
+    'confirmed': 'no_show',
+    'in_progress': 'completed',
+}
+
+
+def get_rules():
+    """Règles {statut actuel: nouveau statut}, validées contre STATUS_CHOICES"""
+    rules = getattr(settings, 'APPOINTMENT_SWEEP_RULES', DEFAULT_RULES)
+    statuses = {value for value, _label in Appointment.STATUS_CHOICES}
+    for source, target in rules.items():
+        if source not in Appointment.ACTIVE_STATUSES or target not in statuses:
+            raise ValueError(f"Règle de clôture invalide : {source} -> {target}")
+    return rules
+
+
+def sweep_appointments(now=None, grace=None, chunk_size=CHUNK_SIZE, dry_run=False):
+    """
+    Applique les règles aux rendez-vous terminés avant now - grace
+    Retourne {'statut actuel -> nouveau statut': nombre de rendez-vous}
+    """
+    now = now or timezone.now()
+    if grace is None:
+        grace = timedelta(minutes=getattr(settings, 'APPOINTMENT_SWEEP_GRACE_MINUTES', 60))
+    cutoff = now - grace
+    today = timezone.localdate(now)
+
+    counts = {}
+    for source, target in get_rules().items():
+        label = f'{source} -> {target}'
+        counts[label] = 0
+        stale = Appointment.objects.filter(status=source, end_date__lte=cutoff)
+        last = None
+        while True:
+            # Pagination par clé sur (end_date, id) : chaque lot est lu via
+            # l'index (status, end_date) puis mis à jour en une requête
+            page = stale
+            if last is not None:
+                page = page.filter(Q(end_date__gt=last[0]) | Q(end_date=last[0], id__gt=last[1]))
+            rows = list(page.order_by('end_date', 'id').values_list(
+                'id', 'doctor_id', 'appointment_date', 'end_date'
+            )[:chunk_size])
+            if not rows:
+                break
+            last = (rows[-1][3], rows[-1][0])
+            if dry_run:
+                counts[label] += len(rows)
+                continue
+
+            updated = Appointment.objects.filter(
+                id__in=[row[0] for row in rows], status=source
+            ).update(status=target, updated_at=now)
+            counts[label] += updated
+
+            # UPDATE n'envoie pas de signaux : seules les journées encore
+            # utilisées pour les créneaux (à partir d'aujourd'hui) sont recalculées
+            doctor_days = set()
+            for _id, doctor_id, start, end in rows:
+                doctor_days |= {
+                    (doctor_id, day) for doctor_id, day in appointment_days(doctor_id, start, end)
+                    if day >= today
+                }
+            refresh_doctor_days(doctor_days)
+
+        if counts[label]:
+            logger.info("%d rendez-vous passés de %s à %s", counts[label], source, target)
+    return counts
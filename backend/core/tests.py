@@ -0,0 +1,1340 @@
+"""
+Tests de l'application core
+"""
+import hashlib
+import importlib
+import os
+import tempfile
+import uuid
+from datetime import datetime, time, timedelta
+from io import StringIO
+from smtplib import SMTPException
+from unittest import mock
+
+from django.apps import apps
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.db.models.signals import post_migrate
+from django.test import AsyncClient, Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import search, slot_cache, unread
+from .archive import archive_messages
+from .availability import find_conflicts, get_available_slots
+from .broadcast import publish_announcement
+from .events import get_broker, issue_stream_ticket, user_channel
+from .freebusy import bitmaps_for_intervals, bucket_mask, from_bytes, load_bitmaps
+from .reminders import claim_page, dispatch_reminders
+from .status_sweep import sweep_appointments
+from .models import (
+    Announcement, Appointment, ArchivedMessage, Clinic, Conversation, Doctor, DoctorFreeBusy, DoctorScheduleException,
+    Message, MessageAttachment, Patient, Receptionist, Service, StoredFile, User, WaitlistEntry
+)
+from .serializers import AppointmentCreateUpdateSerializer
+from .views import event_stream
+
+
+def local_datetime(day, hour, minute=0):
+    """Date/heure locale (Africa/Tunis) d'un jour donné"""
+    return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+
+# Hachage rapide : les tests créent de nombreux utilisateurs
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class MedFlowTestCase(TestCase):
+    """
+    Clinique de test : deux médecins (9h-17h et 10h-12h, tous les jours),
+    deux patients, une réceptionniste et un administrateur
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.clinic = Clinic.objects.create(
+            name='Clinique Test', address='1 rue Test', phone_number='+21612345678', email='clinique@test.tn'
+        )
+        cls.doctor_user = cls.create_user('doctor', 'doctor')
+        cls.doctor = cls.create_doctor(cls.doctor_user, 'D1', {'start': '09:00', 'end': '17:00'})
+        cls.doctor2_user = cls.create_user('doctor2', 'doctor')
+        cls.doctor2 = cls.create_doctor(cls.doctor2_user, 'D2', {'start': '10:00', 'end': '12:00'})
+        cls.patient_user = cls.create_user('patient', 'patient')
+        cls.patient = cls.create_patient(cls.patient_user, 'P1')
+        cls.patient2_user = cls.create_user('patient2', 'patient')
+        cls.patient2 = cls.create_patient(cls.patient2_user, 'P2')
+        cls.receptionist_user = cls.create_user('receptionist', 'receptionist')
+        Receptionist.objects.create(
+            user=cls.receptionist_user, clinic=cls.clinic, employee_id='E1',
+            shift_start=time(8), shift_end=time(17)
+        )
+        cls.admin_user = cls.create_user('admin', 'admin')
+        cls.service = Service.objects.create(clinic=cls.clinic, name='Consultation', duration=30)
+        cls.therapy = Service.objects.create(
+            clinic=cls.clinic, name='Kinésithérapie', duration=45, service_type='therapy'
+        )
+        cls.day = timezone.localdate() + timedelta(days=2)
+
+    @classmethod
+    def create_user(cls, username, user_type):
+        return User.objects.create_user(
+            username=username, password='motdepasse', user_type=user_type,
+            first_name=username.capitalize(), last_name='Test', email=f'{username}@test.tn'
+        )
+
+    @classmethod
+    def create_doctor(cls, user, doctor_id, available_hours):
+        return Doctor.objects.create(
+            user=user, clinic=cls.clinic, doctor_id=doctor_id, specialization='Cardiologie',
+            license_number=f'L-{doctor_id}', years_of_experience=5, education='Faculté de médecine',
+            consultation_fee=50, available_hours=available_hours,
+            available_days=['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+        )
+
+    @classmethod
+    def create_patient(cls, user, patient_id):
+        return Patient.objects.create(
+            user=user, clinic=cls.clinic, patient_id=patient_id, gender='M',
+            emergency_contact_name='Contact', emergency_contact_phone='+21600000000',
+            emergency_contact_relationship='Parent'
+        )
+
+    def setUp(self):
+        # Le cache des créneaux (mémoire locale) n'est pas annulé avec la transaction du test
+        cache.clear()
+
+    def api(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def book(self, start, duration=30, doctor=None, patient=None, **kwargs):
+        """Crée un rendez-vous (signaux compris)"""
+        return Appointment.objects.create(
+            patient=patient or self.patient, doctor=doctor or self.doctor, clinic=self.clinic,
+            appointment_date=start, duration=duration, **kwargs
+        )
+
+    def create_conversation(self, *users, subject='Consultation'):
+        conversation = Conversation.objects.create(clinic=self.clinic, subject=subject)
+        conversation.participants.set(users)
+        return conversation
+
+    def send(self, user, conversation, content='Bonjour'):
+        """Envoie un message par l'API (compteurs et événements compris)"""
+        response = self.api(user).post(
+            '/api/messages/', {'conversation': conversation.id, 'content': content}, format='json'
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        return Message.objects.get(id=response.data['id'])
+
+    def booking_data(self, start, **kwargs):
+        data = {
+            'patient': self.patient.id, 'doctor': self.doctor.id, 'clinic': self.clinic.id,
+            'appointment_date': start.isoformat(),
+        }
+        data.update(kwargs)
+        return data
+
+
+class AppointmentConflictTests(MedFlowTestCase):
+    """Détection des conflits par une requête de chevauchement (user-001)"""
+
+    def test_overlapping_booking_is_rejected(self):
+        self.book(local_datetime(self.day, 10))
+        response = self.api(self.receptionist_user).post(
+            '/api/appointments/', self.booking_data(local_datetime(self.day, 10, 15), patient=self.patient2.id),
+            format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('appointment_date', response.data)
+
+    def test_adjacent_booking_is_accepted(self):
+        self.book(local_datetime(self.day, 10))
+        response = self.api(self.receptionist_user).post(
+            '/api/appointments/', self.booking_data(local_datetime(self.day, 10, 30)), format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        appointment = Appointment.objects.get(appointment_date=local_datetime(self.day, 10, 30))
+        self.assertEqual(appointment.end_date, local_datetime(self.day, 11))
+
+    def test_conflict_check_does_not_grow_with_history(self):
+        def validation_queries(history):
+            Appointment.objects.bulk_create([
+                Appointment(
+                    patient=self.patient, doctor=self.doctor, clinic=self.clinic,
+                    appointment_date=start, end_date=start + timedelta(minutes=30)
+                )
+                for start in (local_datetime(self.day - timedelta(days=400 + i), 10) for i in range(history))
+            ])
+            serializer = AppointmentCreateUpdateSerializer(data=self.booking_data(local_datetime(self.day, 14)))
+            with CaptureQueriesContext(connection) as queries:
+                self.assertTrue(serializer.is_valid(), serializer.errors)
+            return len(queries)
+
+        validation_queries(0)  # Compile le planning du médecin
+        self.assertEqual(validation_queries(5), validation_queries(200))
+
+
+class AvailableSlotsRangeTests(MedFlowTestCase):
+    """Créneaux disponibles sur une période (user-002)"""
+
+    def get_range(self, start_day, end_day):
+        return self.api(self.patient_user).get('/api/appointments/available_slots/', {
+            'doctor_id': self.doctor.id, 'start_date': start_day.isoformat(), 'end_date': end_day.isoformat()
+        })
+
+    def test_range_returns_slots_per_day(self):
+        self.book(local_datetime(self.day, 10))
+        response = self.get_range(self.day, self.day + timedelta(days=2))
+        self.assertEqual(response.status_code, 200)
+        days = response.data['days']
+        self.assertEqual(list(days), [(self.day + timedelta(days=i)).isoformat() for i in range(3)])
+
+        booked = local_datetime(self.day, 10).isoformat()
+        first_day = [slot['time'] for slot in days[self.day.isoformat()]]
+        next_day = [slot['time'] for slot in days[(self.day + timedelta(days=1)).isoformat()]]
+        self.assertNotIn(booked, first_day)
+        self.assertIn(local_datetime(self.day, 10, 30).isoformat(), first_day)
+        self.assertIn(local_datetime(self.day + timedelta(days=1), 10).isoformat(), next_day)
+        self.assertEqual(len(next_day), 16)  # 9h-17h par tranches de 30 minutes
+
+    def test_range_query_count_does_not_depend_on_days(self):
+        def range_queries(days):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.get_range(self.day, self.day + timedelta(days=days - 1)).status_code, 200)
+            return len(queries)
+
+        range_queries(1)  # Compile le planning du médecin
+        self.assertEqual(range_queries(2), range_queries(14))
+
+    def test_range_is_limited(self):
+        response = self.get_range(self.day, self.day + timedelta(days=100))
+        self.assertEqual(response.status_code, 400)
+
+    def test_mixed_or_partial_parameters_are_rejected(self):
+        client = self.api(self.patient_user)
+        for params in (
+            {'date': self.day.isoformat(), 'start_date': self.day.isoformat()},
+            {'date': self.day.isoformat(), 'start_date': self.day.isoformat(), 'end_date': self.day.isoformat()},
+            {'start_date': self.day.isoformat()},
+            {'end_date': self.day.isoformat()},
+        ):
+            response = client.get('/api/appointments/available_slots/', {'doctor_id': self.doctor.id, **params})
+            self.assertEqual(response.status_code, 400, params)
+
+
+class FirstAvailableTests(MedFlowTestCase):
+    """Premiers créneaux libres de la clinique, tous médecins confondus (user-003)"""
+
+    def search(self, **params):
+        params.setdefault('clinic_id', self.clinic.id)
+        response = self.api(self.patient_user).get('/api/appointments/first_available/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data['slots']
+
+    def test_slots_are_merged_in_chronological_order(self):
+        slots = self.search(limit=20, days=3)
+        self.assertEqual(len(slots), 20)
+        times = [slot['time'] for slot in slots]
+        self.assertEqual(times, sorted(times))
+        self.assertTrue(all(timezone.now().isoformat() < slot['time'] for slot in slots))
+
+    def test_specialization_filter(self):
+        Doctor.objects.filter(id=self.doctor2.id).update(specialization='Dermatologie')
+        slots = self.search(specialization='dermatologie', limit=50, days=5)
+        self.assertTrue(slots)
+        self.assertEqual({slot['doctor_id'] for slot in slots}, {self.doctor2.id})
+        for slot in slots:
+            self.assertTrue(time(10) <= datetime.fromisoformat(slot['time']).time() < time(12))
+
+    def test_invalid_clinic_id_is_rejected(self):
+        response = self.api(self.patient_user).get('/api/appointments/first_available/', {'clinic_id': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_booked_slot_is_skipped(self):
+        Doctor.objects.filter(id=self.doctor2.id).update(is_available=False)
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        self.book(local_datetime(tomorrow, 9))
+        times = [slot['time'] for slot in self.search(limit=50, days=2)]
+        self.assertNotIn(local_datetime(tomorrow, 9).isoformat(), times)
+        self.assertIn(local_datetime(tomorrow, 9, 30).isoformat(), times)
+
+
+class FreeBusyTests(MedFlowTestCase):
+    """Occupation des médecins en bitmaps de 5 minutes (user-004)"""
+
+    def busy(self, day):
+        return load_bitmaps([self.doctor.id], day, day).get((self.doctor.id, day), 0)
+
+    def test_booking_marks_buckets(self):
+        self.book(local_datetime(self.day, 10), duration=45)
+        # 10h00-10h45 : tranches 120 à 128
+        self.assertEqual(self.busy(self.day), bucket_mask(120, 129))
+
+    def test_migration_builds_the_same_bitmaps(self):
+        migration = importlib.import_module('core.migrations.0014_doctorfreebusy')
+        intervals = [
+            (local_datetime(self.day, 10), local_datetime(self.day, 10, 45)),
+            (local_datetime(self.day, 23, 50), local_datetime(self.day + timedelta(days=1), 0, 20)),
+        ]
+        self.assertEqual(migration.bitmaps_for_intervals(intervals), bitmaps_for_intervals(intervals))
+
+    def test_cancel_and_move_rebuild_the_day(self):
+        appointment = self.book(local_datetime(self.day, 10))
+        other = self.book(local_datetime(self.day, 11), patient=self.patient2)
+
+        appointment.status = 'cancelled'
+        appointment.save()
+        self.assertEqual(self.busy(self.day), bucket_mask(132, 138))
+
+        other.appointment_date = local_datetime(self.day + timedelta(days=1), 9)
+        other.save()
+        self.assertFalse(DoctorFreeBusy.objects.filter(doctor=self.doctor, day=self.day).exists())
+        self.assertEqual(self.busy(self.day + timedelta(days=1)), bucket_mask(108, 114))
+
+    def test_rebuild_command_verifies_and_repairs(self):
+        self.book(local_datetime(self.day, 10))
+        options = {'doctor': self.doctor.id, 'stdout': StringIO()}
+        call_command('rebuild_freebusy', verify=True, **options)
+
+        DoctorFreeBusy.objects.filter(doctor=self.doctor).delete()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_freebusy', verify=True, **options)
+
+        call_command('rebuild_freebusy', **options)
+        call_command('rebuild_freebusy', verify=True, **options)
+        self.assertEqual(from_bytes(DoctorFreeBusy.objects.get(doctor=self.doctor).busy), bucket_mask(120, 126))
+
+
+class SlotCacheTests(MedFlowTestCase):
+    """Cache des créneaux et invalidation par signaux (user-005)"""
+
+    def slot_times(self, doctor=None):
+        doctor = Doctor.objects.get(id=(doctor or self.doctor).id)
+        return [slot['time'] for slot in get_available_slots(doctor, self.day, self.day)[self.day.isoformat()]]
+
+    def test_second_read_is_a_hit(self):
+        self.slot_times()
+        self.assertEqual(slot_cache.get_stats()['misses'], 1)
+        self.slot_times()
+        stats = slot_cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_appointment_save_invalidates_its_day(self):
+        self.assertIn(local_datetime(self.day, 10).isoformat(), self.slot_times())
+        appointment = self.book(local_datetime(self.day, 10))
+        self.assertNotIn(local_datetime(self.day, 10).isoformat(), self.slot_times())
+
+        appointment.status = 'cancelled'
+        appointment.save()
+        self.assertIn(local_datetime(self.day, 10).isoformat(), self.slot_times())
+
+    def test_availability_change_invalidates_doctor(self):
+        self.assertEqual(len(self.slot_times()), 16)
+        doctor = Doctor.objects.get(id=self.doctor.id)
+        doctor.available_hours = {'start': '14:00', 'end': '16:00'}
+        doctor.save()
+        self.assertEqual(len(self.slot_times()), 4)
+
+    def test_stats_endpoint_is_admin_only(self):
+        self.assertEqual(self.api(self.patient_user).get('/api/appointments/slot_cache_stats/').status_code, 403)
+        response = self.api(self.admin_user).get('/api/appointments/slot_cache_stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('hit_rate', response.data)
+
+
+class AppointmentSeriesTests(MedFlowTestCase):
+    """Séries de rendez-vous récurrents (user-006)"""
+
+    def book_series(self, start, **kwargs):
+        data = self.booking_data(start, service=self.therapy.id, frequency='weekly', count=4)
+        data.update(kwargs)
+        return self.api(self.receptionist_user).post('/api/appointments/book_series/', data, format='json')
+
+    def test_series_is_created_in_one_request(self):
+        response = self.book_series(local_datetime(self.day, 10))
+        self.assertEqual(response.status_code, 201)
+        appointments = Appointment.objects.filter(series_id=response.data['series_id']).order_by('appointment_date')
+        self.assertEqual(
+            [apt.appointment_date for apt in appointments],
+            [local_datetime(self.day + timedelta(weeks=i), 10) for i in range(4)]
+        )
+        self.assertTrue(all(apt.duration == 45 for apt in appointments))
+
+    def test_conflicts_are_reported_per_occurrence(self):
+        busy = self.book(local_datetime(self.day + timedelta(weeks=1), 10, 30), patient=self.patient2)
+        response = self.book_series(local_datetime(self.day, 10))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([(c['index'], c['conflict_with']) for c in response.data['conflicts']], [(1, busy.id)])
+        self.assertFalse(Appointment.objects.filter(series_id__isnull=False).exists())
+
+        response = self.book_series(local_datetime(self.day, 10), skip_conflicts=True)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['appointments']), 3)
+
+    def test_series_without_any_free_occurrence_is_refused(self):
+        # 7h : toutes les occurrences sont hors du planning du médecin
+        response = self.book_series(local_datetime(self.day, 7), skip_conflicts=True)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(len(response.data['conflicts']), 4)
+        self.assertFalse(Appointment.objects.filter(series_id__isnull=False).exists())
+
+    def test_find_conflicts_only_reads_occurrence_windows(self):
+        days = [self.day + timedelta(weeks=i) for i in range(52)]
+        intervals = [(local_datetime(day, 10), local_datetime(day, 10, 30)) for day in days]
+        # Rendez-vous entre les occurrences : aucun conflit
+        for i in range(10):
+            self.book(local_datetime(self.day + timedelta(weeks=i, days=1), 10))
+        clash = self.book(local_datetime(self.day + timedelta(weeks=30), 10, 15), patient=self.patient2)
+
+        with CaptureQueriesContext(connection) as queries:
+            conflicts = find_conflicts(self.doctor.id, self.patient.id, intervals)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual({index: apt.id for index, apt in conflicts.items()}, {30: clash.id})
+
+    def test_cancel_series_backfills_waitlist(self):
+        response = self.book_series(local_datetime(self.day, 10), service=self.service.id, count=2)
+        first = Appointment.objects.filter(series_id=response.data['series_id']).earliest('appointment_date')
+        next_week = self.day + timedelta(weeks=1)
+        entry = WaitlistEntry.objects.create(
+            patient=self.patient2, clinic=self.clinic, doctor=self.doctor, duration=30,
+            earliest=local_datetime(next_week, 8), latest=local_datetime(next_week, 12)
+        )
+
+        response = self.api(self.receptionist_user).patch(f'/api/appointments/{first.id}/cancel_series/')
+        self.assertEqual(response.data['cancelled'], 2)
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'booked')
+        self.assertEqual(entry.appointment.appointment_date, local_datetime(next_week, 10))
+
+    def test_cancel_series_reads_the_waitlist_once(self):
+        response = self.book_series(local_datetime(self.day, 10), service=self.service.id)
+        first = Appointment.objects.filter(series_id=response.data['series_id']).earliest('appointment_date')
+        entries = [
+            WaitlistEntry.objects.create(
+                patient=self.patient2, clinic=self.clinic, doctor=self.doctor, duration=30,
+                earliest=local_datetime(self.day + timedelta(weeks=week), 8),
+                latest=local_datetime(self.day + timedelta(weeks=week), 12)
+            )
+            for week in range(4)
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api(self.receptionist_user).patch(f'/api/appointments/{first.id}/cancel_series/')
+        self.assertEqual(response.data['cancelled'], 4)
+        waitlist_reads = [q for q in queries if q['sql'].startswith('SELECT') and 'FROM "core_waitlistentry"' in q['sql']]
+        self.assertEqual(len(waitlist_reads), 1)
+        booked = WaitlistEntry.objects.filter(id__in=[entry.id for entry in entries], status='booked')
+        self.assertEqual(
+            sorted(entry.appointment.appointment_date for entry in booked),
+            [local_datetime(self.day + timedelta(weeks=week), 10) for week in range(4)]
+        )
+
+
+class DoctorScheduleTests(MedFlowTestCase):
+    """Planning compilé par jour de la semaine, pauses et exceptions (user-007)"""
+
+    def setUp(self):
+        super().setUp()
+        response = self.api(self.receptionist_user).put(f'/api/doctors/{self.doctor.id}/schedule/', {
+            'weekly': [
+                {'weekday': self.day.weekday(), 'start_time': '09:00', 'end_time': '12:00'},
+                {'weekday': self.day.weekday(), 'start_time': '10:00', 'end_time': '10:30', 'is_break': True},
+            ],
+            'exceptions': [{'date': (self.day + timedelta(weeks=1)).isoformat(), 'reason': 'Congé'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def slot_times(self, day):
+        doctor = Doctor.objects.get(id=self.doctor.id)
+        return [slot['time'] for slot in get_available_slots(doctor, day, day)[day.isoformat()]]
+
+    def test_slots_follow_weekly_intervals_and_breaks(self):
+        expected = [(9, 0), (9, 30), (10, 30), (11, 0), (11, 30)]
+        self.assertEqual(
+            self.slot_times(self.day),
+            [local_datetime(self.day, hour, minute).isoformat() for hour, minute in expected]
+        )
+        self.assertEqual(self.slot_times(self.day + timedelta(days=1)), [])
+        self.assertEqual(self.slot_times(self.day + timedelta(weeks=1)), [])
+
+    def test_schedule_is_recompiled_once_per_replacement(self):
+        touch = mock.Mock()
+        with mock.patch('core.views.touch_doctor', touch), mock.patch('core.signals.touch_doctor', touch):
+            response = self.api(self.receptionist_user).put(f'/api/doctors/{self.doctor.id}/schedule/', {
+                'weekly': [{'weekday': self.day.weekday(), 'start_time': '14:00', 'end_time': '15:00'}],
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        touch.assert_called_once_with(self.doctor.id)
+
+        self.assertEqual(DoctorScheduleException.objects.filter(doctor=self.doctor).count(), 0)
+        self.assertEqual(
+            self.slot_times(self.day),
+            [local_datetime(self.day, 14).isoformat(), local_datetime(self.day, 14, 30).isoformat()]
+        )
+
+    def test_booking_outside_schedule_is_rejected(self):
+        client = self.api(self.receptionist_user)
+        response = client.post(
+            '/api/appointments/', self.booking_data(local_datetime(self.day + timedelta(days=1), 10)), format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ne travaille pas', response.data['appointment_date'][0])
+
+        response = client.post('/api/appointments/', self.booking_data(local_datetime(self.day, 10)), format='json')
+        self.assertEqual(response.status_code, 400)
+        response = client.post('/api/appointments/', self.booking_data(local_datetime(self.day, 10, 30)), format='json')
+        self.assertEqual(response.status_code, 201)
+
+
+class SlotHoldTests(MedFlowTestCase):
+    """Réservations temporaires de créneaux (user-008)"""
+
+    def hold(self, user, start, **kwargs):
+        data = {'doctor': self.doctor.id, 'start_date': start.isoformat()}
+        data.update(kwargs)
+        return self.api(user).post('/api/appointments/hold_slot/', data, format='json')
+
+    def test_second_hold_on_same_slot_conflicts(self):
+        self.assertEqual(self.hold(self.patient_user, local_datetime(self.day, 10)).status_code, 201)
+        self.assertEqual(self.hold(self.patient2_user, local_datetime(self.day, 10)).status_code, 409)
+        self.assertEqual(self.hold(self.patient2_user, local_datetime(self.day, 10, 30)).status_code, 201)
+
+    def test_held_slot_is_hidden_from_others_only(self):
+        self.hold(self.patient_user, local_datetime(self.day, 10))
+        doctor = Doctor.objects.get(id=self.doctor.id)
+        held = local_datetime(self.day, 10).isoformat()
+        own = get_available_slots(doctor, self.day, self.day, user=self.patient_user)[self.day.isoformat()]
+        other = get_available_slots(doctor, self.day, self.day, user=self.patient2_user)[self.day.isoformat()]
+        self.assertIn(held, [slot['time'] for slot in own])
+        self.assertNotIn(held, [slot['time'] for slot in other])
+
+    def test_booking_over_another_users_hold_is_rejected(self):
+        self.hold(self.patient2_user, local_datetime(self.day, 10))
+        response = self.api(self.patient_user).post(
+            '/api/appointments/', self.booking_data(local_datetime(self.day, 10)), format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_series_booking_honors_holds(self):
+        self.hold(self.patient2_user, local_datetime(self.day + timedelta(weeks=1), 10))
+        data = self.booking_data(local_datetime(self.day, 10), frequency='weekly', count=3)
+        client = self.api(self.receptionist_user)
+        response = client.post('/api/appointments/book_series/', data, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([conflict['index'] for conflict in response.data['conflicts']], [1])
+
+        response = client.post('/api/appointments/book_series/', dict(data, skip_conflicts=True), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['appointments']), 2)
+
+    def test_series_reschedule_honors_holds(self):
+        response = self.api(self.receptionist_user).post(
+            '/api/appointments/book_series/',
+            self.booking_data(local_datetime(self.day, 10), frequency='weekly', count=2), format='json'
+        )
+        first = Appointment.objects.filter(series_id=response.data['series_id']).earliest('appointment_date')
+        self.hold(self.patient2_user, local_datetime(self.day + timedelta(weeks=1), 14))
+
+        response = self.api(self.receptionist_user).patch(
+            f'/api/appointments/{first.id}/reschedule_series/',
+            {'appointment_date': local_datetime(self.day, 14).isoformat()}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([conflict['index'] for conflict in response.data['conflicts']], [1])
+        first.refresh_from_db()
+        self.assertEqual(first.appointment_date, local_datetime(self.day, 10))
+
+    def test_hold_duration_is_capped(self):
+        response = self.hold(self.patient_user, local_datetime(self.day, 9), duration=8 * 60)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('duration', response.data)
+        response = self.hold(self.patient_user, local_datetime(self.day, 9), duration=45)
+        self.assertEqual(response.status_code, 201)
+
+
+class ReminderTests(MedFlowTestCase):
+    """Envoi des rappels par lots, sans doublon entre exécutions (user-009)"""
+
+    def setUp(self):
+        super().setUp()
+        soon = timezone.now() + timedelta(hours=2)
+        self.due = [self.book(soon + timedelta(minutes=30 * i)) for i in range(3)]
+        self.later = self.book(timezone.now() + timedelta(days=3))
+
+    def test_due_reminders_are_sent_once(self):
+        self.assertEqual(dispatch_reminders(batch_size=2), {'sent': 3, 'skipped': 0})
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(Appointment.objects.filter(reminder_sent=True).count(), 3)
+        self.assertEqual(dispatch_reminders(), {'sent': 0, 'skipped': 0})
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_rows_claimed_by_another_run_are_skipped(self):
+        claimed = claim_page([self.due[0].id, self.due[1].id], uuid.uuid4())
+        self.assertEqual(len(claimed), 2)
+        self.assertEqual(dispatch_reminders(), {'sent': 1, 'skipped': 0})
+        self.assertEqual(mail.outbox[0].to, [self.patient_user.email])
+
+    def test_send_failure_releases_claim(self):
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=SMTPException
+        ):
+            with self.assertRaises(SMTPException):
+                dispatch_reminders()
+        self.assertFalse(Appointment.objects.filter(reminder_sent=True).exists())
+        self.assertEqual(dispatch_reminders()['sent'], 3)
+
+    def test_patient_without_email_is_skipped(self):
+        User.objects.filter(id=self.patient_user.id).update(email='')
+        self.assertEqual(dispatch_reminders(dry_run=True), {'sent': 0, 'skipped': 3})
+        self.assertEqual(dispatch_reminders(), {'sent': 0, 'skipped': 3})
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Appointment.objects.filter(reminder_sent=True).count(), 3)
+
+
+class StatusSweepTests(MedFlowTestCase):
+    """Clôture des rendez-vous passés par lots d'UPDATE (user-010)"""
+
+    def setUp(self):
+        super().setUp()
+        past = timezone.now() - timedelta(days=1)
+        self.scheduled = [self.book(past + timedelta(minutes=30 * i)) for i in range(3)]
+        self.in_progress = self.book(past - timedelta(hours=3), status='in_progress')
+        self.recent = self.book(timezone.now() - timedelta(minutes=40))
+        self.future = self.book(timezone.now() + timedelta(days=1))
+
+    def test_rules_are_applied_in_chunks(self):
+        with CaptureQueriesContext(connection) as queries:
+            counts = sweep_appointments(grace=timedelta(minutes=60), chunk_size=2)
+        self.assertEqual(counts, {'scheduled -> no_show': 3, 'confirmed -> no_show': 0, 'in_progress -> completed': 1})
+        self.assertEqual(
+            sorted(Appointment.objects.values_list('status', flat=True)),
+            ['completed', 'no_show', 'no_show', 'no_show', 'scheduled', 'scheduled']
+        )
+        updates = [query for query in queries if query['sql'].startswith('UPDATE "core_appointment"')]
+        self.assertEqual(len(updates), 3)  # 2 lots de rendez-vous planifiés + 1 lot en cours
+
+    def test_dry_run_changes_nothing(self):
+        counts = sweep_appointments(dry_run=True)
+        self.assertEqual(counts['scheduled -> no_show'], 3)
+        self.assertFalse(Appointment.objects.exclude(status__in=['scheduled', 'in_progress']).exists())
+
+    @override_settings(APPOINTMENT_SWEEP_RULES={'scheduled': 'completed'})
+    def test_rules_come_from_settings(self):
+        self.assertEqual(sweep_appointments(), {'scheduled -> completed': 3})
+        self.assertEqual(Appointment.objects.get(id=self.in_progress.id).status, 'in_progress')
+
+
+class CalendarFeedTests(MedFlowTestCase):
+    """Flux iCalendar par jeton avec GET conditionnel (user-011)"""
+
+    def setUp(self):
+        super().setUp()
+        self.first = self.book(local_datetime(self.day, 10))
+        self.second = self.book(local_datetime(self.day, 11), patient=self.patient2)
+        # Rendez-vous modifiés il y a dix minutes
+        Appointment.objects.update(updated_at=timezone.now() - timedelta(minutes=10))
+        response = self.api(self.doctor_user).post(f'/api/doctors/{self.doctor.id}/calendar_feed/')
+        self.assertEqual(response.status_code, 201)
+        self.token = response.data['token']
+        self.url = f'/api/calendar/{self.token}.ics'
+
+    def fetch(self, **headers):
+        return Client().get(self.url, headers=headers)
+
+    def test_feed_is_streamed_with_validators(self):
+        response = self.fetch()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn(f'UID:appointment-{self.first.id}@medflow', body)
+        self.assertIn(f'UID:appointment-{self.second.id}@medflow', body)
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertTrue(response['ETag'] and response['Last-Modified'])
+
+    def test_unchanged_feed_returns_304(self):
+        response = self.fetch()
+        self.assertEqual(self.fetch(if_none_match=response['ETag']).status_code, 304)
+        self.assertEqual(self.fetch(if_modified_since=response['Last-Modified']).status_code, 304)
+
+    def test_cancelling_any_appointment_changes_the_feed(self):
+        response = self.fetch()
+        self.first.status = 'cancelled'
+        self.first.save()
+
+        for headers in ({'if_none_match': response['ETag']}, {'if_modified_since': response['Last-Modified']}):
+            changed = self.fetch(**headers)
+            self.assertEqual(changed.status_code, 200)
+        body = b''.join(changed.streaming_content).decode()
+        event = body[body.index(f'UID:appointment-{self.first.id}@medflow'):]
+        self.assertIn('STATUS:CANCELLED', event[:event.index('END:VEVENT')])
+
+    def test_revoked_token_is_refused(self):
+        self.api(self.doctor_user).delete(f'/api/doctors/{self.doctor.id}/calendar_feed/')
+        self.assertEqual(self.fetch().status_code, 404)
+
+
+class WaitlistTests(MedFlowTestCase):
+    """Attribution des créneaux libérés à la liste d'attente (user-012)"""
+
+    def join_waitlist(self, user, **kwargs):
+        data = {
+            'patient': self.patient2.id, 'clinic': self.clinic.id, 'duration': 30,
+            'earliest': local_datetime(self.day, 8).isoformat(), 'latest': local_datetime(self.day, 12).isoformat(),
+        }
+        data.update(kwargs)
+        response = self.api(user).post('/api/waitlist/', data, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return WaitlistEntry.objects.get(id=response.data['id'])
+
+    def cancel(self, appointment):
+        response = self.api(self.receptionist_user).patch(f'/api/appointments/{appointment.id}/cancel/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_cancelled_slot_goes_to_first_matching_entry(self):
+        appointment = self.book(local_datetime(self.day, 10))
+        too_late = self.join_waitlist(
+            self.patient2_user, doctor=self.doctor.id, earliest=local_datetime(self.day, 11).isoformat()
+        )
+        entry = self.join_waitlist(self.patient2_user, specialization='Cardiologie')
+
+        self.cancel(appointment)
+        entry.refresh_from_db()
+        too_late.refresh_from_db()
+        self.assertEqual(entry.status, 'booked')
+        self.assertEqual(entry.appointment.appointment_date, local_datetime(self.day, 10))
+        self.assertEqual(entry.appointment.patient, self.patient2)
+        self.assertEqual(too_late.status, 'waiting')
+
+    def test_entry_is_skipped_when_patient_is_busy(self):
+        appointment = self.book(local_datetime(self.day, 10))
+        self.book(local_datetime(self.day, 10), doctor=self.doctor2, patient=self.patient2)
+        entry = self.join_waitlist(self.patient2_user, doctor=self.doctor.id)
+
+        self.cancel(appointment)
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'waiting')
+
+    def test_patient_can_only_register_themselves(self):
+        response = self.api(self.patient_user).post('/api/waitlist/', {
+            'patient': self.patient2.id, 'clinic': self.clinic.id, 'doctor': self.doctor.id,
+            'earliest': local_datetime(self.day, 8).isoformat(), 'latest': local_datetime(self.day, 12).isoformat(),
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ConversationListTests(MedFlowTestCase):
+    """Liste des conversations annotée, sans requête par conversation (user-013)"""
+
+    def create_conversations(self, count):
+        conversations = []
+        for i in range(count):
+            member = self.create_user(f'member{Conversation.objects.count()}', 'patient')
+            conversation = self.create_conversation(self.doctor_user, member, subject=f'Sujet {i}')
+            Message.objects.bulk_create([
+                Message(conversation=conversation, sender=member, content=f'Message {j} de {i}') for j in range(3)
+            ])
+            conversations.append(conversation)
+        return conversations
+
+    def list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.api(self.doctor_user).get('/api/conversations/')
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_query_count_is_constant(self):
+        self.create_conversations(2)
+        _response, few = self.list_queries()
+        self.create_conversations(20)
+        response, many = self.list_queries()
+        self.assertEqual(len(response.data), 22)
+        self.assertEqual(few, many)
+
+    def test_last_message_and_unread_count(self):
+        conversation = self.create_conversation(self.doctor_user, self.patient_user)
+        self.send(self.patient_user, conversation, 'Premier')
+        self.send(self.patient_user, conversation, 'x' * 150)
+
+        response, _queries = self.list_queries()
+        entry = response.data[0]
+        self.assertEqual(entry['last_message']['content'], 'x' * 100)
+        self.assertEqual(entry['last_message']['sender_name'], 'Patient Test')
+        self.assertEqual(entry['unread_count'], 2)
+
+
+class MessageSyncTests(MedFlowTestCase):
+    """Synchronisation incrémentale d'une conversation (user-014)"""
+
+    def setUp(self):
+        super().setUp()
+        self.conversation = self.create_conversation(self.doctor_user, self.patient_user)
+        self.first = self.send(self.patient_user, self.conversation, 'Bonjour docteur')
+
+    def sync(self, user, cursor):
+        response = self.api(user).get('/api/messages/sync/', {'conversation': self.conversation.id, 'cursor': cursor})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_only_new_messages_are_returned(self):
+        empty = self.sync(self.patient_user, f'{self.first.id}.0')
+        self.assertEqual(empty['messages'], [])
+
+        reply = self.send(self.doctor_user, self.conversation, 'Bonjour')
+        data = self.sync(self.patient_user, empty['cursor'])
+        self.assertEqual([message['id'] for message in data['messages']], [reply.id])
+
+        again = self.sync(self.patient_user, data['cursor'])
+        self.assertEqual(again['messages'], [])
+
+    def test_empty_sync_is_cheap(self):
+        cursor = self.sync(self.patient_user, f'{self.first.id}.0')['cursor']
+        with CaptureQueriesContext(connection) as queries:
+            self.sync(self.patient_user, cursor)
+        self.assertLessEqual(len(queries), 4)
+
+    def test_non_participant_is_refused(self):
+        response = self.api(self.patient2_user).get('/api/messages/sync/', {'conversation': self.conversation.id})
+        self.assertEqual(response.status_code, 404)
+
+
+class MessageEventsTests(MedFlowTestCase):
+    """Flux server-sent events de la messagerie (user-015)"""
+
+    async def test_stream_requires_a_ticket(self):
+        client = AsyncClient()
+        self.assertEqual((await client.get('/api/events/messages/')).status_code, 401)
+        self.assertEqual((await client.get('/api/events/messages/', {'ticket': 'invalide'})).status_code, 401)
+        # Le jeton JWT n'est plus accepté dans l'URL
+        token = str(AccessToken.for_user(self.patient_user))
+        self.assertEqual((await client.get('/api/events/messages/', {'token': token})).status_code, 401)
+
+    async def test_stream_is_opened_with_a_single_use_ticket(self):
+        response = await AsyncClient().post(
+            '/api/events/messages/ticket/', headers={'Authorization': f'Bearer {AccessToken.for_user(self.patient_user)}'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['supported'])
+        ticket = response.json()['ticket']
+
+        response = await AsyncClient().get('/api/events/messages/', {'ticket': ticket})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual((await AsyncClient().get('/api/events/messages/', {'ticket': ticket})).status_code, 401)
+
+    def test_stream_is_refused_without_an_asgi_server(self):
+        ticket = issue_stream_ticket(self.patient_user.id)
+        self.assertEqual(Client().get('/api/events/messages/', {'ticket': ticket}).status_code, 503)
+        response = self.api(self.patient_user).post('/api/events/messages/ticket/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {'supported': False, 'ticket': None})
+
+    def test_sent_message_is_published_to_participants(self):
+        conversation = self.create_conversation(self.doctor_user, self.patient_user)
+        with mock.patch.object(get_broker(), 'publish') as publish, self.captureOnCommitCallbacks(execute=True):
+            message = self.send(self.patient_user, conversation, 'Bonjour')
+        published = {(channel, event['type']) for (channel, event), _ in publish.call_args_list}
+        self.assertEqual(published, {
+            (user_channel(self.patient_user.id), 'message'),
+            (user_channel(self.doctor_user.id), 'message'),
+            (user_channel(self.doctor_user.id), 'unread'),
+            # Dernier message lu de l'expéditeur : accusé pour les autres, non lus remis à zéro pour lui
+            (user_channel(self.doctor_user.id), 'read'),
+            (user_channel(self.patient_user.id), 'unread'),
+        })
+        event = next(event for (channel, event), _ in publish.call_args_list if event['type'] == 'message')
+        self.assertEqual(event['data']['id'], message.id)
+
+    async def test_stream_yields_published_events(self):
+        stream = event_stream(self.patient_user.id)
+        self.assertEqual(await anext(stream), 'retry: 5000\n\n')
+        get_broker().publish(user_channel(self.patient_user.id), {'type': 'read', 'data': {'conversation': 1}})
+        self.assertEqual(await anext(stream), 'event: read\ndata: {"conversation": 1}\n\n')
+        await stream.aclose()
+        self.assertNotIn(user_channel(self.patient_user.id), get_broker()._subscribers)
+
+
+class UnreadCounterTests(MedFlowTestCase):
+    """Compteurs de messages non lus par conversation (user-016)"""
+
+    def setUp(self):
+        super().setUp()
+        self.conversation = self.create_conversation(self.doctor_user, self.patient_user)
+        self.messages = [self.send(self.patient_user, self.conversation, f'Message {i}') for i in range(3)]
+
+    def counts(self, user):
+        return self.api(user).get('/api/conversations/unread_counts/').data
+
+    def test_messages_are_counted_for_recipients_only(self):
+        self.assertEqual(self.counts(self.doctor_user), {'total': 3, 'conversations': {self.conversation.id: 3}})
+        self.assertEqual(self.counts(self.patient_user), {'total': 0, 'conversations': {}})
+
+    def test_reading_a_message_counts_the_remaining_ones(self):
+        response = self.api(self.doctor_user).post(f'/api/messages/{self.messages[1].id}/mark_as_read/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.counts(self.doctor_user)['total'], 1)
+
+        # Relire un message plus ancien ne fait pas reculer le dernier message lu
+        self.api(self.doctor_user).post(f'/api/messages/{self.messages[0].id}/mark_as_read/')
+        self.assertEqual(self.counts(self.doctor_user)['total'], 1)
+
+    def test_reading_the_conversation_resets_the_counter(self):
+        self.api(self.doctor_user).post(f'/api/conversations/{self.conversation.id}/mark_as_read/')
+        self.assertEqual(self.counts(self.doctor_user)['total'], 0)
+
+        self.send(self.patient_user, self.conversation, 'Encore un message')
+        self.assertEqual(self.counts(self.doctor_user)['total'], 1)
+
+    def test_counts_are_read_in_one_query(self):
+        client = self.api(self.doctor_user)
+        with CaptureQueriesContext(connection) as queries:
+            client.get('/api/conversations/unread_counts/')
+        self.assertEqual(len(queries), 1)
+
+
+class ReadStateTests(MedFlowTestCase):
+    """Dernier message lu par participant, sans état de lecture sur les messages (user-017)"""
+
+    def setUp(self):
+        super().setUp()
+        self.conversation = self.create_conversation(self.doctor_user, self.patient_user)
+        self.messages = [self.send(self.patient_user, self.conversation, f'Message {i}') for i in range(2)]
+
+    def test_messages_carry_no_read_flag(self):
+        data = self.api(self.doctor_user).get(f'/api/messages/{self.messages[0].id}/').data
+        self.assertNotIn('is_read', data)
+        self.assertNotIn('read_at', data)
+
+    def test_message_received_after_the_watermark_stays_unread(self):
+        # Un message arrive entre la lecture du dernier message et l'écriture du seuil
+        watermark = self.messages[-1].id
+        late = self.send(self.patient_user, self.conversation, 'Arrivé pendant la lecture')
+        self.assertEqual(unread.mark_read(self.doctor_user.id, self.conversation.id, watermark), (watermark, 1))
+        self.assertEqual(unread.get_state(self.doctor_user.id, self.conversation.id), (watermark, 1))
+
+        with mock.patch.object(unread, 'latest_message_id', return_value=watermark):
+            self.assertEqual(unread.mark_read(self.doctor_user.id, self.conversation.id), (watermark, 1))
+        self.assertEqual(unread.mark_read(self.doctor_user.id, self.conversation.id), (late.id, 0))
+
+    def test_sync_returns_new_read_receipts(self):
+        cursor = self.api(self.patient_user).get(
+            '/api/messages/sync/', {'conversation': self.conversation.id, 'cursor': f'{self.messages[-1].id}.0'}
+        ).data['cursor']
+        self.api(self.doctor_user).post(f'/api/conversations/{self.conversation.id}/mark_as_read/')
+
+        data = self.api(self.patient_user).get(
+            '/api/messages/sync/', {'conversation': self.conversation.id, 'cursor': cursor}
+        ).data
+        self.assertEqual(
+            [(receipt['user_id'], receipt['last_read_message_id']) for receipt in data['read_receipts']],
+            [(self.doctor_user.id, self.messages[-1].id)]
+        )
+        again = self.api(self.patient_user).get(
+            '/api/messages/sync/', {'conversation': self.conversation.id, 'cursor': data['cursor']}
+        ).data
+        self.assertEqual(again['read_receipts'], [])
+
+    def test_own_messages_are_never_unread(self):
+        self.assertEqual(unread.mark_read(self.patient_user.id, self.conversation.id, self.messages[0].id)[1], 0)
+
+
+class ConversationSignatureTests(MedFlowTestCase):
+    """Unicité des conversations actives par empreinte des participants (user-018)"""
+
+    def create(self, user, *participants):
+        return self.api(user).post('/api/conversations/', {
+            'clinic': self.clinic.id, 'subject': 'Consultation', 'participants': [p.id for p in participants]
+        }, format='json')
+
+    def test_same_participants_return_the_existing_conversation(self):
+        created = self.create(self.patient_user, self.patient_user, self.doctor_user)
+        self.assertEqual(created.status_code, 201)
+
+        # L'ordre et l'auteur de la demande ne changent pas l'empreinte
+        found = self.create(self.doctor_user, self.doctor_user, self.patient_user)
+        self.assertEqual(found.status_code, 200)
+        self.assertEqual(found.data['id'], created.data['id'])
+        self.assertEqual(Conversation.objects.count(), 1)
+
+    def test_signature_follows_participant_changes(self):
+        conversation = self.create_conversation(self.doctor_user, self.patient_user)
+        conversation.participants.add(self.patient2_user)
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.participants_hash, Conversation.participants_signature(
+            [self.doctor_user.id, self.patient_user.id, self.patient2_user.id]
+        ))
+
+    def test_adding_a_participant_cannot_duplicate_a_conversation(self):
+        pair = self.create_conversation(self.doctor_user, self.patient_user)
+        self.create_conversation(self.doctor_user, self.patient_user, self.patient2_user)
+
+        response = self.api(self.doctor_user).post(
+            f'/api/conversations/{pair.id}/add_participant/', {'user_id': self.patient2_user.id}, format='json'
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(
+            set(pair.participants.values_list('id', flat=True)), {self.doctor_user.id, self.patient_user.id}
+        )
+
+    def test_updating_participants_cannot_duplicate_a_conversation(self):
+        self.create_conversation(self.doctor_user, self.patient_user)
+        other = self.create_conversation(self.doctor_user, self.patient2_user)
+
+        response = self.api(self.doctor_user).patch(f'/api/conversations/{other.id}/', {
+            'clinic': self.clinic.id, 'participants': [self.doctor_user.id, self.patient_user.id]
+        }, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(
+            set(other.participants.values_list('id', flat=True)), {self.doctor_user.id, self.patient2_user.id}
+        )
+
+    def test_signature_follows_a_cleared_user(self):
+        conversation = self.create_conversation(self.doctor_user, self.patient_user, self.patient2_user)
+        self.patient2_user.conversations.clear()
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.participants_hash, Conversation.participants_signature(
+            [self.doctor_user.id, self.patient_user.id]
+        ))
+
+
+class ClearedHistoryTests(MedFlowTestCase):
+    """Effacement de l'historique par un seuil de message (user-019)"""
+
+    def setUp(self):
+        super().setUp()
+        self.conversation = self.create_conversation(self.doctor_user, self.patient_user)
+        self.old = [self.send(self.patient_user, self.conversation, f'Ancien {i}') for i in range(2)]
+        response = self.api(self.doctor_user).delete(f'/api/conversations/{self.conversation.id}/')
+        self.assertEqual(response.status_code, 200)
+
+    def message_ids(self, user, **params):
+        data = self.api(user).get('/api/messages/', params).data
+        # La liste d'une conversation peut être paginée
+        return [message['id'] for message in (data['results'] if isinstance(data, dict) else data)]
+
+    def test_cleared_messages_are_hidden_from_that_user_only(self):
+        self.assertEqual(self.message_ids(self.doctor_user, conversation=self.conversation.id), [])
+        self.assertEqual(self.message_ids(self.doctor_user), [])
+        self.assertEqual(self.api(self.doctor_user).get(f'/api/messages/{self.old[0].id}/').status_code, 404)
+        self.assertEqual(
+            self.message_ids(self.patient_user, conversation=self.conversation.id), [m.id for m in self.old]
+        )
+
+    def test_messages_after_the_threshold_are_visible(self):
+        self.assertEqual(unread.get_counts(self.doctor_user.id)[0], 0)
+        new = self.send(self.patient_user, self.conversation, 'Nouveau')
+        self.assertEqual(self.message_ids(self.doctor_user, conversation=self.conversation.id), [new.id])
+        self.assertEqual(self.message_ids(self.doctor_user), [new.id])
+        self.assertEqual(unread.get_counts(self.doctor_user.id)[0], 1)
+
+
+class MessageSearchTests(MedFlowTestCase):
+    """Recherche plein texte et réparation de l'index (user-020)"""
+
+    def setUp(self):
+        super().setUp()
+        self.conversation = self.create_conversation(self.doctor_user, self.patient_user)
+        self.message = self.send(self.patient_user, self.conversation, 'Résultats de la radiographie du genou')
+        self.send(self.patient_user, self.conversation, 'Merci docteur')
+
+    def search(self, user, q):
+        response = self.api(user).get('/api/messages/search/', {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return [message['id'] for message in response.data['results']]
+
+    def test_search_matches_prefixes_without_accents_for_participants(self):
+        self.assertEqual(self.search(self.doctor_user, 'resultat radio'), [self.message.id])
+        self.assertEqual(self.search(self.patient2_user, 'radiographie'), [])
+
+    def test_missing_triggers_are_restored_after_migrations(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {search.FTS_TABLE}_insert')
+        unindexed = self.send(self.patient_user, self.conversation, 'Ordonnance renouvelée')
+        self.assertEqual(self.search(self.doctor_user, 'ordonnance'), [])
+
+        post_migrate.send(
+            sender=apps.get_app_config('core'), app_config=apps.get_app_config('core'),
+            verbosity=0, interactive=False, using='default', apps=apps, plan=[]
+        )
+        self.assertEqual(self.search(self.doctor_user, 'ordonnance'), [unindexed.id])
+        new = self.send(self.patient_user, self.conversation, 'Nouvelle ordonnance')
+        self.assertEqual(set(self.search(self.doctor_user, 'ordonnance')), {unindexed.id, new.id})
+        self.assertFalse(search.repair_index())
+
+
+class MessageHistoryTests(MedFlowTestCase):
+    """Pagination par clé (created_at, id) de l'historique (user-021)"""
+
+    def setUp(self):
+        super().setUp()
+        self.conversation = self.create_conversation(self.doctor_user, self.patient_user)
+        messages = Message.objects.bulk_create([
+            Message(conversation=self.conversation, sender=self.patient_user, content=f'Message {i}') for i in range(7)
+        ])
+        self.ids = sorted(message.id for message in messages)
+        # Même date pour tous : l'id départage
+        Message.objects.filter(id__in=self.ids).update(created_at=timezone.now() - timedelta(hours=1))
+
+    def page(self, **params):
+        response = self.api(self.doctor_user).get(
+            '/api/messages/', {'conversation': self.conversation.id, 'page_size': 3, **params}
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_older_pages_follow_the_cursor_without_gaps(self):
+        pages = [self.page()]
+        while pages[-1]['has_more']:
+            pages.append(self.page(before=pages[-1]['older_cursor']))
+        self.assertEqual(
+            [[message['id'] for message in page['results']] for page in pages],
+            [self.ids[4:], self.ids[1:4], self.ids[:1]]
+        )
+
+    def test_newer_messages_after_the_cursor(self):
+        first = self.page()
+        new = self.send(self.patient_user, self.conversation, 'Nouveau')
+        newer = self.page(after=first['newer_cursor'])
+        self.assertEqual([message['id'] for message in newer['results']], [new.id])
+        self.assertFalse(newer['has_more'])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.api(self.doctor_user).get(
+            '/api/messages/', {'conversation': self.conversation.id, 'before': 'invalide'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class MessageArchiveTests(MedFlowTestCase):
+    """Archivage des messages anciens (user-022)"""
+
+    def setUp(self):
+        super().setUp()
+        self.conversation = self.create_conversation(self.doctor_user, self.patient_user)
+        self.messages = [self.send(self.patient_user, self.conversation, f'Message ancien {i}') for i in range(3)]
+        Message.objects.filter(id__in=[m.id for m in self.messages]).update(
+            created_at=timezone.now() - timedelta(days=400)
+        )
+
+    def test_old_messages_move_to_the_archive(self):
+        self.assertEqual(archive_messages(days=365, batch_size=2), 3)
+        self.assertFalse(Message.objects.exists())
+        self.assertEqual(
+            [(m.id, m.content) for m in ArchivedMessage.objects.order_by('id')],
+            [(m.id, m.content) for m in self.messages]
+        )
+
+    def test_already_archived_messages_are_not_copied_twice(self):
+        # Lot déjà copié par une exécution concurrente
+        first = self.messages[0]
+        ArchivedMessage.objects.create(
+            id=first.id, conversation=self.conversation, sender=self.patient_user,
+            compressed_content=ArchivedMessage.compress(first.content),
+            created_at=first.created_at, updated_at=first.updated_at
+        )
+        self.assertEqual(archive_messages(days=365), 3)
+        self.assertEqual(ArchivedMessage.objects.count(), 3)
+        self.assertEqual(archive_messages(days=365), 0)
+
+    def test_conversation_list_falls_back_to_the_archive(self):
+        archive_messages(days=365)
+        last = self.messages[-1]
+        entry = self.api(self.doctor_user).get('/api/conversations/').data[0]
+        self.assertEqual(entry['last_message']['id'], last.id)
+        self.assertEqual(entry['last_message']['content'], last.content)
+        self.assertEqual(entry['last_message']['sender_name'], self.patient_user.get_full_name())
+
+        new = self.send(self.patient_user, self.conversation, 'Message récent')
+        entry = self.api(self.doctor_user).get('/api/conversations/').data[0]
+        self.assertEqual((entry['last_message']['id'], entry['last_message']['content']), (new.id, new.content))
+
+
+    def test_search_reports_that_the_archive_is_not_searched(self):
+        def search(user):
+            return self.api(user).get('/api/messages/search/', {'q': 'ancien'}).data
+
+        response = search(self.patient_user)
+        self.assertEqual((len(response['results']), response['archived_excluded']), (3, False))
+        unread.clear_history(self.doctor_user.id, self.conversation.id)
+        archive_messages(days=365)
+
+        response = search(self.patient_user)
+        self.assertEqual((response['results'], response['archived_excluded']), ([], True))
+        # Historique effacé : aucun message archivé visible
+        self.assertFalse(search(self.doctor_user)['archived_excluded'])
+
+
+class AnnouncementTests(MedFlowTestCase):
+    """Diffusion des annonces de clinique par remises (user-023)"""
+
+    def announce(self, user, audience='patients'):
+        return self.api(user).post('/api/announcements/', {
+            'title': 'Fermeture', 'content': 'La clinique sera fermée lundi', 'audience': audience
+        }, format='json')
+
+    def test_announcement_is_delivered_to_its_audience(self):
+        response = self.announce(self.receptionist_user)
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['recipient_count'], 2)
+        self.assertFalse(Conversation.objects.exists())
+
+        self.assertEqual(len(self.api(self.patient2_user).get('/api/announcements/').data), 1)
+        self.assertEqual(self.api(self.doctor_user).get('/api/announcements/').data, [])
+
+        self.assertEqual(self.announce(self.receptionist_user, 'all').data['recipient_count'], 5)
+
+    def test_reads_are_counted_for_staff(self):
+        announcement_id = self.announce(self.receptionist_user).data['id']
+        self.api(self.patient_user).post(f'/api/announcements/{announcement_id}/mark_as_read/')
+
+        self.assertIsNotNone(self.api(self.patient_user).get('/api/announcements/').data[0]['read_at'])
+        self.assertIsNone(self.api(self.patient2_user).get('/api/announcements/').data[0]['read_at'])
+        self.assertEqual(self.api(self.receptionist_user).get('/api/announcements/').data[0]['read_count'], 1)
+
+    def test_patients_cannot_announce(self):
+        self.assertEqual(self.announce(self.patient_user).status_code, 400)
+
+    def test_fan_out_queries_do_not_grow_with_recipients(self):
+        def publish():
+            announcement = Announcement.objects.create(
+                clinic=self.clinic, author=self.receptionist_user, title='Info', content='Info', audience='patients'
+            )
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(publish_announcement(announcement, batch_size=100), Patient.objects.count())
+            return len(queries)
+
+        few = publish()
+        for i in range(20):
+            self.create_patient(self.create_user(f'diffusion{i}', 'patient'), f'PD{i}')
+        self.assertEqual(publish(), few)
+
+
+class MessageSendQueryTests(MedFlowTestCase):
+    """Envoi d'un message en nombre de requêtes constant (user-024)"""
+
+    def send_queries(self, participant_count):
+        members = [self.create_user(f'groupe{participant_count}_{i}', 'patient') for i in range(participant_count - 1)]
+        conversation = self.create_conversation(self.doctor_user, *members)
+        client = self.api(self.doctor_user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(
+                '/api/messages/', {'conversation': conversation.id, 'content': 'Bonjour à tous'}, format='json'
+            )
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(unread.get_state(members[-1].id, conversation.id)[1], 1)
+        return len(queries)
+
+    def test_queries_do_not_grow_with_participants(self):
+        counts = [self.send_queries(count) for count in (2, 10, 30)]
+        self.assertEqual(counts, [counts[0]] * 3)
+
+
+class MessageAttachmentTests(MedFlowTestCase):
+    """Pièces jointes stockées par adresse de contenu (user-025)"""
+
+    def setUp(self):
+        super().setUp()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = root.name
+        settings_override = override_settings(ATTACHMENTS_ROOT=self.root, ATTACHMENT_MAX_SIZE=1024)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.conversation = self.create_conversation(self.doctor_user, self.patient_user)
+
+    def upload(self, content, name='resultats.pdf'):
+        data = {'conversation': self.conversation.id, 'content': 'Voici le document'}
+        if content is not None:
+            data['file'] = SimpleUploadedFile(name, content, 'application/pdf')
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.api(self.patient_user).post('/api/messages/', data, format='multipart')
+
+    def blobs(self):
+        return sorted(
+            name for directory, _, names in os.walk(self.root) if not directory.endswith('tmp') for name in names
+        )
+
+    def temporary_files(self):
+        directory = os.path.join(self.root, 'tmp')
+        return os.listdir(directory) if os.path.isdir(directory) else []
+
+    def test_message_and_files_are_created_together(self):
+        with mock.patch.object(get_broker(), 'publish') as publish:
+            response = self.upload(b'%PDF-1.4 ordonnance')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual([a['filename'] for a in response.data['attachments']], ['resultats.pdf'])
+        # L'événement publié contient déjà les pièces jointes
+        event = next(event for (_, event), _ in publish.call_args_list if event['type'] == 'message')
+        self.assertEqual(len(event['data']['attachments']), 1)
+
+    def test_failed_attachment_rolls_back_the_message_and_the_file(self):
+        with mock.patch('core.attachments.MessageAttachment.objects.create', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                self.upload(b'%PDF-1.4 ordonnance')
+        self.assertFalse(Message.objects.exists())
+        self.assertFalse(StoredFile.objects.exists())
+        self.assertEqual((self.blobs(), self.temporary_files()), ([], []))
+
+    def test_request_without_file_is_rejected(self):
+        message = self.send(self.patient_user, self.conversation, 'Voici le document')
+        response = self.api(self.patient_user).post(f'/api/messages/{message.id}/attachments/', {}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+
+    def test_oversized_upload_is_rejected_and_discarded(self):
+        response = self.upload(b'x' * 2048)
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(Message.objects.exists())
+        self.assertFalse(StoredFile.objects.exists())
+        self.assertEqual(self.temporary_files(), [])
+
+    def test_same_content_is_stored_once(self):
+        content = b'%PDF-1.4 compte rendu'
+        response = self.upload(content)
+        self.assertEqual(response.status_code, 201, response.data)
+        self.upload(content, 'copie.pdf')
+        sha256 = hashlib.sha256(content).hexdigest()
+        self.assertEqual(list(StoredFile.objects.values_list('sha256', flat=True)), [sha256])
+        self.assertEqual(self.blobs(), [sha256])
+        self.assertEqual(self.temporary_files(), [])
+        self.assertEqual(MessageAttachment.objects.filter(file__sha256=sha256).count(), 2)
+
+    def test_file_is_deleted_with_its_last_attachment(self):
+        content = b'%PDF-1.4 compte rendu'
+        first = self.upload(content).data['id']
+        second = self.upload(content, 'copie.pdf').data['id']
+        sha256 = hashlib.sha256(content).hexdigest()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.api(self.patient_user).delete(f'/api/messages/{first}/')
+        self.assertEqual(self.blobs(), [sha256])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.api(self.patient_user).delete(f'/api/messages/{second}/')
+        self.assertFalse(StoredFile.objects.exists())
+        self.assertEqual(self.blobs(), [])
+
+    def test_download_honours_range_and_if_range(self):
+        content = bytes(range(100))
+        response = self.upload(content)
+        url = f"/api/attachments/{response.data['attachments'][0]['id']}/download/"
+        client = self.api(self.doctor_user)
+
+        full = client.get(url)
+        self.assertEqual((full.status_code, b''.join(full.streaming_content)), (200, content))
+        etag = full['ETag']
+
+        partial = client.get(url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE=etag)
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(partial.streaming_content), content[10:20])
+
+        # Fichier modifié depuis : le fichier complet est renvoyé
+        stale = client.get(url, HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"autre"')
+        self.assertEqual((stale.status_code, b''.join(stale.streaming_content)), (200, content))
+
+        self.assertEqual(client.get(url, HTTP_RANGE='bytes=200-').status_code, 416)
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
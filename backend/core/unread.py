@@ -0,0 +1,126 @@
+"""
+Compteurs de messages non lus et accusés de lecture (ConversationUnread)
+
+Chaque opération est une requête ensembliste (ou deux pour créer les
+compteurs manquants), quel que soit le nombre de participants. La lecture
+d'une conversation avance le dernier message lu de l'utilisateur sans
+toucher aux messages ; les non lus restants (messages d'id supérieur) se
+comptent dans la même mise à jour, par une sous-requête d'intervalle sur
+l'index (conversation, id), pour ne pas perdre un message reçu entre-temps.
+
+L'effacement de l'historique (suppression d'une conversation par un
+utilisateur) est un seuil `cleared_message_id` sur la même ligne : les
+messages visibles sont ceux d'id supérieur.
+"""
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .archive import latest_archived_id
+from .models import ConversationUnread, Message
+
+
+def increment(conversation_id, user_ids, amount=1):
+    """Ajoute `amount` messages non lus aux destinataires d'une conversation"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    ConversationUnread.objects.bulk_create([
+        ConversationUnread(user_id=user_id, conversation_id=conversation_id)
+        for user_id in user_ids
+    ], ignore_conflicts=True)
+    ConversationUnread.objects.filter(
+        conversation_id=conversation_id, user_id__in=user_ids
+    ).update(count=F('count') + amount, updated_at=timezone.now())
+
+
+def latest_message_id(conversation_id):
+    """Id du dernier message de la conversation, archive comprise (0 si elle est vide)"""
+    return Message.objects.filter(
+        conversation_id=conversation_id
+    ).aggregate(last_id=Max('id'))['last_id'] or latest_archived_id(conversation_id)
+
+
+def get_state(user_id, conversation_id):
+    """Retourne (dernier message lu, non lus) de l'utilisateur"""
+    state = ConversationUnread.objects.filter(
+        user_id=user_id, conversation_id=conversation_id
+    ).values_list('last_read_message_id', 'count').first()
+    return state or (0, 0)
+
+
+def unread_after(user_id, conversation_id, message_id):
+    """Expression : messages reçus après `message_id`, comptés lors de l'écriture"""
+    return Coalesce(Subquery(
+        Message.objects.filter(
+            conversation_id=conversation_id, id__gt=message_id
+        ).exclude(sender_id=user_id).order_by().values('conversation_id').annotate(
+            total=Count('id')
+        ).values('total')[:1]
+    ), 0)
+
+
+def mark_read(user_id, conversation_id, message_id=None):
+    """
+    Avance le dernier message lu de l'utilisateur jusqu'à `message_id`
+    (par défaut le dernier message de la conversation). Le compteur est
+    remis au nombre de messages reçus après ce seuil dans la même requête :
+    un message arrivé depuis reste compté.
+    L'appelant s'assure que le dernier message lu ne recule pas.
+    Retourne (dernier message lu, non lus restants).
+    """
+    if message_id is None:
+        message_id = latest_message_id(conversation_id)
+    ConversationUnread.objects.bulk_create([
+        ConversationUnread(user_id=user_id, conversation_id=conversation_id)
+    ], ignore_conflicts=True)
+    counter = ConversationUnread.objects.filter(user_id=user_id, conversation_id=conversation_id)
+    now = timezone.now()
+    counter.update(
+        last_read_message_id=message_id, read_at=now, updated_at=now,
+        count=unread_after(user_id, conversation_id, message_id)
+    )
+    return message_id, counter.values_list('count', flat=True).get()
+
+
+def clear_history(user_id, conversation_id):
+    """
+    Efface l'historique de la conversation pour l'utilisateur jusqu'au
+    dernier message (un seul upsert). Retourne le seuil.
+    """
+    message_id = latest_message_id(conversation_id)
+    now = timezone.now()
+    ConversationUnread.objects.bulk_create([
+        ConversationUnread(
+            user_id=user_id, conversation_id=conversation_id, cleared_message_id=message_id,
+            last_read_message_id=message_id, read_at=now, count=0, updated_at=now
+        )
+    ], update_conflicts=True, unique_fields=['user', 'conversation'],
+        update_fields=['cleared_message_id', 'last_read_message_id', 'read_at', 'count', 'updated_at'])
+    return message_id
+
+
+def cleared_message_id(user_id, conversation_id):
+    """Seuil d'effacement de l'historique de l'utilisateur (0 si aucun)"""
+    return ConversationUnread.objects.filter(
+        user_id=user_id, conversation_id=conversation_id
+    ).values_list('cleared_message_id', flat=True).first() or 0
+
+
+def visible_messages(queryset, user_id):
+    """
+    Exclut les messages effacés par l'utilisateur, toutes conversations
+    confondues (seuil lu par sous-requête)
+    """
+    cleared = ConversationUnread.objects.filter(
+        user_id=user_id, conversation_id=OuterRef('conversation_id')
+    ).values('cleared_message_id')[:1]
+    return queryset.filter(id__gt=Coalesce(Subquery(cleared), 0))
+
+
+def get_counts(user_id):
+    """Retourne (total, {conversation_id: non lus}) en une lecture indexée"""
+    counts = dict(ConversationUnread.objects.filter(
+        user_id=user_id, count__gt=0
+    ).values_list('conversation_id', 'count'))
+    return sum(counts.values()), counts
@@ -11,8 +11,11 @@ router.register(r'doctors', views.DoctorViewSet, basename='doctor')
 router.register(r'receptionists', views.ReceptionistViewSet, basename='receptionist')
 router.register(r'services', views.ServiceViewSet, basename='service')
 router.register(r'appointments', views.AppointmentViewSet, basename='appointment')
+router.register(r'waitlist', views.WaitlistEntryViewSet, basename='waitlist')
 router.register(r'conversations', views.ConversationViewSet, basename='conversation')
 router.register(r'messages', views.MessageViewSet, basename='message')
+router.register(r'attachments', views.MessageAttachmentViewSet, basename='attachment')
+router.register(r'announcements', views.AnnouncementViewSet, basename='announcement')
 router.register(r'prescriptions', views.PrescriptionViewSet, basename='prescription')
 
 urlpatterns = [
@@ -38,6 +41,13 @@ urlpatterns = [
     # Utilisateurs de la clinique (pour la messagerie)
     path('clinic-users/', views.list_clinic_users_view, name='clinic-users'),
 
+    # Flux iCalendar (accès par jeton, sans authentification JWT)
+    path('calendar/<str:token>.ics', views.calendar_feed_view, name='calendar-feed'),
+
+    # Flux temps réel de la messagerie (server-sent events, ASGI)
+    path('events/messages/', views.message_events_view, name='message-events'),
+    path('events/messages/ticket/', views.message_events_ticket_view, name='message-events-ticket'),
+
     # Router pour les ViewSets
     path('', include(router.urls)),
 ]
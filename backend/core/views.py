@@ -1,25 +1,84 @@
+import asyncio
+import os
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
 from django.shortcuts import render
-from django.db.models import Q
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date
+from django.views.decorators.http import require_safe
+from django.db import IntegrityError, transaction
+from django.db.models import BinaryField, Case, Count, OuterRef, Q, Subquery, When
+from django.db.models.functions import Coalesce, Substr
 from rest_framework import status, generics, permissions, viewsets, serializers
 from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.contrib.auth import logout
 from django.utils import timezone
+from datetime import datetime, timedelta, timezone as dt_timezone
 from .models import (
-    User, Clinic, Patient, Doctor, Receptionist, Service,
-    Appointment, Message, Conversation, Prescription, PrescriptionMedication
+    User, Clinic, Patient, Doctor, DoctorWorkingHours, DoctorScheduleException, Receptionist, Service,
+    Appointment, WaitlistEntry, Message, MessageAttachment, ArchivedMessage, Conversation, ConversationUnread,
+    Announcement, AnnouncementDelivery,
+    Prescription, PrescriptionMedication
 )
 from .serializers import (
     UserRegistrationSerializer, UserLoginSerializer, UserProfileSerializer,
     ClinicSerializer, PatientSerializer, PatientCreateUpdateSerializer,
     DoctorSerializer, ReceptionistSerializer, ServiceSerializer,
-    AppointmentSerializer, AppointmentCreateUpdateSerializer,
-    MessageSerializer, ConversationSerializer, ConversationCreateUpdateSerializer,
+    DoctorScheduleSerializer, DoctorWorkingHoursSerializer, DoctorScheduleExceptionSerializer,
+    SlotHoldSerializer, WaitlistEntrySerializer,
+    AppointmentSerializer, AppointmentCreateUpdateSerializer, AppointmentSeriesSerializer,
+    MessageSerializer, MessageAttachmentSerializer, ArchivedMessageSerializer, ConversationSerializer, ConversationCreateUpdateSerializer,
+    AnnouncementSerializer,
     PrescriptionSerializer, PrescriptionCreateSerializer, PrescriptionMedicationSerializer
 )
+from . import slot_cache, unread
+from .archive import archived_page
+from .attachments import (
+    ContentAddressedUploadHandler, attach_files, blob_path, discard_uploads, parse_range, read_blob
+)
+from .broadcast import publish_announcement
+from .availability import (
+    DEFAULT_DURATION, find_conflicts, find_first_available, get_available_slots, refresh_doctor_days
+)
+from .events import (
+    format_sse, get_broker, issue_stream_ticket, notify_new_message, notify_read, redeem_stream_ticket, user_channel
+)
+from .freebusy import appointment_days
+from .holds import create_hold, held_occurrences, release_holds
+from .ics import (
+    create_feed_token, feed_appointments, feed_version, get_feed_token, revoke_feed_tokens, stream_calendar
+)
+from .schedule import get_schedule, touch_doctor
+from .search import has_archived_messages, search_messages
+from .waitlist import backfill_slot, backfill_slots
+
+# Nombre maximal de jours pour une requête de créneaux par période
+MAX_SLOT_RANGE_DAYS = 62
+
+# Nombre maximal de messages par synchronisation incrémentale
+SYNC_PAGE_SIZE = 200
+
+# Taille de page par défaut et maximale de l'historique d'une conversation
+HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 200
+
+# Taille de page par défaut et maximale de la recherche de messages
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+
+# Intervalle (secondes) des commentaires keepalive du flux SSE
+SSE_KEEPALIVE_SECONDS = 15
 
 # Create your views here.
 
@@ -280,6 +339,61 @@ class DoctorViewSet(viewsets.ModelViewSet):
             raise serializers.ValidationError("Vous n'avez pas la permission de créer un médecin")
         serializer.save()
 
+    @action(detail=True, methods=['get', 'put'])
+    def schedule(self, request, pk=None):
+        """
+        Consulte ou remplace le planning du médecin
+        (plages hebdomadaires, pauses et exceptions par date)
+        """
+        doctor = self.get_object()
+
+        if request.method == 'PUT':
+            if request.user.user_type not in ['admin', 'receptionist'] and doctor.user != request.user:
+                return Response(
+                    {'error': 'Vous n\'avez pas la permission de modifier ce planning'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+
+            serializer = DoctorScheduleSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+
+            with transaction.atomic():
+                # Suppression sans signaux (aucune relation ne pointe vers ces tables) :
+                # le planning n'est recompilé qu'une fois, après le remplacement
+                for queryset in (doctor.working_hours.all(), doctor.schedule_exceptions.all()):
+                    queryset._raw_delete(queryset.db)
+                DoctorWorkingHours.objects.bulk_create([
+                    DoctorWorkingHours(doctor=doctor, **item)
+                    for item in serializer.validated_data['weekly']
+                ])
+                DoctorScheduleException.objects.bulk_create([
+                    DoctorScheduleException(doctor=doctor, **item)
+                    for item in serializer.validated_data.get('exceptions', [])
+                ])
+                # bulk_create n'envoie pas de signaux non plus : recompiler le planning
+                touch_doctor(doctor.id)
+
+        return Response({
+            'weekly': DoctorWorkingHoursSerializer(doctor.working_hours.all(), many=True).data,
+            'exceptions': DoctorScheduleExceptionSerializer(
+                doctor.schedule_exceptions.filter(date__gte=timezone.localdate()), many=True
+            ).data
+        })
+
+    @action(detail=True, methods=['post', 'delete'])
+    def calendar_feed(self, request, pk=None):
+        """
+        Crée (POST) ou révoque (DELETE) le lien du flux iCalendar du médecin
+        Le jeton n'est affiché qu'une fois, à sa création.
+        """
+        doctor = self.get_object()
+        if request.user.user_type not in ['admin', 'receptionist'] and doctor.user != request.user:
+            return Response(
+                {'error': 'Vous n\'avez pas la permission de gérer cet agenda'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return calendar_feed_response(request, doctor=doctor)
+
 
 class ReceptionistViewSet(viewsets.ModelViewSet):
     """
@@ -451,11 +565,180 @@ class AppointmentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        appointment.status = 'cancelled'
-        appointment.save()
+        was_active = appointment.status in Appointment.ACTIVE_STATUSES
+        with transaction.atomic():
+            appointment.status = 'cancelled'
+            appointment.save()
+            # Proposer le créneau libéré à la liste d'attente
+            if was_active:
+                backfill_slot(appointment)
         serializer = self.get_serializer(appointment)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'])
+    def book_series(self, request):
+        """
+        Réserve une série de rendez-vous récurrents en une seule requête
+        Si une occurrence est en conflit, rien n'est créé sauf si skip_conflicts
+        """
+        serializer = AppointmentSeriesSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        conflicts = serializer.get_conflicts_report()
+
+        if conflicts and not serializer.validated_data['skip_conflicts']:
+            return Response({
+                'error': f'{len(conflicts)} occurrence(s) en conflit',
+                'conflicts': conflicts
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        # Toutes les occurrences sont en conflit : rien à réserver
+        if len({conflict['index'] for conflict in conflicts}) == len(serializer.validated_data['occurrences']):
+            return Response({
+                'error': 'Aucune occurrence de la série n\'est disponible',
+                'conflicts': conflicts
+            }, status=status.HTTP_409_CONFLICT)
+
+        appointments = serializer.save()
+        return Response({
+            'series_id': appointments[0].series_id,
+            'appointments': AppointmentSerializer(appointments, many=True).data,
+            'conflicts': conflicts
+        }, status=status.HTTP_201_CREATED)
+
+    def _series_occurrences(self, request, appointment):
+        """
+        Retourne les occurrences actives de la série à partir de ce rendez-vous
+        ou une Response d'erreur
+        """
+        if request.user.user_type == 'patient':
+            if appointment.patient.user != request.user:
+                return Response(
+                    {'error': 'Vous n\'avez pas la permission de modifier cette série'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+        elif request.user.user_type not in ['admin', 'receptionist', 'doctor']:
+            return Response(
+                {'error': 'Vous n\'avez pas la permission de modifier une série'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        if not appointment.series_id:
+            return Response(
+                {'error': 'Ce rendez-vous ne fait pas partie d\'une série'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return list(Appointment.objects.filter(
+            series_id=appointment.series_id,
+            appointment_date__gte=appointment.appointment_date,
+            status__in=Appointment.ACTIVE_STATUSES
+        ).select_related('doctor').order_by('appointment_date'))
+
+    @action(detail=True, methods=['patch'])
+    def cancel_series(self, request, pk=None):
+        """Annuler ce rendez-vous et toutes les occurrences suivantes de la série"""
+        occurrences = self._series_occurrences(request, self.get_object())
+        if isinstance(occurrences, Response):
+            return occurrences
+
+        doctor_days = set()
+        for apt in occurrences:
+            doctor_days |= appointment_days(apt.doctor_id, apt.appointment_date, apt.end_date)
+
+        with transaction.atomic():
+            cancelled = Appointment.objects.filter(
+                id__in=[apt.id for apt in occurrences]
+            ).update(status='cancelled', updated_at=timezone.now())
+            refresh_doctor_days(doctor_days)
+            # Proposer les créneaux libérés à la liste d'attente
+            backfill_slots(occurrences)
+
+        return Response({
+            'message': f'{cancelled} rendez-vous annulé(s)',
+            'cancelled': cancelled
+        })
+
+    @action(detail=True, methods=['patch'])
+    def reschedule_series(self, request, pk=None):
+        """
+        Déplacer ce rendez-vous et toutes les occurrences suivantes de la série
+        du même décalage que appointment_date
+        """
+        from rest_framework.fields import DateTimeField
+
+        appointment = self.get_object()
+        occurrences = self._series_occurrences(request, appointment)
+        if isinstance(occurrences, Response):
+            return occurrences
+
+        try:
+            new_date = DateTimeField().to_internal_value(request.data.get('appointment_date'))
+        except serializers.ValidationError:
+            return Response(
+                {'error': 'appointment_date invalide'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if new_date < timezone.now():
+            return Response(
+                {'error': 'La date du rendez-vous ne peut pas être dans le passé.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        shift = new_date - appointment.appointment_date
+        intervals = [(apt.appointment_date + shift, apt.end_date + shift) for apt in occurrences]
+
+        schedule = get_schedule(appointment.doctor)
+        outside = [index for index, (start, end) in enumerate(intervals) if not schedule.covers(start, end)]
+        if outside:
+            return Response({
+                'error': f'{len(outside)} occurrence(s) en dehors des horaires de travail du médecin',
+                'conflicts': [
+                    {'index': index, 'appointment_date': intervals[index][0].isoformat(), 'conflict_with': None}
+                    for index in outside
+                ]
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        conflicts = find_conflicts(
+            appointment.doctor_id, appointment.patient_id, intervals,
+            exclude=Q(series_id=appointment.series_id)
+        )
+        if conflicts:
+            return Response({
+                'error': f'{len(conflicts)} occurrence(s) en conflit',
+                'conflicts': [
+                    {
+                        'index': index,
+                        'appointment_date': intervals[index][0].isoformat(),
+                        'conflict_with': apt.id
+                    }
+                    for index, apt in sorted(conflicts.items())
+                ]
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        held = held_occurrences(appointment.doctor_id, intervals, exclude_user=request.user)
+        if held:
+            return Response({
+                'error': f'{len(held)} occurrence(s) temporairement réservée(s) par un autre utilisateur',
+                'conflicts': [
+                    {'index': index, 'appointment_date': intervals[index][0].isoformat(), 'conflict_with': None}
+                    for index in sorted(held)
+                ]
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        doctor_days = set()
+        now = timezone.now()
+        for apt, (start, end) in zip(occurrences, intervals):
+            doctor_days |= appointment_days(apt.doctor_id, apt.appointment_date, apt.end_date)
+            doctor_days |= appointment_days(apt.doctor_id, start, end)
+            apt.appointment_date, apt.end_date, apt.updated_at = start, end, now
+
+        with transaction.atomic():
+            Appointment.objects.bulk_update(occurrences, ['appointment_date', 'end_date', 'updated_at'])
+            refresh_doctor_days(doctor_days)
+
+        serializer = self.get_serializer(occurrences, many=True)
+        return Response(serializer.data)
+
     @action(detail=True, methods=['patch'])
     def hide_for_patient(self, request, pk=None):
         """Masquer un rendez-vous annulé pour le patient (soft delete)"""
@@ -561,114 +844,248 @@ class AppointmentViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def available_slots(self, request):
-        """Récupère les créneaux disponibles pour un médecin et une date"""
-        from datetime import datetime, timedelta
-        from django.utils import timezone
+        """
+        Récupère les créneaux disponibles pour un médecin et une date
+        Mode période : start_date et end_date retournent les créneaux par jour
+        en une seule requête
+        """
+        from datetime import datetime
 
         doctor_id = request.query_params.get('doctor_id')
         date_str = request.query_params.get('date')
+        start_date_str = request.query_params.get('start_date')
+        end_date_str = request.query_params.get('end_date')
         service_id = request.query_params.get('service_id')  # Nouveau paramètre optionnel
+        range_mode = bool(start_date_str or end_date_str)
 
-        if not doctor_id or not date_str:
+        # Soit date seule, soit les deux bornes de la période
+        if not doctor_id or (bool(date_str) == range_mode) or (range_mode and not (start_date_str and end_date_str)):
             return Response(
-                {'error': 'doctor_id et date sont requis'},
+                {'error': 'doctor_id et date (ou start_date et end_date) sont requis'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
         try:
             doctor = Doctor.objects.get(id=doctor_id)
-            date = datetime.strptime(date_str, '%Y-%m-%d').date()
+            if range_mode:
+                start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+                end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+            else:
+                start_date = end_date = datetime.strptime(date_str, '%Y-%m-%d').date()
         except (Doctor.DoesNotExist, ValueError):
             return Response(
                 {'error': 'Médecin ou date invalide'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Vérifier si le médecin est disponible
-        if not doctor.is_available or not doctor.is_active:
-            return Response({'slots': []})
+        if end_date < start_date or (end_date - start_date).days >= MAX_SLOT_RANGE_DAYS:
+            return Response(
+                {'error': f'La période doit couvrir entre 1 et {MAX_SLOT_RANGE_DAYS} jours'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
         # Obtenir la durée du service si fourni
-        requested_duration = 30  # Durée par défaut
+        requested_duration = DEFAULT_DURATION
         if service_id:
             try:
                 service = Service.objects.get(id=service_id)
                 requested_duration = service.duration
-            except Service.DoesNotExist:
+            except (Service.DoesNotExist, ValueError):
                 pass
 
-        # Obtenir les horaires de travail du médecin depuis available_hours
-        # Format attendu: {"start": "09:00", "end": "17:00"} ou {"start": "21:00", "end": "23:00"}
-        available_hours = doctor.available_hours
+        days = get_available_slots(doctor, start_date, end_date, requested_duration, user=request.user)
 
-        # Valeurs par défaut si available_hours est vide
-        if not available_hours or not isinstance(available_hours, dict):
-            start_hour = 9
-            end_hour = 17
-        else:
-            try:
-                # Parser l'heure de début
-                start_time_str = available_hours.get('start', '09:00')
-                end_time_str = available_hours.get('end', '17:00')
-
-                start_hour = int(start_time_str.split(':')[0])
-                start_minute = int(start_time_str.split(':')[1]) if ':' in start_time_str else 0
-
-                end_hour = int(end_time_str.split(':')[0])
-                end_minute = int(end_time_str.split(':')[1]) if ':' in end_time_str else 0
-            except (ValueError, AttributeError, IndexError):
-                # En cas d'erreur, utiliser les valeurs par défaut
-                start_hour = 9
-                start_minute = 0
-                end_hour = 17
-                end_minute = 0
-
-        slots = []
-        slot_interval = 30  # Intervalle entre les créneaux (toujours 30 min)
-
-        # Récupérer tous les rendez-vous du docteur pour cette date
-        appointments = Appointment.objects.filter(
-            doctor=doctor,
-            appointment_date__date=date,
-            status__in=['scheduled', 'confirmed', 'in_progress']
+        if range_mode:
+            return Response({
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat(),
+                'days': days
+            })
+        return Response({'slots': days[start_date.isoformat()]})
+
+    @action(detail=False, methods=['post'])
+    def hold_slot(self, request):
+        """
+        Réserve temporairement un créneau avant la saisie du rendez-vous
+        Le créneau est exclu des disponibilités des autres utilisateurs
+        jusqu'à expiration ou réservation du rendez-vous.
+        """
+        serializer = SlotHoldSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        hold = create_hold(
+            serializer.validated_data['doctor'],
+            request.user,
+            serializer.validated_data['start_date'],
+            serializer.validated_data['end_date']
         )
+        if hold is None:
+            return Response(
+                {'error': 'Ce créneau vient d\'être réservé. Veuillez en choisir un autre.'},
+                status=status.HTTP_409_CONFLICT
+            )
+        return Response(SlotHoldSerializer(hold).data, status=status.HTTP_201_CREATED)
 
-        # Générer les créneaux en fonction des horaires du médecin
-        current_time = datetime.combine(date, datetime.min.time().replace(hour=start_hour, minute=start_minute if 'start_minute' in locals() else 0))
-        end_time = datetime.combine(date, datetime.min.time().replace(hour=end_hour, minute=end_minute if 'end_minute' in locals() else 0))
+    @action(detail=False, methods=['post'])
+    def release_hold(self, request):
+        """Libère la réservation temporaire de l'utilisateur pour un médecin"""
+        doctor_id = request.data.get('doctor')
+        if not doctor_id:
+            return Response(
+                {'error': 'doctor est requis'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            released = release_holds(request.user, int(doctor_id))
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'Médecin invalide'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({'released': released})
 
-        while current_time < end_time:
-            slot_time = timezone.make_aware(current_time)
+    @action(detail=False, methods=['get'])
+    def slot_cache_stats(self, request):
+        """Compteurs succès/échecs du cache des créneaux (admin uniquement)"""
+        if request.user.user_type != 'admin':
+            return Response(
+                {'error': 'Seuls les administrateurs peuvent consulter ces statistiques'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return Response(slot_cache.get_stats())
 
-            # Vérifier si le créneau est dans le futur
-            if slot_time > timezone.now():
-                # Calculer la fin du créneau en fonction de la durée demandée
-                slot_end = slot_time + timedelta(minutes=requested_duration)
+    @action(detail=False, methods=['get'])
+    def first_available(self, request):
+        """
+        Recherche les premiers créneaux libres de la clinique, tous médecins
+        confondus, filtrés par spécialisation et/ou service
+        """
+        clinic_id = request.query_params.get('clinic_id')
+        specialization = request.query_params.get('specialization')
+        service_id = request.query_params.get('service_id')
 
-                # Vérifier que le créneau ne dépasse pas les horaires de travail
-                if slot_end <= timezone.make_aware(end_time):
-                    has_conflict = False
+        try:
+            clinic_id = int(clinic_id) if clinic_id else None
+            days = min(int(request.query_params.get('days', 14)), MAX_SLOT_RANGE_DAYS)
+            limit = min(int(request.query_params.get('limit', 10)), 50)
+        except ValueError:
+            return Response(
+                {'error': 'clinic_id, days et limit doivent être des nombres'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if days < 1 or limit < 1:
+            return Response(
+                {'error': 'days et limit doivent être positifs'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Obtenir la durée (et la clinique) du service si fourni
+        requested_duration = DEFAULT_DURATION
+        if service_id:
+            try:
+                service = Service.objects.get(id=service_id, is_active=True)
+            except (Service.DoesNotExist, ValueError):
+                return Response(
+                    {'error': 'Service invalide'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            requested_duration = service.duration
+            clinic_id = clinic_id or service.clinic_id
+
+        # Par défaut, rechercher dans la clinique de l'utilisateur
+        if not clinic_id:
+            user = request.user
+            try:
+                if user.user_type == 'doctor':
+                    clinic_id = Doctor.objects.get(user=user).clinic_id
+                elif user.user_type == 'receptionist':
+                    clinic_id = Receptionist.objects.get(user=user).clinic_id
+                elif user.user_type == 'patient':
+                    clinic_id = Patient.objects.get(user=user).clinic_id
+            except (Doctor.DoesNotExist, Receptionist.DoesNotExist, Patient.DoesNotExist):
+                pass
+
+        if not clinic_id:
+            return Response(
+                {'error': 'clinic_id ou service_id est requis'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-                    # Vérifier s'il y a un chevauchement avec les rendez-vous existants
-                    for apt in appointments:
-                        apt_end = apt.appointment_date + timedelta(minutes=apt.duration)
-                        # Vérifier le chevauchement : le nouveau rendez-vous chevauche si :
-                        # - Il commence avant la fin d'un rendez-vous existant ET
-                        # - Il se termine après le début d'un rendez-vous existant
-                        if slot_time < apt_end and slot_end > apt.appointment_date:
-                            has_conflict = True
-                            break
+        doctors = Doctor.objects.filter(
+            clinic_id=clinic_id,
+            is_active=True,
+            is_available=True
+        ).select_related('user')
+        if specialization:
+            doctors = doctors.filter(specialization__iexact=specialization)
 
-                    if not has_conflict:
-                        slots.append({
-                            'time': slot_time.isoformat(),
-                            'available': True
-                        })
+        start_date = timezone.localdate()
+        end_date = start_date + timedelta(days=days - 1)
 
-            # Passer au créneau suivant (30 minutes)
-            current_time += timedelta(minutes=slot_interval)
+        return Response({
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'slots': find_first_available(
+                doctors, start_date, end_date, requested_duration, limit, user=request.user
+            )
+        })
 
-        return Response({'slots': slots})
+
+class WaitlistEntryViewSet(viewsets.ModelViewSet):
+    """
+    ViewSet pour la liste d'attente des rendez-vous
+    """
+    queryset = WaitlistEntry.objects.all()
+    serializer_class = WaitlistEntrySerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """Filtrer les demandes selon le rôle"""
+        user = self.request.user
+        queryset = WaitlistEntry.objects.select_related('patient__user', 'doctor__user', 'appointment')
+        if user.user_type == 'admin':
+            return queryset
+
+        try:
+            if user.user_type == 'doctor':
+                doctor = Doctor.objects.get(user=user)
+                return queryset.filter(
+                    Q(doctor=doctor) | Q(doctor__isnull=True, clinic=doctor.clinic, specialization=doctor.specialization)
+                )
+            elif user.user_type == 'receptionist':
+                receptionist = Receptionist.objects.get(user=user)
+                return queryset.filter(clinic=receptionist.clinic)
+            elif user.user_type == 'patient':
+                patient = Patient.objects.get(user=user)
+                return queryset.filter(patient=patient)
+        except (Doctor.DoesNotExist, Receptionist.DoesNotExist, Patient.DoesNotExist):
+            return WaitlistEntry.objects.none()
+
+        return WaitlistEntry.objects.none()
+
+    def perform_create(self, serializer):
+        """Inscrire un patient sur la liste d'attente"""
+        user = self.request.user
+        if user.user_type == 'patient':
+            if serializer.validated_data['patient'].user != user:
+                raise serializers.ValidationError("Vous ne pouvez inscrire que vous-même sur la liste d'attente")
+        elif user.user_type not in ['admin', 'receptionist']:
+            raise serializers.ValidationError("Vous n'avez pas la permission d'inscrire un patient")
+        serializer.save()
+
+    @action(detail=True, methods=['patch'])
+    def cancel(self, request, pk=None):
+        """Retirer une demande de la liste d'attente"""
+        entry = self.get_object()
+        if entry.status != 'waiting':
+            return Response(
+                {'error': 'Seules les demandes en attente peuvent être annulées'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        entry.status = 'cancelled'
+        entry.save(update_fields=['status', 'updated_at'])
+        return Response(self.get_serializer(entry).data)
 
 
 class ClinicViewSet(viewsets.ModelViewSet):
@@ -720,6 +1137,62 @@ class ClinicViewSet(viewsets.ModelViewSet):
             raise serializers.ValidationError("Seuls les admins peuvent créer une clinique")
         serializer.save()
 
+    @action(detail=True, methods=['post', 'delete'])
+    def calendar_feed(self, request, pk=None):
+        """
+        Crée (POST) ou révoque (DELETE) le lien du flux iCalendar de la clinique
+        Réservé aux admins et réceptionnistes de la clinique.
+        """
+        clinic = self.get_object()
+        if request.user.user_type not in ['admin', 'receptionist']:
+            return Response(
+                {'error': 'Seuls les admins et réceptionnistes peuvent gérer l\'agenda de la clinique'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return calendar_feed_response(request, clinic=clinic)
+
+
+def calendar_feed_response(request, doctor=None, clinic=None):
+    """Crée ou révoque le jeton de flux iCalendar d'un médecin ou d'une clinique"""
+    if request.method == 'DELETE':
+        revoked = revoke_feed_tokens(doctor=doctor, clinic=clinic)
+        return Response({'revoked': revoked})
+
+    token = create_feed_token(request.user, doctor=doctor, clinic=clinic)
+    return Response({
+        'token': token,
+        'url': request.build_absolute_uri(reverse('calendar-feed', args=[token]))
+    }, status=status.HTTP_201_CREATED)
+
+
+@require_safe
+def calendar_feed_view(request, token):
+    """
+    Flux iCalendar d'un médecin ou d'une clinique (accès par jeton révocable)
+    Répond 304 sans générer le calendrier si l'ETag ou Last-Modified n'a pas changé.
+    """
+    feed_token = get_feed_token(token)
+    if feed_token is None:
+        raise Http404("Flux introuvable ou révoqué")
+
+    appointments = feed_appointments(feed_token)
+    etag, last_modified = feed_version(appointments)
+    last_modified_ts = int(last_modified.timestamp()) if last_modified else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+    if response is None:
+        response = StreamingHttpResponse(
+            stream_calendar(feed_token, appointments),
+            content_type='text/calendar; charset=utf-8'
+        )
+        response['Content-Disposition'] = 'inline; filename="medflow.ics"'
+
+    response['ETag'] = etag
+    if last_modified_ts is not None:
+        response['Last-Modified'] = http_date(last_modified_ts)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -1404,6 +1877,46 @@ def list_clinic_users_view(request):
 # MESSAGERIE - VIEWSETS
 # ============================================================================
 
+def annotate_conversations(queryset, user):
+    """
+    Ajoute le dernier message et le nombre de messages non lus de
+    l'utilisateur (compteur ConversationUnread) par sous-requêtes
+    (nombre de requêtes constant). Sans message chaud, le dernier message
+    est lu dans l'archive (contenu compressé, décompressé par le serializer).
+    """
+    last_message = Message.objects.filter(
+        conversation=OuterRef('pk')
+    ).order_by('-created_at', '-id')
+    last_archived = ArchivedMessage.objects.filter(
+        conversation=OuterRef('pk')
+    ).order_by('-created_at', '-id')
+    unread_counter = ConversationUnread.objects.filter(
+        conversation=OuterRef('pk'),
+        user=user
+    ).values('count')[:1]
+
+    def latest(field):
+        # Les messages archivés sont tous plus anciens que les messages chauds
+        return Coalesce(Subquery(last_message.values(field)[:1]), Subquery(last_archived.values(field)[:1]))
+
+    return queryset.annotate(
+        last_message_id=latest('id'),
+        last_message_content=Subquery(last_message.annotate(
+            preview=Substr('content', 1, 100)
+        ).values('preview')[:1]),
+        last_message_created_at=latest('created_at'),
+        last_message_sender_first_name=latest('sender__first_name'),
+        last_message_sender_last_name=latest('sender__last_name'),
+        unread_count=Coalesce(Subquery(unread_counter), 0)
+    ).annotate(
+        last_message_archived_content=Case(
+            When(last_message_content__isnull=True, then=Subquery(last_archived.values('compressed_content')[:1])),
+            default=None,
+            output_field=BinaryField()
+        )
+    )
+
+
 class ConversationViewSet(viewsets.ModelViewSet):
     """
     ViewSet pour gérer les conversations
@@ -1421,12 +1934,15 @@ class ConversationViewSet(viewsets.ModelViewSet):
         Exclut les conversations masquées par l'utilisateur
         """
         user = self.request.user
-        return Conversation.objects.filter(
-            participants=user,
-            is_active=True
-        ).exclude(
-            hidden_for=user
-        ).distinct().prefetch_related('participants', 'messages')
+        return annotate_conversations(
+            Conversation.objects.filter(
+                participants=user,
+                is_active=True
+            ).exclude(
+                hidden_for=user
+            ),
+            user
+        ).prefetch_related('participants')
 
     def get_serializer_class(self):
         """
@@ -1449,31 +1965,38 @@ class ConversationViewSet(viewsets.ModelViewSet):
         if request.user not in participants:
             participants.append(request.user)
 
-        # Trier les IDs des participants pour une comparaison cohérente
-        participant_ids = sorted([p.id for p in participants])
-
-        # Vérifier s'il existe déjà une conversation avec exactement les mêmes participants
-        existing_conversations = Conversation.objects.filter(
-            clinic=serializer.validated_data['clinic'],
-            is_active=True
-        ).prefetch_related('participants')
-
-        for conv in existing_conversations:
-            conv_participant_ids = sorted([p.id for p in conv.participants.all()])
-            if conv_participant_ids == participant_ids:
-                # Conversation existante trouvée, la retourner
-                return Response(
-                    ConversationSerializer(conv, context={'request': request}).data,
-                    status=status.HTTP_200_OK
-                )
+        # Recherche de la conversation active existante par l'empreinte des participants
+        clinic = serializer.validated_data['clinic']
+        signature = Conversation.participants_signature(p.id for p in participants)
+        existing = Conversation.objects.filter(
+            clinic=clinic, participants_hash=signature, is_active=True
+        ).first()
+        if existing:
+            return Response(
+                ConversationSerializer(existing, context={'request': request}).data,
+                status=status.HTTP_200_OK
+            )
 
         # Aucune conversation existante, en créer une nouvelle
-        conversation = Conversation.objects.create(
-            clinic=serializer.validated_data['clinic'],
-            subject=serializer.validated_data['subject'],
-            is_active=serializer.validated_data.get('is_active', True)
-        )
-        conversation.participants.set(participants)
+        is_active = serializer.validated_data.get('is_active', True)
+        try:
+            with transaction.atomic():
+                conversation = Conversation.objects.create(
+                    clinic=clinic,
+                    subject=serializer.validated_data['subject'],
+                    is_active=is_active,
+                    participants_hash=signature
+                )
+                conversation.participants.set(participants)
+        except IntegrityError:
+            # Créée entre-temps par une requête concurrente
+            existing = Conversation.objects.get(
+                clinic=clinic, participants_hash=signature, is_active=True
+            )
+            return Response(
+                ConversationSerializer(existing, context={'request': request}).data,
+                status=status.HTTP_200_OK
+            )
 
         return Response(
             ConversationSerializer(conversation, context={'request': request}).data,
@@ -1487,17 +2010,32 @@ class ConversationViewSet(viewsets.ModelViewSet):
         """
         conversation = self.get_object()
 
-        # Marquer les messages comme lus
-        messages = conversation.messages.filter(is_read=False).exclude(sender=request.user)
-        for message in messages:
-            message.is_read = True
-            message.read_at = timezone.now()
-            message.save()
+        # Un seul upsert du dernier message lu, quel que soit le nombre de messages
+        previous_id, previous_count = unread.get_state(request.user.id, conversation.id)
+        last_read_id, count = unread.mark_read(request.user.id, conversation.id)
+        if last_read_id > previous_id:
+            notify_read(
+                conversation.id, request.user.id,
+                [p.id for p in conversation.participants.all()], last_read_id, count
+            )
 
         return Response({
-            'message': f'{messages.count()} messages marqués comme lus'
+            'message': f'{previous_count} messages marqués comme lus',
+            'last_read_message_id': last_read_id
         }, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['get'])
+    def unread_counts(self, request):
+        """
+        Nombre total de messages non lus et détail par conversation
+        (une seule lecture de la table des compteurs)
+        """
+        total, counts = unread.get_counts(request.user.id)
+        return Response({
+            'total': total,
+            'conversations': counts
+        })
+
     @action(detail=True, methods=['post'])
     def add_participant(self, request, pk=None):
         """
@@ -1508,7 +2046,8 @@ class ConversationViewSet(viewsets.ModelViewSet):
 
         try:
             user = User.objects.get(id=user_id)
-            conversation.participants.add(user)
+            with transaction.atomic():
+                conversation.participants.add(user)
             return Response({
                 'message': f'{user.get_full_name()} a été ajouté à la conversation'
             }, status=status.HTTP_200_OK)
@@ -1516,6 +2055,10 @@ class ConversationViewSet(viewsets.ModelViewSet):
             return Response({
                 'error': 'Utilisateur non trouvé'
             }, status=status.HTTP_404_NOT_FOUND)
+        except IntegrityError:
+            return Response({
+                'error': 'Une conversation active existe déjà avec ces participants'
+            }, status=status.HTTP_409_CONFLICT)
 
     @action(detail=True, methods=['post'])
     def remove_participant(self, request, pk=None):
@@ -1527,7 +2070,8 @@ class ConversationViewSet(viewsets.ModelViewSet):
 
         try:
             user = User.objects.get(id=user_id)
-            conversation.participants.remove(user)
+            with transaction.atomic():
+                conversation.participants.remove(user)
             return Response({
                 'message': f'{user.get_full_name()} a été retiré de la conversation'
             }, status=status.HTTP_200_OK)
@@ -1535,6 +2079,23 @@ class ConversationViewSet(viewsets.ModelViewSet):
             return Response({
                 'error': 'Utilisateur non trouvé'
             }, status=status.HTTP_404_NOT_FOUND)
+        except IntegrityError:
+            return Response({
+                'error': 'Une conversation active existe déjà avec ces participants'
+            }, status=status.HTTP_409_CONFLICT)
+
+    def update(self, request, *args, **kwargs):
+        """
+        Modifie la conversation (aussi utilisé par partial_update)
+        Refusé si une autre conversation active a déjà ces participants
+        """
+        try:
+            with transaction.atomic():
+                return super().update(request, *args, **kwargs)
+        except IntegrityError:
+            return Response({
+                'error': 'Une conversation active existe déjà avec ces participants'
+            }, status=status.HTTP_409_CONFLICT)
 
     def destroy(self, request, *args, **kwargs):
         """
@@ -1547,22 +2108,52 @@ class ConversationViewSet(viewsets.ModelViewSet):
         # Ajouter l'utilisateur à la liste des utilisateurs qui ont masqué cette conversation
         conversation.hidden_for.add(user)
 
-        # Marquer tous les messages de cette conversation comme supprimés pour cet utilisateur
-        for message in conversation.messages.all():
-            message.deleted_for.add(user)
+        # Effacer l'historique existant pour cet utilisateur (seuil sur le dernier message)
+        unread.clear_history(user.id, conversation.id)
 
         return Response({
             'message': 'Conversation masquée avec succès'
         }, status=status.HTTP_200_OK)
 
 
+def make_sync_cursor(last_id, read_since):
+    """Curseur de synchronisation : dernier message transmis et dernière lecture vue"""
+    return f"{last_id}.{int(read_since.timestamp() * 1_000_000)}"
+
+
+def parse_sync_cursor(cursor, after_id=None):
+    """
+    Retourne (dernier id transmis, date de la dernière lecture vue)
+    Sans curseur, les changements de lecture sont suivis à partir de maintenant.
+    Lève ValueError si le curseur est invalide.
+    """
+    if cursor:
+        last_id, read_since = cursor.split('.')
+        return int(last_id), datetime.fromtimestamp(int(read_since) / 1_000_000, tz=dt_timezone.utc)
+    return int(after_id or 0), timezone.now()
+
+
+def make_history_cursor(message):
+    """Curseur d'historique : position (created_at, id) d'un message"""
+    return f"{int(message.created_at.timestamp() * 1_000_000)}.{message.id}"
+
+
+def parse_history_cursor(cursor):
+    """
+    Retourne (created_at, id) d'un curseur d'historique
+    Lève ValueError si le curseur est invalide.
+    """
+    created_at, message_id = cursor.split('.')
+    return datetime.fromtimestamp(int(created_at) / 1_000_000, tz=dt_timezone.utc), int(message_id)
+
+
 class MessageViewSet(viewsets.ModelViewSet):
     """
     ViewSet pour gérer les messages
     """
     serializer_class = MessageSerializer
     permission_classes = [IsAuthenticated]
-    filterset_fields = ['conversation', 'is_read']
+    filterset_fields = ['conversation']
     search_fields = ['content']
     ordering_fields = ['created_at']
     ordering = ['-created_at']
@@ -1571,48 +2162,317 @@ class MessageViewSet(viewsets.ModelViewSet):
         """
         Retourne les messages des conversations de l'utilisateur
         Filtre par conversation si le paramètre est fourni
-        Exclut les messages supprimés par l'utilisateur
+        Exclut les messages effacés par l'utilisateur
         """
         user = self.request.user
         queryset = Message.objects.filter(
             conversation__participants=user
-        ).exclude(
-            deleted_for=user
-        ).select_related('sender', 'conversation')
+        ).select_related('sender', 'conversation').prefetch_related('attachments__file')
 
-        # Filtrer par conversation si le paramètre est fourni
+        # Filtrer par conversation si le paramètre est fourni : le seuil
+        # d'effacement devient une borne de l'intervalle d'ids
         conversation_id = self.request.query_params.get('conversation')
         if conversation_id:
+            try:
+                cleared_id = unread.cleared_message_id(user.id, int(conversation_id))
+            except ValueError:
+                return queryset.none()
             queryset = queryset.filter(conversation_id=conversation_id)
+            # Sans seuil, pas de borne sur l'id : SQLite choisirait l'index
+            # (conversation, id) au lieu de (conversation, created_at, id)
+            return queryset.filter(id__gt=cleared_id) if cleared_id else queryset
+
+        return unread.visible_messages(queryset, user.id)
+
+    def list(self, request, *args, **kwargs):
+        """
+        Liste les messages
+        Pour une conversation, pagination par clé sur (created_at, id) :
+        la dernière page par défaut, puis before (plus anciens) ou after
+        (plus récents) avec les curseurs retournés, sans OFFSET. Au-delà des
+        messages chauds, l'historique continue dans l'archive.
+        """
+        if not request.query_params.get('conversation'):
+            return super().list(request, *args, **kwargs)
+
+        before = request.query_params.get('before')
+        after = request.query_params.get('after')
+        try:
+            page_size = min(max(int(request.query_params.get('page_size', HISTORY_PAGE_SIZE)), 1), MAX_HISTORY_PAGE_SIZE)
+            if before and after:
+                raise ValueError
+            position = parse_history_cursor(before or after) if before or after else None
+            conversation_id = int(request.query_params['conversation'])
+        except ValueError:
+            return Response(
+                {'error': 'Curseur ou paramètre invalide'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not Conversation.objects.filter(id=conversation_id, participants=request.user).exists():
+            return Response(
+                {'error': 'Conversation non trouvée'},
+                status=status.HTTP_404_NOT_FOUND
+            )
 
-        return queryset
+        queryset = self.get_queryset()
+        if after:
+            queryset = queryset.filter(
+                Q(created_at__gt=position[0]) | Q(created_at=position[0], id__gt=position[1])
+            ).order_by('created_at', 'id')
+        else:
+            if position:
+                queryset = queryset.filter(
+                    Q(created_at__lt=position[0]) | Q(created_at=position[0], id__lt=position[1])
+                )
+            queryset = queryset.order_by('-created_at', '-id')
+
+        # Les messages archivés sont tous plus anciens que les messages chauds :
+        # ils précèdent (after) ou complètent (before) la page
+        cleared_id = unread.cleared_message_id(request.user.id, conversation_id)
+        if after:
+            archived = archived_page(conversation_id, position, True, page_size + 1, cleared_id)
+            messages = archived + list(queryset[:page_size + 1 - len(archived)])
+        else:
+            messages = list(queryset[:page_size + 1])
+            if len(messages) <= page_size:
+                last = (messages[-1].created_at, messages[-1].id) if messages else position
+                messages += archived_page(conversation_id, last, False, page_size + 1 - len(messages), cleared_id)
+        has_more = len(messages) > page_size
+        messages = messages[:page_size]
+        if not after:
+            messages.reverse()
+
+        data = {
+            'results': [
+                (ArchivedMessageSerializer if isinstance(message, ArchivedMessage) else MessageSerializer)(message).data
+                for message in messages
+            ],
+            'has_more': has_more,
+            'older_cursor': make_history_cursor(messages[0]) if messages else before,
+            'newer_cursor': make_history_cursor(messages[-1]) if messages else after,
+        }
+        if not before and not after:
+            # Point de départ de la synchronisation incrémentale
+            data['sync_cursor'] = make_sync_cursor(messages[-1].id if messages else 0, timezone.now())
+        return Response(data)
+
+    def _receive_uploads(self, request):
+        """
+        Lit les fichiers (champ file) d'une requête multipart, écrits sur
+        disque par morceaux pendant la réception
+        Retourne (fichiers, Response d'erreur ou None).
+        """
+        # À définir avant la lecture du corps de la requête
+        handler = ContentAddressedUploadHandler(request._request)
+        request._request.upload_handlers = [handler]
+        uploads = request.FILES.getlist('file')
+        if handler.received > handler.max_size:
+            discard_uploads(uploads)
+            return [], Response({
+                'error': 'Fichier trop volumineux'
+            }, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        return uploads, None
 
     def create(self, request, *args, **kwargs):
         """
         Crée un nouveau message
+        En multipart, les fichiers (champ file) sont joints au message dans
+        la même transaction.
         """
+        uploads = []
+        if request.content_type.startswith('multipart/form-data'):
+            uploads, error = self._receive_uploads(request)
+            if error:
+                return error
+        try:
+            return self._create_message(request, uploads)
+        except Exception:
+            # Transaction annulée : les fichiers reçus n'ont pas été rangés
+            discard_uploads(uploads)
+            raise
+
+    def _create_message(self, request, uploads):
+        """Crée le message et ses pièces jointes, puis publie l'événement"""
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        # Ajouter l'utilisateur actuel comme expéditeur
-        message = Message.objects.create(
-            conversation=serializer.validated_data['conversation'],
-            sender=request.user,
-            content=serializer.validated_data['content']
+        conversation = serializer.validated_data['conversation']
+        participant_ids = list(
+            Conversation.participants.through.objects.filter(
+                conversation_id=conversation.id
+            ).values_list('user_id', flat=True)
         )
+        if request.user.id not in participant_ids:
+            discard_uploads(uploads)
+            return Response({
+                'error': 'Vous ne participez pas à cette conversation'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        # Nombre de requêtes constant, quel que soit le nombre de participants
+        with transaction.atomic():
+            # Ajouter l'utilisateur actuel comme expéditeur
+            message = Message.objects.create(
+                conversation=conversation,
+                sender=request.user,
+                content=serializer.validated_data['content']
+            )
 
-        # Mettre à jour la date de modification de la conversation
-        conversation = message.conversation
-        conversation.save()
+            # Mettre à jour la date de modification de la conversation (UPDATE ciblé)
+            Conversation.objects.filter(pk=conversation.pk).update(updated_at=message.created_at)
+
+            # Restaurer la conversation pour tous les participants qui l'avaient masquée
+            # (un seul DELETE)
+            # IMPORTANT: On ne touche PAS au seuil d'effacement de l'historique !
+            # Les anciens messages restent supprimés, seul le nouveau message est visible
+            Conversation.hidden_for.through.objects.filter(conversation_id=conversation.pk).delete()
+
+            unread.increment(
+                conversation.pk, [user_id for user_id in participant_ids if user_id != request.user.id]
+            )
+            last_read_id, count = unread.mark_read(request.user.id, conversation.pk, message.id)
+            if uploads:
+                attach_files(message, request.user, uploads)
 
-        # Restaurer la conversation pour tous les participants qui l'avaient masquée
-        # IMPORTANT: On ne touche PAS à deleted_for des messages !
-        # Les anciens messages restent supprimés, seul le nouveau message est visible
-        for participant in conversation.participants.all():
-            conversation.hidden_for.remove(participant)
+        data = MessageSerializer(message).data
+        notify_new_message(message, data, participant_ids)
+        # L'expéditeur a lu la conversation jusqu'à son message
+        notify_read(conversation.pk, request.user.id, participant_ids, last_read_id, count)
 
         return Response(
-            MessageSerializer(message).data,
+            data,
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
+        """
+        Synchronisation incrémentale d'une conversation
+        Retourne les messages et changements de lecture postérieurs au
+        curseur (ou à after_id) ainsi que le curseur suivant. Sans nouveauté,
+        la réponse ne coûte que des lectures d'index.
+        """
+        conversation_id = request.query_params.get('conversation')
+        if not conversation_id:
+            return Response(
+                {'error': 'conversation est requis'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            after_id, read_since = parse_sync_cursor(
+                request.query_params.get('cursor'),
+                request.query_params.get('after_id')
+            )
+            if not Conversation.objects.filter(id=conversation_id, participants=request.user).exists():
+                return Response(
+                    {'error': 'Conversation non trouvée'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+        except ValueError:
+            return Response(
+                {'error': 'Curseur ou paramètre invalide'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        cleared_id = unread.cleared_message_id(request.user.id, conversation_id)
+        messages = list(Message.objects.filter(
+            conversation_id=conversation_id,
+            id__gt=max(after_id, cleared_id)
+        ).select_related('sender').prefetch_related('attachments__file').order_by('id')[:SYNC_PAGE_SIZE + 1])
+        has_more = len(messages) > SYNC_PAGE_SIZE
+        messages = messages[:SYNC_PAGE_SIZE]
+        last_id = messages[-1].id if messages else after_id
+
+        # Accusés de lecture des autres participants modifiés depuis le curseur
+        read_receipts = list(ConversationUnread.objects.filter(
+            conversation_id=conversation_id,
+            read_at__gt=read_since
+        ).exclude(
+            user=request.user
+        ).order_by('read_at').values('user_id', 'last_read_message_id', 'read_at')[:SYNC_PAGE_SIZE])
+        if read_receipts:
+            read_since = read_receipts[-1]['read_at']
+
+        return Response({
+            'messages': MessageSerializer(messages, many=True).data,
+            'read_receipts': read_receipts,
+            'cursor': make_sync_cursor(last_id, read_since),
+            'has_more': has_more or len(read_receipts) == SYNC_PAGE_SIZE
+        })
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Recherche plein texte dans les messages des conversations de
+        l'utilisateur, par pertinence (paramètres q, conversation, page,
+        page_size). Les messages archivés ne sont pas recherchés :
+        archived_excluded l'indique quand le périmètre en contient.
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {'error': 'q est requis'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+            page_size = min(max(int(request.query_params.get('page_size', SEARCH_PAGE_SIZE)), 1), MAX_SEARCH_PAGE_SIZE)
+            conversation_id = request.query_params.get('conversation')
+            conversation_id = int(conversation_id) if conversation_id else None
+        except ValueError:
+            return Response(
+                {'error': 'Paramètre invalide'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Une ligne de plus pour savoir s'il reste des résultats
+        hits = search_messages(
+            request.user.id, query, conversation_id,
+            limit=page_size + 1, offset=(page - 1) * page_size
+        )
+        has_more = len(hits) > page_size
+        hits = hits[:page_size]
+        messages = Message.objects.select_related('sender').prefetch_related(
+            'attachments__file'
+        ).in_bulk([message_id for message_id, _ in hits])
+
+        results = []
+        for message_id, snippet in hits:
+            if message_id in messages:
+                data = MessageSerializer(messages[message_id]).data
+                data['snippet'] = snippet
+                results.append(data)
+        return Response({
+            'results': results,
+            'page': page,
+            'has_more': has_more,
+            'archived_excluded': has_archived_messages(request.user.id, conversation_id)
+        })
+
+    @action(detail=True, methods=['post'], parser_classes=[MultiPartParser])
+    def attachments(self, request, pk=None):
+        """
+        Ajoute des pièces jointes (champ file, multipart) à un message
+        Seul l'expéditeur peut le faire ; les fichiers sont écrits sur disque
+        par morceaux pendant la réception.
+        """
+        message = self.get_object()
+        if message.sender != request.user:
+            return Response({
+                'error': 'Vous ne pouvez joindre des fichiers qu\'à vos propres messages'
+            }, status=status.HTTP_403_FORBIDDEN)
+
+        uploads, error = self._receive_uploads(request)
+        if error:
+            return error
+        if not uploads:
+            return Response({
+                'error': 'Aucun fichier reçu'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        attachments = attach_files(message, request.user, uploads)
+        return Response(
+            MessageAttachmentSerializer(attachments, many=True).data,
             status=status.HTTP_201_CREATED
         )
 
@@ -1623,10 +2483,14 @@ class MessageViewSet(viewsets.ModelViewSet):
         """
         message = self.get_object()
 
-        if message.sender != request.user:
-            message.is_read = True
-            message.read_at = timezone.now()
-            message.save()
+        # Le dernier message lu de l'utilisateur avance jusqu'à ce message
+        previous_id, _ = unread.get_state(request.user.id, message.conversation_id)
+        if message.sender != request.user and message.id > previous_id:
+            last_read_id, count = unread.mark_read(request.user.id, message.conversation_id, message.id)
+            notify_read(
+                message.conversation_id, request.user.id,
+                message.conversation.participants.values_list('id', flat=True), last_read_id, count
+            )
 
         return Response(
             MessageSerializer(message).data,
@@ -1644,7 +2508,231 @@ class MessageViewSet(viewsets.ModelViewSet):
                 'error': 'Vous ne pouvez supprimer que vos propres messages'
             }, status=status.HTTP_403_FORBIDDEN)
 
-        return super().destroy(request, *args, **kwargs)
+        # Pièces jointes sans contrainte de clé étrangère : supprimées explicitement
+        with transaction.atomic():
+            MessageAttachment.objects.filter(message_id=message.id).delete()
+            return super().destroy(request, *args, **kwargs)
+
+
+def event_stream_supported(request):
+    """Le flux SSE n'est servi que par un serveur ASGI (un worker WSGI resterait bloqué)"""
+    return isinstance(request, ASGIRequest)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def message_events_ticket_view(request):
+    """
+    Délivre un ticket à usage unique pour ouvrir le flux SSE de la messagerie
+    supported vaut false si le serveur ne peut pas servir le flux : le client
+    se contente alors de l'interrogation périodique.
+    """
+    if not event_stream_supported(request._request):
+        return Response({'supported': False, 'ticket': None})
+    return Response({
+        'supported': True,
+        'ticket': issue_stream_ticket(request.user.id),
+        'expires_in': getattr(settings, 'EVENTS_TICKET_TIMEOUT', 30)
+    })
+
+
+async def authenticate_event_stream(request):
+    """
+    Authentifie un flux SSE par ticket (paramètre ticket, EventSource ne
+    permettant pas d'envoyer d'en-têtes) ou par jeton JWT dans l'en-tête
+    Authorization pour les autres clients
+    """
+    ticket = request.GET.get('ticket')
+    if ticket:
+        user_id = await redeem_stream_ticket(ticket)
+        if user_id is None:
+            return None
+        user = await User.objects.filter(id=user_id).afirst()
+        return user if user is not None and user.is_active else None
+
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else None
+    if not raw_token:
+        return None
+    try:
+        validated_token = authentication.get_validated_token(raw_token)
+        user = await sync_to_async(authentication.get_user)(validated_token)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return user if user.is_active else None
+
+
+async def event_stream(user_id):
+    """
+    Générateur du flux SSE d'un utilisateur : attend les événements de son
+    canal, sans interroger la base, avec un commentaire keepalive périodique
+    """
+    broker = get_broker()
+    channel = user_channel(user_id)
+    queue = broker.subscribe(channel)
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield format_sse(event)
+    finally:
+        broker.unsubscribe(channel, queue)
+
+
+async def message_events_view(request):
+    """
+    Flux server-sent events de la messagerie (nécessite un serveur ASGI)
+    Événements : message (nouveau message), read (dernier message lu par un
+    participant), unread (variation `delta` ou nouveau nombre `count` des
+    messages non lus d'une conversation)
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Méthode non autorisée'}, status=405)
+
+    if not event_stream_supported(request):
+        return JsonResponse({'error': 'Le flux temps réel nécessite un serveur ASGI'}, status=503)
+
+    user = await authenticate_event_stream(request)
+    if user is None:
+        return JsonResponse({'error': 'Authentification requise'}, status=401)
+
+    response = StreamingHttpResponse(event_stream(user.id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+class MessageAttachmentViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet pour consulter et télécharger les pièces jointes
+    Accès réservé aux participants de la conversation, hors historique effacé
+    """
+    serializer_class = MessageAttachmentSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        cleared = ConversationUnread.objects.filter(
+            user=user, conversation_id=OuterRef('conversation_id')
+        ).values('cleared_message_id')[:1]
+        return MessageAttachment.objects.filter(
+            conversation__participants=user,
+            message_id__gt=Coalesce(Subquery(cleared), 0)
+        ).select_related('file')
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """
+        Télécharge le fichier (requêtes conditionnelles et Range)
+        """
+        attachment = self.get_object()
+        stored = attachment.file
+        path = blob_path(stored.sha256)
+        if not os.path.exists(path):
+            raise Http404
+
+        etag = f'"{stored.sha256}"'
+        last_modified = int(stored.created_at.timestamp())
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            # If-Range : l'intervalle n'est servi que si le fichier n'a pas changé
+            range_header = request.META.get('HTTP_RANGE')
+            if_range = request.META.get('HTTP_IF_RANGE')
+            if if_range and if_range != etag:
+                range_header = None
+            try:
+                byte_range = parse_range(range_header, stored.size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{stored.size}'
+                return response
+
+            if byte_range:
+                start, end = byte_range
+                response = StreamingHttpResponse(
+                    read_blob(path, start, end), status=206, content_type=attachment.content_type
+                )
+                response['Content-Range'] = f'bytes {start}-{end}/{stored.size}'
+                response['Content-Length'] = str(end - start + 1)
+            else:
+                response = StreamingHttpResponse(read_blob(path), content_type=attachment.content_type)
+                response['Content-Length'] = str(stored.size)
+            response['Content-Disposition'] = content_disposition_header(True, attachment.filename)
+            response['X-Content-Type-Options'] = 'nosniff'
+
+        response['Accept-Ranges'] = 'bytes'
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class AnnouncementViewSet(viewsets.ModelViewSet):
+    """
+    ViewSet pour les annonces de clinique
+    Le personnel (admin, réceptionniste) diffuse ; les destinataires lisent
+    les annonces qui leur ont été remises.
+    """
+    serializer_class = AnnouncementSerializer
+    permission_classes = [IsAuthenticated]
+    http_method_names = ['get', 'post', 'head', 'options']
+
+    def get_queryset(self):
+        """Annonces de la clinique pour le personnel, annonces reçues sinon"""
+        user = self.request.user
+        queryset = Announcement.objects.select_related('author')
+
+        if user.user_type in ['admin', 'receptionist']:
+            if user.user_type == 'receptionist':
+                try:
+                    queryset = queryset.filter(clinic=Receptionist.objects.get(user=user).clinic)
+                except Receptionist.DoesNotExist:
+                    return Announcement.objects.none()
+            return queryset.annotate(
+                read_count=Count('deliveries', filter=Q(deliveries__read_at__isnull=False))
+            )
+
+        delivery = AnnouncementDelivery.objects.filter(announcement=OuterRef('pk'), user=user)
+        return queryset.filter(deliveries__user=user).annotate(
+            read_at=Subquery(delivery.values('read_at')[:1])
+        )
+
+    def perform_create(self, serializer):
+        """Enregistrer l'annonce puis la remettre à ses destinataires"""
+        user = self.request.user
+        if user.user_type == 'receptionist':
+            try:
+                extra = {'clinic': Receptionist.objects.get(user=user).clinic}
+            except Receptionist.DoesNotExist:
+                raise serializers.ValidationError("Profil réceptionniste introuvable")
+        elif user.user_type == 'admin':
+            if not serializer.validated_data.get('clinic'):
+                raise serializers.ValidationError({'clinic': "La clinique est requise"})
+            extra = {}
+        else:
+            raise serializers.ValidationError("Vous n'avez pas la permission de diffuser une annonce")
+
+        with transaction.atomic():
+            announcement = serializer.save(author=user, **extra)
+            publish_announcement(announcement)
+
+    @action(detail=True, methods=['post'])
+    def mark_as_read(self, request, pk=None):
+        """
+        Marque l'annonce comme lue pour l'utilisateur
+        """
+        announcement = self.get_object()
+        AnnouncementDelivery.objects.filter(
+            announcement=announcement, user=request.user, read_at__isnull=True
+        ).update(read_at=timezone.now())
+        return Response({
+            'message': 'Annonce marquée comme lue'
+        }, status=status.HTTP_200_OK)
 
 
 # ============================================
@@ -0,0 +1,135 @@
+"""
+Attribution des créneaux libérés à la liste d'attente
+
+Appelé dans la transaction d'annulation : les demandes compatibles avec le
+créneau libéré sont lues via les index (médecin, statut, début de fenêtre)
+et (clinique, spécialité, statut, début de fenêtre), puis la première
+demande dont le patient est libre reçoit le rendez-vous.
+"""
+from datetime import timedelta
+
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .availability import find_conflicts
+from .holds import active_holds
+from .models import Appointment, WaitlistEntry
+from .schedule import get_schedule
+
+
+MAX_CANDIDATES = 20
+
+
+def matching_entries(doctor, intervals):
+    """Demandes en attente qui acceptent un rendez-vous du médecin commençant au début d'un des intervalles"""
+    windows = Q()
+    for start, end in intervals:
+        free_minutes = int((end - start).total_seconds() // 60)
+        windows |= Q(earliest__lte=start, latest__gt=start, duration__lte=free_minutes)
+    return WaitlistEntry.objects.filter(
+        Q(doctor=doctor) | Q(doctor__isnull=True, clinic_id=doctor.clinic_id, specialization=doctor.specialization),
+        windows,
+        status='waiting'
+    ).select_related('patient__user', 'service').order_by('created_at', 'id')
+
+
+def backfill_slot(appointment):
+    """
+    Attribue le créneau d'un rendez-vous annulé à la liste d'attente
+    Doit être appelé dans la transaction d'annulation.
+    Retourne le nouveau rendez-vous, ou None.
+    """
+    booked = backfill_slots([appointment])
+    return booked[0] if booked else None
+
+
+def backfill_slots(appointments):
+    """
+    Attribue les créneaux de rendez-vous annulés d'un même médecin (une série)
+    à la liste d'attente. Les demandes compatibles avec l'ensemble des créneaux
+    sont lues en une seule requête.
+    Doit être appelé dans la transaction d'annulation.
+    Retourne les nouveaux rendez-vous.
+    """
+    now = timezone.now()
+    slots = [apt for apt in appointments if apt.appointment_date > now]
+    if not slots:
+        return []
+
+    doctor = slots[0].doctor
+    if not doctor.is_available or not doctor.is_active:
+        return []
+    schedule = get_schedule(doctor)
+
+    # Les demandes traitées par une annulation concurrente sont ignorées
+    entries = list(matching_entries(doctor, [(apt.appointment_date, apt.end_date) for apt in slots]).select_for_update(
+        skip_locked=True, of=('self',)
+    )[:MAX_CANDIDATES * len(slots)])
+    freed = Q(id__in=[apt.id for apt in appointments])
+
+    booked = []
+    for appointment in slots:
+        start = appointment.appointment_date
+        free_minutes = int((appointment.end_date - start).total_seconds() // 60)
+        candidates = [
+            entry for entry in entries
+            if entry.status == 'waiting' and entry.earliest <= start < entry.latest and entry.duration <= free_minutes
+        ][:MAX_CANDIDATES]
+        for entry in candidates:
+            new_appointment = book_entry(entry, appointment, schedule, freed)
+            if new_appointment:
+                booked.append(new_appointment)
+                break
+    return booked
+
+
+def book_entry(entry, appointment, schedule, freed):
+    """Donne le créneau du rendez-vous annulé à la demande si le patient et le médecin sont libres"""
+    doctor = appointment.doctor
+    start = appointment.appointment_date
+    entry_end = start + timedelta(minutes=entry.duration)
+    if entry_end > entry.latest or not schedule.covers(start, entry_end):
+        return None
+    if find_conflicts(doctor.id, entry.patient_id, [(start, entry_end)], exclude=freed):
+        return None
+    if active_holds([doctor.id], start, entry_end, exclude_user=entry.patient.user).exists():
+        return None
+
+    new_appointment = Appointment.objects.create(
+        patient=entry.patient,
+        doctor=doctor,
+        clinic=appointment.clinic,
+        service=entry.service,
+        appointment_date=start,
+        duration=entry.duration,
+        reason=entry.reason,
+        notes="Rendez-vous attribué depuis la liste d'attente"
+    )
+    entry.status = 'booked'
+    entry.appointment = new_appointment
+    entry.save(update_fields=['status', 'appointment', 'updated_at'])
+    transaction.on_commit(lambda: notify_patient(new_appointment))
+    return new_appointment
+
+
+def notify_patient(appointment):
+    """Prévient le patient que le créneau lui a été attribué"""
+    email = appointment.patient.user.email
+    if not email:
+        return
+    local_date = timezone.localtime(appointment.appointment_date)
+    send_mail(
+        subject=f"Un créneau s'est libéré : {local_date.strftime('%d/%m/%Y à %H:%M')}",
+        message=(
+            f"Bonjour {appointment.patient.user.get_full_name()},\n\n"
+            f"Un créneau s'est libéré et un rendez-vous vous a été attribué avec le "
+            f"Dr. {appointment.doctor.user.get_full_name()} le {local_date.strftime('%d/%m/%Y')} "
+            f"à {local_date.strftime('%H:%M')}.\n"
+            "Si ce créneau ne vous convient pas, vous pouvez l'annuler depuis votre espace.\n"
+        ),
+        from_email=None,
+        recipient_list=[email],
+        fail_silently=True
+    )
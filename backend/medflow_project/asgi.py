@@ -3,6 +3,14 @@ ASGI config for medflow_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Le flux temps réel de la messagerie (server-sent events) doit être servi
+par ce point d'entrée, par exemple avec uvicorn (voir requirements.txt) :
+
+    uvicorn medflow_project.asgi:application --host 0.0.0.0 --port 8000
+
+Le courtier en mémoire (EVENTS_BROKER) ne fonctionne qu'avec un seul
+processus ; plusieurs workers nécessitent un courtier partagé.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -85,6 +85,52 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'medflow-default',
+    }
+}
+
+# Durée de vie (secondes) des créneaux disponibles en cache
+SLOT_CACHE_TIMEOUT = 300
+
+# Durée (minutes) d'une réservation temporaire de créneau
+SLOT_HOLD_MINUTES = 5
+
+
+# Email (rappels de rendez-vous)
+# https://docs.djangoproject.com/en/5.2/topics/email/
+
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'MedFlow <no-reply@medflow.local>'
+
+# Délai (heures) avant le rendez-vous pour l'envoi du rappel
+REMINDER_LEAD_HOURS = 24
+
+# Statut appliqué aux rendez-vous passés : {statut actuel: nouveau statut}
+APPOINTMENT_SWEEP_RULES = {
+    'scheduled': 'no_show',
+    'confirmed': 'no_show',
+    'in_progress': 'completed',
+}
+# Délai (minutes) après la fin du rendez-vous avant de changer son statut
+APPOINTMENT_SWEEP_GRACE_MINUTES = 60
+
+# Courtier des événements temps réel de la messagerie (un seul processus par défaut)
+# Le flux SSE (/api/events/messages/) nécessite un serveur ASGI :
+#   uvicorn medflow_project.asgi:application --workers 1
+EVENTS_BROKER = 'core.events.InMemoryBroker'
+# Durée de validité (secondes) des tickets d'ouverture du flux SSE
+EVENTS_TICKET_TIMEOUT = 30
+
+# Âge (jours) au-delà duquel les messages sont archivés (commande archive_messages)
+MESSAGE_ARCHIVE_DAYS = 365
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -125,6 +171,11 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Pièces jointes de la messagerie : hors de MEDIA_ROOT (jamais servies
+# directement), téléchargées après contrôle de la participation
+ATTACHMENTS_ROOT = BASE_DIR / 'attachments'
+ATTACHMENT_MAX_SIZE = 25 * 1024 * 1024
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
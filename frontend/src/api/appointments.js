@@ -276,6 +276,92 @@ export const getAvailableSlots = async (doctorId, date, serviceId = null) => {
   }
 };
 
+export const getAvailableSlotsRange = async (doctorId, startDate, endDate, serviceId = null) => {
+  const token = getAccessToken();
+  try {
+    const startStr = startDate.toISOString().split('T')[0];
+    const endStr = endDate.toISOString().split('T')[0];
+    let url = `${API_URL}/appointments/available_slots/?doctor_id=${doctorId}&start_date=${startStr}&end_date=${endStr}`;
+
+    // Ajouter le service_id si fourni
+    if (serviceId) {
+      url += `&service_id=${serviceId}`;
+    }
+
+    const response = await fetch(url, {
+      method: 'GET',
+      headers: {
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${token}`
+      }
+    });
+
+    if (!response.ok) {
+      throw new Error(`Erreur: ${response.status}`);
+    }
+
+    // { start_date, end_date, days: { 'YYYY-MM-DD': [créneaux] } }
+    return await response.json();
+  } catch (error) {
+    console.error('Erreur lors de la récupération des créneaux disponibles:', error);
+    throw error;
+  }
+};
+
+export const getFirstAvailableSlots = async ({ clinicId = null, specialization = null, serviceId = null, days = 14, limit = 10 } = {}) => {
+  const token = getAccessToken();
+  try {
+    const params = new URLSearchParams({ days, limit });
+    if (clinicId) params.append('clinic_id', clinicId);
+    if (specialization) params.append('specialization', specialization);
+    if (serviceId) params.append('service_id', serviceId);
+
+    const response = await fetch(`${API_URL}/appointments/first_available/?${params.toString()}`, {
+      method: 'GET',
+      headers: {
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${token}`
+      }
+    });
+
+    if (!response.ok) {
+      throw new Error(`Erreur: ${response.status}`);
+    }
+
+    return await response.json();
+  } catch (error) {
+    console.error('Erreur lors de la recherche des premiers créneaux disponibles:', error);
+    throw error;
+  }
+};
+
+export const bookAppointmentSeries = async (seriesData) => {
+  const token = getAccessToken();
+  try {
+    const response = await fetch(`${API_URL}/appointments/book_series/`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${token}`
+      },
+      body: JSON.stringify(seriesData)
+    });
+
+    const data = await response.json();
+    if (!response.ok) {
+      // data.conflicts contient les occurrences en conflit
+      const error = new Error(data.error || `Erreur: ${response.status}`);
+      error.data = data;
+      throw error;
+    }
+
+    return data;
+  } catch (error) {
+    console.error('Erreur lors de la réservation de la série de rendez-vous:', error);
+    throw error;
+  }
+};
+
 export const getServices = async () => {
   const token = getAccessToken();
   try {
@@ -183,16 +183,17 @@ export const deleteConversation = async (conversationId) => {
 // ============================================================================
 
 /**
- * Récupère les messages d'une conversation
+ * Récupère une page de l'historique d'une conversation
+ * Sans curseur : la dernière page ; before : plus anciens ; after : plus récents
  */
-export const getMessages = async (conversationId, filters = {}) => {
+export const getMessages = async (conversationId, { before = null, after = null, pageSize = null } = {}) => {
   const token = getAccessToken();
   try {
-    let url = `${API_URL}/messages/?conversation=${conversationId}`;
-    
-    if (filters.ordering) {
-      url += `&ordering=${filters.ordering}`;
-    }
+    const params = new URLSearchParams({ conversation: conversationId });
+    if (before) params.append('before', before);
+    if (after) params.append('after', after);
+    if (pageSize) params.append('page_size', pageSize);
+    const url = `${API_URL}/messages/?${params.toString()}`;
 
     const response = await fetch(url, {
       method: 'GET',
@@ -206,8 +207,7 @@ export const getMessages = async (conversationId, filters = {}) => {
       throw new Error(`Erreur: ${response.status}`);
     }
 
-    const data = await response.json();
-    return Array.isArray(data) ? data : data.results || [];
+    return await response.json();
   } catch (error) {
     console.error('Erreur lors de la récupération des messages:', error);
     throw error;
@@ -215,21 +215,116 @@ export const getMessages = async (conversationId, filters = {}) => {
 };
 
 /**
- * Envoie un nouveau message
+ * Récupère uniquement les nouveautés d'une conversation depuis le curseur
+ * (nouveaux messages et changements de lecture)
  */
-export const sendMessage = async (conversationId, content) => {
+export const syncMessages = async (conversationId, cursor = null) => {
   const token = getAccessToken();
   try {
-    const response = await fetch(`${API_URL}/messages/`, {
-      method: 'POST',
+    const params = new URLSearchParams({ conversation: conversationId });
+    if (cursor) params.append('cursor', cursor);
+
+    const response = await fetch(`${API_URL}/messages/sync/?${params.toString()}`, {
+      method: 'GET',
       headers: {
         'Authorization': `Bearer ${token}`,
         'Content-Type': 'application/json'
-      },
-      body: JSON.stringify({
+      }
+    });
+
+    if (!response.ok) {
+      throw new Error(`Erreur: ${response.status}`);
+    }
+
+    return await response.json();
+  } catch (error) {
+    console.error('Erreur lors de la synchronisation des messages:', error);
+    throw error;
+  }
+};
+
+/**
+ * Recherche plein texte dans les messages (résultats par pertinence)
+ */
+export const searchMessages = async (query, { conversationId = null, page = 1 } = {}) => {
+  const token = getAccessToken();
+  try {
+    const params = new URLSearchParams({ q: query, page });
+    if (conversationId) params.append('conversation', conversationId);
+
+    const response = await fetch(`${API_URL}/messages/search/?${params.toString()}`, {
+      method: 'GET',
+      headers: {
+        'Authorization': `Bearer ${token}`,
+        'Content-Type': 'application/json'
+      }
+    });
+
+    if (!response.ok) {
+      throw new Error(`Erreur: ${response.status}`);
+    }
+
+    return await response.json();
+  } catch (error) {
+    console.error('Erreur lors de la recherche de messages:', error);
+    throw error;
+  }
+};
+
+/**
+ * Ouvre le flux temps réel de la messagerie (server-sent events)
+ * EventSource ne permet pas d'en-têtes : le flux est ouvert avec un ticket
+ * à usage unique plutôt qu'avec le jeton. Retourne null si le serveur ne
+ * sert pas le flux (serveur WSGI).
+ */
+export const openMessageEvents = async () => {
+  const token = getAccessToken();
+  const response = await fetch(`${API_URL}/events/messages/ticket/`, {
+    method: 'POST',
+    headers: {
+      'Authorization': `Bearer ${token}`
+    }
+  });
+
+  if (!response.ok) {
+    throw new Error(`Erreur: ${response.status}`);
+  }
+
+  const { supported, ticket } = await response.json();
+  if (!supported) {
+    return null;
+  }
+  return new EventSource(`${API_URL}/events/messages/?ticket=${encodeURIComponent(ticket)}`);
+};
+
+/**
+ * Envoie un nouveau message, avec ses pièces jointes éventuelles
+ * (envoyées dans la même requête : message et fichiers sont créés ensemble)
+ */
+export const sendMessage = async (conversationId, content, files = []) => {
+  const token = getAccessToken();
+  try {
+    let body;
+    const headers = {
+      'Authorization': `Bearer ${token}`
+    };
+    if (files.length > 0) {
+      body = new FormData();
+      body.append('conversation', conversationId);
+      body.append('content', content);
+      files.forEach(file => body.append('file', file));
+    } else {
+      headers['Content-Type'] = 'application/json';
+      body = JSON.stringify({
         conversation: conversationId,
         content: content
-      })
+      });
+    }
+
+    const response = await fetch(`${API_URL}/messages/`, {
+      method: 'POST',
+      headers,
+      body
     });
 
     if (!response.ok) {
@@ -244,6 +339,35 @@ export const sendMessage = async (conversationId, content) => {
   }
 };
 
+/**
+ * Télécharge une pièce jointe et l'enregistre sous son nom d'origine
+ */
+export const downloadAttachment = async (attachment) => {
+  const token = getAccessToken();
+  try {
+    const response = await fetch(`${API_URL}/attachments/${attachment.id}/download/`, {
+      method: 'GET',
+      headers: {
+        'Authorization': `Bearer ${token}`
+      }
+    });
+
+    if (!response.ok) {
+      throw new Error(`Erreur: ${response.status}`);
+    }
+
+    const url = URL.createObjectURL(await response.blob());
+    const link = document.createElement('a');
+    link.href = url;
+    link.download = attachment.filename;
+    link.click();
+    URL.revokeObjectURL(url);
+  } catch (error) {
+    console.error('Erreur lors du téléchargement de la pièce jointe:', error);
+    throw error;
+  }
+};
+
 /**
  * Marque un message comme lu
  */
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import { getAvailableSlots } from '../api/appointments';
+import { getAvailableSlotsRange } from '../api/appointments';
 import '../styles/Appointments.css';
 
 export default function AppointmentForm({
@@ -28,6 +28,8 @@ export default function AppointmentForm({
   const [selectedTime, setSelectedTime] = useState('');
   const [availableSlotsList, setAvailableSlotsList] = useState([]);
   const [loadingSlots, setLoadingSlots] = useState(false);
+  // Créneaux du mois déjà chargés, pour ne pas refaire un appel par jour
+  const [slotsCache, setSlotsCache] = useState({ key: null, days: {} });
 
   useEffect(() => {
     if (appointment) {
@@ -136,12 +138,22 @@ export default function AppointmentForm({
   };
 
   const loadAvailableSlots = async (doctorId, date, serviceId = null) => {
+    const dateStr = date.toISOString().split('T')[0];
+    const monthStart = new Date(Date.UTC(date.getUTCFullYear(), date.getUTCMonth(), 1));
+    const monthEnd = new Date(Date.UTC(date.getUTCFullYear(), date.getUTCMonth() + 1, 0));
+    const key = `${doctorId}-${serviceId || ''}-${monthStart.toISOString().slice(0, 7)}`;
+
+    if (slotsCache.key === key) {
+      setAvailableSlotsList(slotsCache.days[dateStr] || []);
+      return;
+    }
+
     try {
       setLoadingSlots(true);
-      const response = await getAvailableSlots(doctorId, date, serviceId);
-      if (response.slots) {
-        setAvailableSlotsList(response.slots);
-      }
+      const response = await getAvailableSlotsRange(doctorId, monthStart, monthEnd, serviceId);
+      const days = response.days || {};
+      setSlotsCache({ key, days });
+      setAvailableSlotsList(days[dateStr] || []);
     } catch (error) {
       console.error('Erreur lors du chargement des créneaux:', error);
       setAvailableSlotsList([]);
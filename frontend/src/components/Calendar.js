@@ -1,8 +1,43 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
+import { getAvailableSlotsRange } from '../api/appointments';
 import '../styles/Calendar.css';
 
-export default function Calendar({ onDateSelect, selectedDate = null }) {
+export default function Calendar({ onDateSelect, selectedDate = null, doctorId = null, serviceId = null }) {
   const [currentDate, setCurrentDate] = useState(new Date());
+  // Créneaux par jour ('YYYY-MM-DD') du mois affiché, chargés en un seul appel
+  const [availability, setAvailability] = useState(null);
+
+  useEffect(() => {
+    if (!doctorId) {
+      setAvailability(null);
+      return undefined;
+    }
+
+    let cancelled = false;
+    const start = new Date(Date.UTC(currentDate.getFullYear(), currentDate.getMonth(), 1));
+    const end = new Date(Date.UTC(currentDate.getFullYear(), currentDate.getMonth() + 1, 0));
+    getAvailableSlotsRange(doctorId, start, end, serviceId)
+      .then((response) => {
+        if (!cancelled) setAvailability(response.days || {});
+      })
+      .catch(() => {
+        if (!cancelled) setAvailability(null);
+      });
+
+    return () => {
+      cancelled = true;
+    };
+  }, [doctorId, serviceId, currentDate]);
+
+  const dayKey = (day) => {
+    const month = String(currentDate.getMonth() + 1).padStart(2, '0');
+    return `${currentDate.getFullYear()}-${month}-${String(day).padStart(2, '0')}`;
+  };
+
+  const isFull = (day) => {
+    if (!availability || day === null) return false;
+    return !(availability[dayKey(day)] || []).length;
+  };
 
   const getDaysInMonth = (date) => {
     return new Date(date.getFullYear(), date.getMonth() + 1, 0).getDate();
@@ -22,7 +57,7 @@ export default function Calendar({ onDateSelect, selectedDate = null }) {
 
   const handleDateClick = (day) => {
     const selected = new Date(currentDate.getFullYear(), currentDate.getMonth(), day);
-    onDateSelect(selected);
+    onDateSelect(selected, availability ? availability[dayKey(day)] || [] : null);
   };
 
   const isToday = (day) => {
@@ -101,8 +136,8 @@ export default function Calendar({ onDateSelect, selectedDate = null }) {
               day === null ? 'empty' : ''
             } ${isToday(day) ? 'today' : ''} ${
               isSelected(day) ? 'selected' : ''
-            } ${isPast(day) ? 'past' : ''}`}
-            onClick={() => day && !isPast(day) && handleDateClick(day)}
+            } ${isPast(day) ? 'past' : ''} ${isFull(day) ? 'full' : ''}`}
+            onClick={() => day && !isPast(day) && !isFull(day) && handleDateClick(day)}
           >
             {day}
           </div>
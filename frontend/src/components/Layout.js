@@ -37,18 +37,15 @@ const Layout = ({ children }) => {
   const fetchUnreadMessagesCount = async () => {
     try {
       const token = getAccessToken();
-      const response = await fetch('http://localhost:8000/api/conversations/', {
+      const response = await fetch('http://localhost:8000/api/conversations/unread_counts/', {
         headers: { 'Authorization': `Bearer ${token}` }
       });
 
       if (response.ok) {
         const data = await response.json();
-        const conversations = Array.isArray(data) ? data : data.results || [];
 
-        // Calculer le total de messages non lus
-        const totalUnread = conversations.reduce((sum, conv) => {
-          return sum + (conv.unread_count || 0);
-        }, 0);
+        // Total calculé par le serveur à partir des compteurs de non lus
+        const totalUnread = data.total || 0;
 
         setUnreadMessagesCount(totalUnread);
       }
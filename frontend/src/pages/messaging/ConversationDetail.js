@@ -4,13 +4,16 @@
 
 import React, { useState, useEffect, useRef, useCallback } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import { FiArrowLeft, FiSend, FiTrash2 } from 'react-icons/fi';
+import { FiArrowLeft, FiPaperclip, FiSend, FiTrash2 } from 'react-icons/fi';
 import {
   getConversation,
   getMessages,
+  syncMessages,
+  openMessageEvents,
   sendMessage,
+  downloadAttachment,
   deleteMessage,
-  markMessageAsRead,
+  markConversationAsRead,
   deleteConversation
 } from '../../api/messaging';
 import AlertModal from '../../components/AlertModal';
@@ -20,37 +23,55 @@ const ConversationDetail = () => {
   const { conversationId } = useParams();
   const navigate = useNavigate();
   const messagesEndRef = useRef(null);
+  const fileInputRef = useRef(null);
 
   const [conversation, setConversation] = useState(null);
   const [messages, setMessages] = useState([]);
   const [newMessage, setNewMessage] = useState('');
+  const [selectedFiles, setSelectedFiles] = useState([]);
   const [loading, setLoading] = useState(true);
   const [sending, setSending] = useState(false);
   const [showModal, setShowModal] = useState(false);
   const [modalConfig, setModalConfig] = useState({});
   const [pendingDeleteId, setPendingDeleteId] = useState(null);
   const [isInitialLoad, setIsInitialLoad] = useState(true);
+  const [olderCursor, setOlderCursor] = useState(null);
+  const [hasOlder, setHasOlder] = useState(false);
+  const [loadingOlder, setLoadingOlder] = useState(false);
+  const cursorRef = useRef(null);
 
   const currentUser = JSON.parse(localStorage.getItem('user') || '{}');
 
   const fetchMessages = useCallback(async () => {
     try {
-      const data = await getMessages(conversationId);
-      setMessages(data);
+      // Ne récupérer que les nouveautés depuis le dernier curseur
+      const data = await syncMessages(conversationId, cursorRef.current);
+      cursorRef.current = data.cursor;
 
-      // Marquer les messages non lus comme lus
-      const unreadMessages = data.filter(
-        msg => !msg.is_read && msg.sender.id !== currentUser.id
-      );
+      if (data.messages.length > 0) {
+        setMessages(previous => [
+          ...previous,
+          ...data.messages.filter(msg => !previous.some(existing => existing.id === msg.id))
+        ]);
+      }
 
-      for (const msg of unreadMessages) {
+      // Marquer la conversation comme lue à la réception de nouveaux messages
+      const hasUnread = data.messages.some(
+        msg => Number(msg.sender) !== Number(currentUser.id)
+      );
+      if (hasUnread) {
         try {
-          await markMessageAsRead(msg.id);
+          await markConversationAsRead(conversationId);
         } catch (error) {
-          console.error('Erreur lors du marquage du message comme lu:', error);
+          console.error('Erreur lors du marquage des messages comme lus:', error);
         }
       }
 
+      if (data.has_more) {
+        await fetchMessages();
+        return;
+      }
+
       setIsInitialLoad(false);
     } catch (error) {
       console.error('Erreur lors du chargement des messages:', error);
@@ -61,6 +82,18 @@ const ConversationDetail = () => {
     try {
       const data = await getConversation(conversationId);
       setConversation(data);
+
+      // Dernière page de l'historique, puis synchronisation incrémentale
+      const page = await getMessages(conversationId);
+      setMessages(page.results);
+      setOlderCursor(page.older_cursor);
+      setHasOlder(page.has_more);
+      cursorRef.current = page.sync_cursor;
+      if (page.results.some(msg => Number(msg.sender) !== Number(currentUser.id))) {
+        markConversationAsRead(conversationId).catch(error => (
+          console.error('Erreur lors du marquage des messages comme lus:', error)
+        ));
+      }
       await fetchMessages();
     } catch (error) {
       console.error('Erreur lors du chargement de la conversation:', error);
@@ -73,22 +106,102 @@ const ConversationDetail = () => {
     } finally {
       setLoading(false);
     }
-  }, [conversationId, fetchMessages]);
+  }, [conversationId, fetchMessages, currentUser.id]);
+
+  const loadOlderMessages = async () => {
+    if (!olderCursor || loadingOlder) return;
+    try {
+      setLoadingOlder(true);
+      const page = await getMessages(conversationId, { before: olderCursor });
+      setMessages(previous => [
+        ...page.results.filter(msg => !previous.some(existing => existing.id === msg.id)),
+        ...previous
+      ]);
+      setOlderCursor(page.older_cursor);
+      setHasOlder(page.has_more);
+    } catch (error) {
+      console.error('Erreur lors du chargement des messages précédents:', error);
+    } finally {
+      setLoadingOlder(false);
+    }
+  };
 
   useEffect(() => {
-    // Réinitialiser le flag quand on change de conversation
+    // Réinitialiser le flag et les curseurs quand on change de conversation
     setIsInitialLoad(true);
+    cursorRef.current = null;
+    setOlderCursor(null);
+    setHasOlder(false);
+    setMessages([]);
     fetchConversationData();
-    const interval = setInterval(fetchMessages, 3000); // Rafraîchir tous les 3 secondes
-    return () => clearInterval(interval);
+
+    // Rafraîchissement toutes les 3 secondes tant que le flux n'est pas ouvert
+    // (serveur WSGI, proxy qui coupe le flux...) ou après une coupure
+    let interval = setInterval(fetchMessages, 3000);
+    let events = null;
+    let retry = null;
+    let closed = false;
+
+    const onEvent = (event) => {
+      const data = JSON.parse(event.data);
+      if (Number(data.conversation) === Number(conversationId)) {
+        fetchMessages();
+      }
+    };
+
+    // Synchroniser dès qu'un événement concerne cette conversation
+    const connect = async () => {
+      let source;
+      try {
+        source = await openMessageEvents();
+      } catch (error) {
+        if (!closed) retry = setTimeout(connect, 5000);
+        return;
+      }
+      if (closed) {
+        if (source) source.close();
+        return;
+      }
+      // Serveur sans flux temps réel : l'interrogation périodique suffit
+      if (!source) return;
+
+      events = source;
+      events.addEventListener('message', onEvent);
+      events.addEventListener('read', onEvent);
+      events.onopen = () => {
+        clearInterval(interval);
+        interval = null;
+        // Rattraper ce qui a pu arriver avant l'ouverture du flux
+        fetchMessages();
+      };
+      events.onerror = () => {
+        // Le ticket ne sert qu'une fois : rouvrir le flux avec un nouveau ticket
+        events.close();
+        events = null;
+        if (interval === null) {
+          interval = setInterval(fetchMessages, 3000);
+        }
+        retry = setTimeout(connect, 5000);
+      };
+    };
+    connect();
+
+    return () => {
+      closed = true;
+      if (events) events.close();
+      clearInterval(interval);
+      clearTimeout(retry);
+    };
   }, [conversationId, fetchConversationData, fetchMessages]);
 
+  const lastMessageId = messages.length > 0 ? messages[messages.length - 1].id : null;
+
   useEffect(() => {
-    // Ne pas scroller au premier chargement
+    // Ne pas scroller au premier chargement ni au chargement des messages précédents
     if (!isInitialLoad) {
       scrollToBottom();
     }
-  }, [messages, isInitialLoad]);
+  }, [lastMessageId, isInitialLoad]);
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
@@ -130,13 +243,20 @@ const ConversationDetail = () => {
 
   const handleSendMessage = async (e) => {
     e.preventDefault();
-    if (!newMessage.trim()) return;
+    if (!newMessage.trim() && selectedFiles.length === 0) return;
 
     try {
       setSending(true);
-      const message = await sendMessage(conversationId, newMessage);
-      setMessages([...messages, message]);
+      const content = newMessage.trim() || selectedFiles.map(file => file.name).join(', ');
+      const message = await sendMessage(conversationId, content, selectedFiles);
+      setMessages(previous => (
+        previous.some(existing => existing.id === message.id)
+          ? previous.map(existing => (existing.id === message.id ? message : existing))
+          : [...previous, message]
+      ));
       setNewMessage('');
+      setSelectedFiles([]);
+      if (fileInputRef.current) fileInputRef.current.value = '';
       // Scroller vers le bas après l'envoi
       setTimeout(() => scrollToBottom(), 100);
     } catch (error) {
@@ -226,6 +346,11 @@ const ConversationDetail = () => {
       </div>
 
       <div className="messages-container">
+        {hasOlder && (
+          <button className="load-older-button" onClick={loadOlderMessages} disabled={loadingOlder}>
+            {loadingOlder ? 'Chargement...' : 'Afficher les messages précédents'}
+          </button>
+        )}
         {messages.length === 0 ? (
           <div className="empty-messages">
             <p>Aucun message pour le moment</p>
@@ -246,6 +371,20 @@ const ConversationDetail = () => {
                     <span className="message-time">{formatTime(msg.created_at)}</span>
                   </div>
                   <p className="message-text">{msg.content}</p>
+                  {msg.attachments?.length > 0 && (
+                    <div className="message-attachments">
+                      {msg.attachments.map(attachment => (
+                        <button
+                          key={attachment.id}
+                          type="button"
+                          className="message-attachment"
+                          onClick={() => downloadAttachment(attachment).catch(() => {})}
+                        >
+                          <FiPaperclip /> {attachment.filename}
+                        </button>
+                      ))}
+                    </div>
+                  )}
                   {isSentByMe && (
                     <button
                       className="btn-delete-message"
@@ -264,6 +403,22 @@ const ConversationDetail = () => {
       </div>
 
       <form className="message-input-form" onSubmit={handleSendMessage}>
+        <input
+          type="file"
+          multiple
+          ref={fileInputRef}
+          onChange={(e) => setSelectedFiles(Array.from(e.target.files))}
+          style={{ display: 'none' }}
+        />
+        <button
+          type="button"
+          className="btn-attach"
+          onClick={() => fileInputRef.current?.click()}
+          disabled={sending}
+          title={selectedFiles.length > 0 ? selectedFiles.map(file => file.name).join(', ') : 'Joindre un fichier'}
+        >
+          <FiPaperclip />{selectedFiles.length > 0 && ` ${selectedFiles.length}`}
+        </button>
         <input
           type="text"
           placeholder="Écrivez votre message..."
@@ -274,7 +429,7 @@ const ConversationDetail = () => {
         />
         <button
           type="submit"
-          disabled={sending || !newMessage.trim()}
+          disabled={sending || (!newMessage.trim() && selectedFiles.length === 0)}
           className="btn btn-primary"
         >
           <FiSend /> {sending ? 'Envoi...' : 'Envoyer'}